@@ -0,0 +1,44 @@
+"""Added fingerprint jobs table
+
+Revision ID: 3c9d1f0a6b42
+Revises: 77ee91788f8b
+Create Date: 2026-10-18 11:03:27.114580
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9d1f0a6b42'
+down_revision: Union[str, None] = '77ee91788f8b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('xxfingerprint_jobs_db',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('pet_id', sa.Integer(), nullable=False),
+    sa.Column('pet_status', sa.String(length=20), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('reason', sa.String(length=20), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['pet_id'], ['xxpets_db.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_xxfingerprint_jobs_db_id'), 'xxfingerprint_jobs_db', ['id'], unique=False)
+    op.create_index('ix_xxfingerprint_jobs_db_pet_created', 'xxfingerprint_jobs_db', ['pet_id', 'created_at'], unique=False)
+    op.create_index('ix_xxfingerprint_jobs_db_status', 'xxfingerprint_jobs_db', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_xxfingerprint_jobs_db_status', table_name='xxfingerprint_jobs_db')
+    op.drop_index('ix_xxfingerprint_jobs_db_pet_created', table_name='xxfingerprint_jobs_db')
+    op.drop_index(op.f('ix_xxfingerprint_jobs_db_id'), table_name='xxfingerprint_jobs_db')
+    op.drop_table('xxfingerprint_jobs_db')
@@ -0,0 +1,43 @@
+"""Added device latest location table
+
+Revision ID: 5e8b2d7c41a9
+Revises: 3c9d1f0a6b42
+Create Date: 2026-10-18 14:26:51.302719
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8b2d7c41a9'
+down_revision: Union[str, None] = '3c9d1f0a6b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('xxdevice_latest_location_db',
+    sa.Column('device_id', sa.Integer(), nullable=False),
+    sa.Column('location_id', sa.Integer(), nullable=True),
+    sa.Column('latitude', sa.Float(), nullable=False),
+    sa.Column('longitude', sa.Float(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['device_id'], ['xxdevice_db.device_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('device_id')
+    )
+    op.create_index('ix_xxdevice_db_pet_id', 'xxdevice_db', ['pet_id'], unique=False)
+    # Seed from the existing history: newest fix per device
+    op.execute("""
+        INSERT INTO xxdevice_latest_location_db (device_id, location_id, latitude, longitude, timestamp)
+        SELECT DISTINCT ON (device_id) device_id, location_id, latitude, longitude, timestamp
+        FROM xxlocation_db
+        ORDER BY device_id, timestamp DESC, location_id DESC
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_xxdevice_db_pet_id', table_name='xxdevice_db')
+    op.drop_table('xxdevice_latest_location_db')
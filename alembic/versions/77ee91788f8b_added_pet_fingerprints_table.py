@@ -0,0 +1,44 @@
+"""Added pet fingerprints table
+
+Revision ID: 77ee91788f8b
+Revises: 7548ad3928e2
+Create Date: 2026-10-18 09:12:40.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '77ee91788f8b'
+down_revision: Union[str, None] = '7548ad3928e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('xxpet_fingerprints_db',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('pet_id', sa.Integer(), nullable=False),
+    sa.Column('pet_type', sa.String(length=10), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('generated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['pet_id'], ['xxpets_db.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('pet_id')
+    )
+    op.create_index(op.f('ix_xxpet_fingerprints_db_id'), 'xxpet_fingerprints_db', ['id'], unique=False)
+    op.create_index('ix_xxpet_fingerprints_db_type_pet', 'xxpet_fingerprints_db', ['pet_type', 'pet_id'], unique=False)
+    op.create_index('ix_xxpets_db_lower_status', 'xxpets_db', [sa.text('lower(status)')], unique=False)
+    op.create_index('ix_xxpets_db_lat_lon', 'xxpets_db', ['latitude', 'longitude'], unique=False)
+    # Rows are backfilled from the fingerprint store by scripts/backfill_pet_fingerprints.py
+
+
+def downgrade() -> None:
+    op.drop_index('ix_xxpets_db_lat_lon', table_name='xxpets_db')
+    op.drop_index('ix_xxpets_db_lower_status', table_name='xxpets_db')
+    op.drop_index('ix_xxpet_fingerprints_db_type_pet', table_name='xxpet_fingerprints_db')
+    op.drop_index(op.f('ix_xxpet_fingerprints_db_id'), table_name='xxpet_fingerprints_db')
+    op.drop_table('xxpet_fingerprints_db')
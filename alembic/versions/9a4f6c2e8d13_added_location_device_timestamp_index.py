@@ -0,0 +1,26 @@
+"""Added location device timestamp index
+
+Revision ID: 9a4f6c2e8d13
+Revises: 5e8b2d7c41a9
+Create Date: 2026-10-18 16:02:44.918306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4f6c2e8d13'
+down_revision: Union[str, None] = '5e8b2d7c41a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_xxlocation_db_device_timestamp', 'xxlocation_db', ['device_id', 'timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_xxlocation_db_device_timestamp', table_name='xxlocation_db')
@@ -0,0 +1,28 @@
+"""Added blocked users indexes
+
+Revision ID: a8e4f2c6b391
+Revises: f3c9d5e7a128
+Create Date: 2026-10-18 21:34:52.117406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8e4f2c6b391'
+down_revision: Union[str, None] = 'f3c9d5e7a128'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_blocked_users_blocker_blocked', 'blocked_users', ['blocker_id', 'blocked_user_id'], unique=False)
+    op.create_index('ix_blocked_users_blocked_user_id', 'blocked_users', ['blocked_user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_blocked_users_blocked_user_id', table_name='blocked_users')
+    op.drop_index('ix_blocked_users_blocker_blocked', table_name='blocked_users')
@@ -0,0 +1,39 @@
+"""Added user notification counts table
+
+Revision ID: b5d1e7f3a942
+Revises: a8e4f2c6b391
+Create Date: 2026-10-18 22:08:26.471903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d1e7f3a942'
+down_revision: Union[str, None] = 'a8e4f2c6b391'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('xxuser_notification_counts_db',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('unread_count', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['xxaccount_db.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # Seed from the existing notifications
+    op.execute("""
+        INSERT INTO xxuser_notification_counts_db (user_id, unread_count)
+        SELECT user_id, COUNT(*)
+        FROM xxuser_notifications_db
+        WHERE is_read = false
+        GROUP BY user_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('xxuser_notification_counts_db')
@@ -0,0 +1,44 @@
+"""Added location rollups table
+
+Revision ID: b7d3e5f19c26
+Revises: 9a4f6c2e8d13
+Create Date: 2026-10-18 17:41:09.553862
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d3e5f19c26'
+down_revision: Union[str, None] = '9a4f6c2e8d13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('xxlocation_rollups_db',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('device_id', sa.Integer(), nullable=False),
+    sa.Column('period_start', sa.DateTime(), nullable=False),
+    sa.Column('point_count', sa.Integer(), nullable=False),
+    sa.Column('min_latitude', sa.Float(), nullable=False),
+    sa.Column('max_latitude', sa.Float(), nullable=False),
+    sa.Column('min_longitude', sa.Float(), nullable=False),
+    sa.Column('max_longitude', sa.Float(), nullable=False),
+    sa.Column('first_at', sa.DateTime(), nullable=False),
+    sa.Column('last_at', sa.DateTime(), nullable=False),
+    sa.Column('path', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.ForeignKeyConstraint(['device_id'], ['xxdevice_db.device_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('device_id', 'period_start', name='_location_rollup_device_period_uc')
+    )
+    op.create_index(op.f('ix_xxlocation_rollups_db_id'), 'xxlocation_rollups_db', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_xxlocation_rollups_db_id'), table_name='xxlocation_rollups_db')
+    op.drop_table('xxlocation_rollups_db')
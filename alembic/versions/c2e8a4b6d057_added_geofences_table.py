@@ -0,0 +1,46 @@
+"""Added geofences table
+
+Revision ID: c2e8a4b6d057
+Revises: b7d3e5f19c26
+Create Date: 2026-10-18 19:12:36.207415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2e8a4b6d057'
+down_revision: Union[str, None] = 'b7d3e5f19c26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('xxgeofences_db',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('pet_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('center_latitude', sa.Float(), nullable=True),
+    sa.Column('center_longitude', sa.Float(), nullable=True),
+    sa.Column('radius_m', sa.Float(), nullable=True),
+    sa.Column('polygon', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('pet_inside', sa.Boolean(), nullable=True),
+    sa.Column('state_changed_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['pet_id'], ['xxpets_db.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_xxgeofences_db_id'), 'xxgeofences_db', ['id'], unique=False)
+    op.create_index('ix_xxgeofences_db_pet_id', 'xxgeofences_db', ['pet_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_xxgeofences_db_pet_id', table_name='xxgeofences_db')
+    op.drop_index(op.f('ix_xxgeofences_db_id'), table_name='xxgeofences_db')
+    op.drop_table('xxgeofences_db')
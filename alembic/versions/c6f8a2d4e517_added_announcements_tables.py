@@ -0,0 +1,44 @@
+"""Added announcements tables
+
+Revision ID: c6f8a2d4e517
+Revises: b5d1e7f3a942
+Create Date: 2026-10-18 22:51:39.802614
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6f8a2d4e517'
+down_revision: Union[str, None] = 'b5d1e7f3a942'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('xxannouncements_db',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=100), nullable=False),
+    sa.Column('message', sa.String(length=500), nullable=False),
+    sa.Column('related_url', sa.String(length=200), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_xxannouncements_db_created_at'), 'xxannouncements_db', ['created_at'], unique=False)
+    op.create_index(op.f('ix_xxannouncements_db_id'), 'xxannouncements_db', ['id'], unique=False)
+    op.create_table('xxuser_announcement_reads_db',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('read_up_to_id', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['xxaccount_db.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('xxuser_announcement_reads_db')
+    op.drop_index(op.f('ix_xxannouncements_db_id'), table_name='xxannouncements_db')
+    op.drop_index(op.f('ix_xxannouncements_db_created_at'), table_name='xxannouncements_db')
+    op.drop_table('xxannouncements_db')
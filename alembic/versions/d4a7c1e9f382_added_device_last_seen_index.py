@@ -0,0 +1,26 @@
+"""Added device last seen index
+
+Revision ID: d4a7c1e9f382
+Revises: c2e8a4b6d057
+Create Date: 2026-10-18 19:41:07.215834
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a7c1e9f382'
+down_revision: Union[str, None] = 'c2e8a4b6d057'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_xxdevice_db_last_seen', 'xxdevice_db', ['last_seen'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_xxdevice_db_last_seen', table_name='xxdevice_db')
@@ -0,0 +1,26 @@
+"""Added message conversation timestamp index
+
+Revision ID: e6f2b8a0c417
+Revises: d4a7c1e9f382
+Create Date: 2026-10-18 20:12:33.604219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6f2b8a0c417'
+down_revision: Union[str, None] = 'd4a7c1e9f382'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_xxmessages_db_conversation_timestamp', 'xxmessages_db', ['conversation_id', 'timestamp', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_xxmessages_db_conversation_timestamp', table_name='xxmessages_db')
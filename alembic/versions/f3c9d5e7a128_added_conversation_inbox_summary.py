@@ -0,0 +1,63 @@
+"""Added conversation inbox summary
+
+Revision ID: f3c9d5e7a128
+Revises: e6f2b8a0c417
+Create Date: 2026-10-18 20:47:18.530962
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c9d5e7a128'
+down_revision: Union[str, None] = 'e6f2b8a0c417'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('xxconversation_db', sa.Column('last_message_id', sa.Integer(), nullable=True))
+    op.add_column('xxconversation_db', sa.Column('last_activity_at', sa.DateTime(), nullable=True))
+    op.add_column('xxconversation_db', sa.Column('user1_unread_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('xxconversation_db', sa.Column('user2_unread_count', sa.Integer(), server_default='0', nullable=False))
+    # Seed from the existing messages
+    op.execute("""
+        UPDATE xxconversation_db c
+        SET last_message_id = m.id, last_activity_at = m.timestamp
+        FROM (
+            SELECT DISTINCT ON (conversation_id) conversation_id, id, timestamp
+            FROM xxmessages_db
+            ORDER BY conversation_id, timestamp DESC, id DESC
+        ) m
+        WHERE m.conversation_id = c.id
+    """)
+    op.execute("""
+        UPDATE xxconversation_db c
+        SET user1_unread_count = u.user1_unread, user2_unread_count = u.user2_unread
+        FROM (
+            SELECT m.conversation_id,
+                   COUNT(*) FILTER (WHERE m.receiver_id = cv.user1) AS user1_unread,
+                   COUNT(*) FILTER (WHERE m.receiver_id = cv.user2 AND cv.user2 <> cv.user1) AS user2_unread
+            FROM xxmessages_db m
+            JOIN xxconversation_db cv ON cv.id = m.conversation_id
+            WHERE m.is_read = false
+            GROUP BY m.conversation_id
+        ) u
+        WHERE u.conversation_id = c.id
+    """)
+    op.execute("UPDATE xxconversation_db SET last_activity_at = COALESCE(created_at, now()) WHERE last_activity_at IS NULL")
+    op.alter_column('xxconversation_db', 'last_activity_at', nullable=False)
+    op.create_index('ix_xxconversation_db_user1_activity', 'xxconversation_db', ['user1', 'last_activity_at', 'id'], unique=False)
+    op.create_index('ix_xxconversation_db_user2_activity', 'xxconversation_db', ['user2', 'last_activity_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_xxconversation_db_user2_activity', table_name='xxconversation_db')
+    op.drop_index('ix_xxconversation_db_user1_activity', table_name='xxconversation_db')
+    op.drop_column('xxconversation_db', 'user2_unread_count')
+    op.drop_column('xxconversation_db', 'user1_unread_count')
+    op.drop_column('xxconversation_db', 'last_activity_at')
+    op.drop_column('xxconversation_db', 'last_message_id')
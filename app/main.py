@@ -330,7 +330,7 @@ FastAPI Pet Management Application
 import os
 from sqlalchemy import text
 from typing import Annotated
-from .database.database import Base, engine, get_db
+from .database.database import Base, engine, get_db, SessionLocal
 from .models import models
 from fastapi import FastAPI, HTTPException, Depends, status, File, UploadFile, Form
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -358,6 +358,11 @@ from .routers import (
     checkout_router
 )
 from .core.config import settings
+from .services.fingerprint_index import fingerprint_index
+from .services.fingerprint_jobs import fingerprint_jobs
+from .services.location_buffer import location_buffer
+from .services.geofence_engine import geofence_engine
+from .services.device_liveness import device_liveness
 from pathlib import Path
 
 # Configuration
@@ -378,7 +383,8 @@ subdirs = [
     "app/uploads/success_stories", 
     "app/uploads/messages",
     "app/uploads/profile_pictures",
-    "app/uploads/products"
+    "app/uploads/products",
+    "app/uploads/fingerprints"
 ]
 
 for subdir in subdirs:
@@ -463,6 +469,11 @@ app.mount("/uploads/products", StaticFiles(directory="app/uploads/products"), na
 app.mount("/uploads/messages", StaticFiles(directory="app/uploads/messages"), name="message_images")
 app.mount("/uploads/success_stories", StaticFiles(directory="app/uploads/success_stories"), name="stories_images")
 
+# Serve stored objects when running against the local-disk storage backend
+if settings.STORAGE_BACKEND == "local":
+    Path(settings.LOCAL_STORAGE_DIR).mkdir(parents=True, exist_ok=True)
+    app.mount(settings.LOCAL_STORAGE_URL, StaticFiles(directory=settings.LOCAL_STORAGE_DIR), name="storage")
+
 print("Static directories mounted successfully")
 
 # Health check endpoints - Railway specific
@@ -517,9 +528,50 @@ async def startup_event():
     print(f"📍 Port: {os.environ.get('PORT', 'Not set')}")
     print(f"🔧 Environment: {'Development' if settings.DEBUG else 'Production'}")
 
+    # Load every pet fingerprint into the in-memory similarity index
+    try:
+        fingerprint_index.rebuild()
+    except Exception as e:
+        print(f"Fingerprint index build failed: {str(e)}")
+
+    # Restart fingerprint jobs interrupted by the last shutdown
+    db = SessionLocal()
+    try:
+        resumed = fingerprint_jobs.resume(db)
+        if resumed:
+            print(f"Resumed {resumed} fingerprint jobs")
+    except Exception as e:
+        print(f"Fingerprint job resume failed: {str(e)}")
+    finally:
+        db.close()
+
+    # Load geofences for location pings
+    db = SessionLocal()
+    try:
+        print(f"Loaded {geofence_engine.load(db)} geofences")
+    except Exception as e:
+        print(f"Geofence load failed: {str(e)}")
+    finally:
+        db.close()
+
+    # Background writer for buffered tracker fixes
+    location_buffer.start()
+
+    # Mark trackers that stopped pinging offline
+    try:
+        offline = device_liveness.sweep()
+        if offline:
+            print(f"Marked {len(offline)} silent devices offline")
+    except Exception as e:
+        print(f"Device liveness sweep failed: {str(e)}")
+    device_liveness.start()
+
 @app.on_event("shutdown")
 async def shutdown_event():
     print("👋 Pet Adoption API shutting down...")
+    fingerprint_jobs.shutdown()
+    location_buffer.stop()
+    device_liveness.stop()
 
 # Global exception handler
 @app.exception_handler(Exception)
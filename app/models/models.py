@@ -358,7 +358,7 @@
 
 # backend/app/models/models.py
 # dasdadasd
-from sqlalchemy import Boolean, Text, Float, Integer, String, Column, DateTime, ForeignKey, UniqueConstraint, Numeric
+from sqlalchemy import Boolean, Text, Float, Integer, String, Column, DateTime, ForeignKey, UniqueConstraint, Numeric, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import JSONB  # For PostgreSQL
 from app.database.database import Base
@@ -512,6 +512,33 @@ class UserNotification(Base):
     user = relationship("User", back_populates="user_notifications")
 
 
+class Announcement(Base):
+    """Platform-wide announcement, merged into every user's notifications on read."""
+    __tablename__ = "xxannouncements_db"
+
+    id = Column(Integer, primary_key=True, index=True)
+    title = Column(String(100), nullable=False)
+    message = Column(String(500), nullable=False)
+    related_url = Column(String(200), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+class UserAnnouncementRead(Base):
+    """Newest announcement a user has read; every older one counts as read too."""
+    __tablename__ = "xxuser_announcement_reads_db"
+
+    user_id = Column(Integer, ForeignKey('xxaccount_db.id', ondelete='CASCADE'), primary_key=True)
+    read_up_to_id = Column(Integer, default=0, server_default='0', nullable=False)
+
+
+class UserNotificationCount(Base):
+    """Unread ``UserNotification`` count per user, kept current by every write."""
+    __tablename__ = "xxuser_notification_counts_db"
+
+    user_id = Column(Integer, ForeignKey('xxaccount_db.id', ondelete='CASCADE'), primary_key=True)
+    unread_count = Column(Integer, default=0, server_default='0', nullable=False)
+
+
 class PetHealth(Base):
     __tablename__ = "xxpethealth_db"
     
@@ -569,6 +596,13 @@ class Pet(Base):
 
     health_info = relationship("PetHealth", back_populates="pet", uselist=False, cascade="all, delete-orphan")
     device = relationship("Device", back_populates="pet", uselist=False, cascade="all, delete-orphan")
+    fingerprint = relationship("PetFingerprint", back_populates="pet", uselist=False, cascade="all, delete-orphan")
+
+    # Similarity-search candidate filters: status match and bounding box
+    __table_args__ = (
+        Index('ix_xxpets_db_lower_status', func.lower(status)),
+        Index('ix_xxpets_db_lat_lon', 'latitude', 'longitude'),
+    )
 
 
 
@@ -580,6 +614,11 @@ class Conversation(Base):
     user1 = Column(Integer, ForeignKey("xxaccount_db.id"), nullable=False)
     user2 = Column(Integer, ForeignKey("xxaccount_db.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Inbox summary, maintained by app.services.message_history on send and read
+    last_message_id = Column(Integer, nullable=True)  # xxmessages_db.id
+    last_activity_at = Column(DateTime, default=datetime.now, nullable=False)  # same clock as Message.timestamp
+    user1_unread_count = Column(Integer, default=0, server_default='0', nullable=False)
+    user2_unread_count = Column(Integer, default=0, server_default='0', nullable=False)
     
     # Relationships (optional)
     user1_ref = relationship("User", foreign_keys=[user1])
@@ -588,6 +627,8 @@ class Conversation(Base):
     # Prevents duplicate conversations between the same users
     __table_args__ = (
         UniqueConstraint('user1', 'user2', name='_user_conversation_uc'),
+        Index('ix_xxconversation_db_user1_activity', 'user1', 'last_activity_at', 'id'),
+        Index('ix_xxconversation_db_user2_activity', 'user2', 'last_activity_at', 'id'),
     )
 
 
@@ -607,6 +648,10 @@ class Message(Base):
     sender = relationship("User", foreign_keys=[sender_id])
     receiver = relationship("User", foreign_keys=[receiver_id])
     conversation = relationship("Conversation", backref="messages")
+    
+    __table_args__ = (
+        Index('ix_xxmessages_db_conversation_timestamp', 'conversation_id', 'timestamp', 'id'),
+    )
 
 
 # backend/app/models/models.py
@@ -647,6 +692,42 @@ class PetSimilaritySearch(Base):
     source_pet = relationship("Pet", foreign_keys=[source_pet_id])
 
 
+class PetFingerprint(Base):
+    __tablename__ = "xxpet_fingerprints_db"
+
+    id = Column(Integer, primary_key=True, index=True)
+    pet_id = Column(Integer, ForeignKey('xxpets_db.id', ondelete='CASCADE'), nullable=False, unique=True)
+    pet_type = Column(String(10), nullable=False)  # 'dog' or 'cat' at generation time
+    status = Column(String(20), nullable=False)  # 'lost' or 'pet i found' at generation time
+    generated_at = Column(DateTime, default=datetime.utcnow)
+    # Vectors live in the fingerprint store (app/services/fingerprint_store.py), keyed by pet_id
+
+    pet = relationship("Pet", back_populates="fingerprint")
+
+    __table_args__ = (
+        Index('ix_xxpet_fingerprints_db_type_pet', 'pet_type', 'pet_id'),
+    )
+
+
+class FingerprintJob(Base):
+    __tablename__ = "xxfingerprint_jobs_db"
+
+    id = Column(Integer, primary_key=True, index=True)
+    pet_id = Column(Integer, ForeignKey('xxpets_db.id', ondelete='CASCADE'), nullable=False)
+    pet_status = Column(String(20), nullable=False)  # 'lost' or 'pet i found' to fingerprint with
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, completed, failed
+    reason = Column(String(20), nullable=False, default="requested")  # 'requested' or 'image_updated'
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('ix_xxfingerprint_jobs_db_pet_created', 'pet_id', 'created_at'),
+        Index('ix_xxfingerprint_jobs_db_status', 'status'),
+    )
+
+
 class SuccessStory(Base):
     __tablename__ = "xxsuccess_stories"
 
@@ -686,6 +767,11 @@ class BlockedUser(Base):
     # Relationships
     blocker = relationship("User", foreign_keys=[blocker_id])
     blocked_user = relationship("User", foreign_keys=[blocked_user_id])
+    
+    __table_args__ = (
+        Index('ix_blocked_users_blocker_blocked', 'blocker_id', 'blocked_user_id'),
+        Index('ix_blocked_users_blocked_user_id', 'blocked_user_id'),
+    )
 
 
 
@@ -702,11 +788,16 @@ class Device(Base):
     is_online = Column(Boolean, default=False)
     status = Column(String(20), default='working')  # New column: 'working' or 'removed'
 
+    __table_args__ = (
+        Index('ix_xxdevice_db_pet_id', 'pet_id'),
+        Index('ix_xxdevice_db_last_seen', 'last_seen'),
+    )
     
     # Relationships
     pet = relationship("Pet", back_populates="device")
     user = relationship("User", back_populates="devices")
     locations = relationship("Location", back_populates="device", cascade="all, delete-orphan")
+    latest_location = relationship("DeviceLatestLocation", back_populates="device", uselist=False, cascade="all, delete-orphan")
 
 class Location(Base):
     __tablename__ = "xxlocation_db"
@@ -716,11 +807,71 @@ class Location(Base):
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('ix_xxlocation_db_device_timestamp', 'device_id', 'timestamp'),
+    )
     
     # Relationship
     device = relationship("Device", back_populates="locations")
 
 
+class Geofence(Base):
+    """A zone a tracked pet is expected to stay in (or out of)."""
+    __tablename__ = "xxgeofences_db"
+
+    id = Column(Integer, primary_key=True, index=True)
+    pet_id = Column(Integer, ForeignKey('xxpets_db.id', ondelete='CASCADE'), nullable=False)
+    name = Column(String(100), nullable=False)
+    kind = Column(String(20), nullable=False)  # 'circle' or 'polygon'
+    center_latitude = Column(Float, nullable=True)  # circle only
+    center_longitude = Column(Float, nullable=True)
+    radius_m = Column(Float, nullable=True)
+    polygon = Column(JSONB, nullable=True)  # polygon only: [[latitude, longitude], ...]
+    is_active = Column(Boolean, default=True)
+    pet_inside = Column(Boolean, nullable=True)  # last evaluated state, null until the first fix
+    state_changed_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_xxgeofences_db_pet_id', 'pet_id'),
+    )
+
+
+class LocationRollup(Base):
+    """One device-hour of fixes older than the raw retention window."""
+    __tablename__ = "xxlocation_rollups_db"
+
+    id = Column(Integer, primary_key=True, index=True)
+    device_id = Column(Integer, ForeignKey('xxdevice_db.device_id', ondelete='CASCADE'), nullable=False)
+    period_start = Column(DateTime, nullable=False)  # start of the hour
+    point_count = Column(Integer, nullable=False)  # raw fixes summarised
+    min_latitude = Column(Float, nullable=False)
+    max_latitude = Column(Float, nullable=False)
+    min_longitude = Column(Float, nullable=False)
+    max_longitude = Column(Float, nullable=False)
+    first_at = Column(DateTime, nullable=False)
+    last_at = Column(DateTime, nullable=False)
+    path = Column(JSONB, nullable=False)  # simplified track: [[latitude, longitude, iso timestamp], ...]
+
+    __table_args__ = (
+        UniqueConstraint('device_id', 'period_start', name='_location_rollup_device_period_uc'),
+    )
+
+
+class DeviceLatestLocation(Base):
+    """Newest fix per device, kept current by every location write."""
+    __tablename__ = "xxdevice_latest_location_db"
+
+    device_id = Column(Integer, ForeignKey('xxdevice_db.device_id', ondelete='CASCADE'), primary_key=True)
+    location_id = Column(Integer, nullable=True)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    timestamp = Column(DateTime, nullable=False)
+
+    device = relationship("Device", back_populates="latest_location")
+
+
 
 
 
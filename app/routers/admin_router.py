@@ -5,16 +5,19 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_, desc, cast, Integer
 from datetime import datetime, timedelta
 from typing import List, Optional
-from pathlib import Path
 import uuid
 import os
 from fastapi.responses import FileResponse, JSONResponse
 
 from app.database.database import get_db
 from app.models import models
+from app.services.storage import storage, StorageError
+from app.services.block_cache import block_cache
+from app.services import announcements
+from app.services.image_pipeline import prepare_images, ImageValidationError
 
-UPLOAD_DIR = Path("app/uploads/success_stories")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+# Same bucket the public success stories endpoints read from
+SUCCESS_STORY_BUCKET = os.getenv("SUPABASE_SUCCESS_BUCKET", "success-stories")
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -814,67 +817,42 @@ async def create_announcement(
     db: Session = Depends(get_db)
 ):
     """
-    Create a platform-wide announcement with duplicate prevention
+    Create a platform-wide announcement with duplicate prevention.
+    The announcement is stored once and merged into every user's
+    notifications when they are read.
     """
     if not title or not message:
         raise HTTPException(status_code=400, detail="Title and message are required")
     
     try:
-        # Begin transaction
-        db.begin()
-
-        # More strict duplicate check (same title + message within last 30 minutes)
-        duplicate_check = db.query(models.UserNotification)\
-            .filter(
-                models.UserNotification.title == f"Announcement: {title}",
-                models.UserNotification.message == message[:500],
-                models.UserNotification.created_at >= datetime.utcnow() - timedelta(minutes=30)
-            )\
-            .first()
-        
-        if duplicate_check:
-            db.rollback()
-            return {
-                "success": False,
-                "message": "Duplicate announcement prevented - identical message sent recently",
-                "users_notified": 0
-            }
-
-        users = []
+        users_notified = 0
+        announcement = None
         if send_as_notification:
-            # Get only active users
-            users = db.query(models.User)\
+            users_notified = db.query(func.count(models.User.id))\
                 .filter(models.User.is_active == True)\
-                .all()
+                .scalar()
             
-            if not users:
-                db.rollback()
+            if not users_notified:
                 raise HTTPException(status_code=404, detail="No active users found")
 
-            # Create all notifications at once
-            notifications = [
-                models.UserNotification(
-                    user_id=user.id,
-                    title=f"Announcement: {title}",
-                    message=message[:500],
-                    notification_type="system",
-                    related_url="/announcements",
-                    is_read=False,
-                    created_at=datetime.utcnow()  # Explicit timestamp
-                )
-                for user in users
-            ]
-            
-            # Bulk insert with explicit commit
-            db.bulk_save_objects(notifications)
-            db.commit()
+            # Same title + message within the last 30 minutes is a duplicate
+            announcement = announcements.publish(db, title, message)
+            if announcement is None:
+                return {
+                    "success": False,
+                    "message": "Duplicate announcement prevented - identical message sent recently",
+                    "users_notified": 0
+                }
         
         return {
             "success": True,
             "message": f"Announcement created{' and notifications sent' if send_as_notification else ''}",
-            "users_notified": len(users) if send_as_notification else 0
+            "users_notified": users_notified,
+            "announcement_id": announcement.id if announcement else None
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
@@ -891,8 +869,8 @@ async def get_unique_announcements(
     try:
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         
-        # Get distinct announcements by title and message
-        announcements = db.query(
+        # Announcements sent as one notification per user (before the announcements table)
+        legacy = db.query(
             models.UserNotification.title,
             models.UserNotification.message,
             models.UserNotification.related_url,
@@ -911,15 +889,30 @@ async def get_unique_announcements(
         .limit(limit)\
         .all()
         
-        return [
+        stored = db.query(models.Announcement)\
+            .filter(models.Announcement.created_at >= cutoff_date)\
+            .order_by(models.Announcement.created_at.desc())\
+            .limit(limit)\
+            .all()
+        
+        results = [
             {
                 "title": a.title,
                 "message": a.message,
                 "created_at": a.latest_date.isoformat(),
                 "related_url": a.related_url
             }
-            for a in announcements
+            for a in legacy
+        ] + [
+            {
+                "title": f"{announcements.TITLE_PREFIX}{a.title}",
+                "message": a.message,
+                "created_at": a.created_at.isoformat(),
+                "related_url": a.related_url
+            }
+            for a in stored
         ]
+        return sorted(results, key=lambda a: a["created_at"], reverse=True)[:limit]
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1100,8 +1093,10 @@ async def unblock_user(
     if not block:
         raise HTTPException(status_code=404, detail="Block relationship not found")
     
+    user_ids = (block.blocker_id, block.blocked_user_id)
     db.delete(block)
     db.commit()
+    block_cache.invalidate(*user_ids)
     
     return {"success": True, "message": "User unblocked successfully"}
 
@@ -1144,18 +1139,19 @@ async def create_success_story(
     files: List[UploadFile] = File(...),  # Required multiple files
     db: Session = Depends(get_db)
 ):
-    filenames = []
-    
-    for file in files:
-        ext = Path(file.filename).suffix
-        unique_name = f"{uuid.uuid4().hex}{ext}"
-        destination = UPLOAD_DIR / unique_name
-
-        with destination.open("wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+    try:
+        images = await prepare_images(files)
+    except ImageValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        filenames.append(unique_name)
+    filenames = [f"{uuid.uuid4().hex}.jpg" for _ in images]
+    try:
+        await storage.upload_many(
+            SUCCESS_STORY_BUCKET,
+            [(filename, content, "image/jpeg") for filename, content in zip(filenames, images)]
+        )
+    except StorageError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to upload images: {str(e)}")
 
     new_story = models.SuccessStory(
         name=name,
@@ -1184,8 +1180,14 @@ async def delete_success_story(
     if not story:
         raise HTTPException(status_code=404, detail="Success story not found")
     
+    image_filenames = story.image_filenames or []
     db.delete(story)
     db.commit()
+
+    try:
+        await storage.remove(SUCCESS_STORY_BUCKET, image_filenames)
+    except StorageError as e:
+        print(f"Warning: Failed to delete success story images: {str(e)}")
     
     return {"success": True, "message": "Success story deleted"}
 
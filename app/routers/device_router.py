@@ -1,22 +1,27 @@
 
 
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 from datetime import datetime
 from pydantic import BaseModel, validator
-from typing import Optional, Dict, Any
-from app.database.database import get_db
-from app.models.models import Device, Location
-from supabase import create_client
-import os
+from typing import Optional, Dict, Any, List
+import json
+from app.core.config import settings
+from app.database.database import get_db, SessionLocal
+from app.models.models import Device, DeviceLatestLocation
+from app.services.location_ingest import ingest_fixes, naive_utc
+from app.services.device_alerts import device_alert_cache, alert_status
+from app.services.device_liveness import device_liveness
+from app.services.location_buffer import location_buffer
+from app.services.live_tracking import device_topic, pet_topic, publish_fix, serialize_fix
+from app.services.pubsub import pubsub
+from app.services.geofence_engine import check_geofences
+from app.services import location_history
 
 router = APIRouter(prefix="/api/device", tags=["device"])
 
-# Initialize Supabase client
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-
 # Pydantic models
 class LocationCreate(BaseModel):
     unique_code: str
@@ -44,7 +49,7 @@ class DeviceResponse(BaseModel):
     last_seen: Optional[datetime] = None
 
 class LocationResponse(BaseModel):
-    location_id: int
+    location_id: Optional[int] = None
     device_id: int
     latitude: float
     longitude: float
@@ -55,113 +60,183 @@ class PetAlertResponse(BaseModel):
     phone_number: Optional[str]
     status: str
 
-# Database fetch functions
-def get_pet_status(device_id: int) -> Dict[str, Any]:
-    """Fetch pet status by joining xxdevice_db and xxpets_db"""
-    device_data = supabase.table("xxdevice_db") \
-        .select("pet_id, xxpets_db(status)") \
-        .eq("device_id", device_id) \
-        .execute()
-    
-    if not device_data.data or not device_data.data[0].get("pet_id"):
-        return None
-    
-    pet_data = supabase.table("xxpets_db") \
-        .select("*") \
-        .eq("id", device_data.data[0]["pet_id"]) \
-        .execute()
-    
-    return pet_data.data[0] if pet_data.data else None
+MAX_BATCH_FIXES = 5000
+MAX_STREAM_TOPICS = 50
 
+class LocationBatchCreate(BaseModel):
+    fixes: List[LocationCreate]
 
-def get_user_phone_number(user_id: int) -> Optional[str]:
-    """Fetch phone number from xxaccount_db"""
-    account_data = supabase.table("xxaccount_db") \
-        .select("phone_number") \
-        .eq("id", user_id) \
-        .execute()
-    return account_data.data[0].get("phone_number") if account_data.data else None
+    @validator('fixes')
+    def validate_batch_size(cls, v):
+        if not v:
+            raise ValueError('At least one fix is required')
+        if len(v) > MAX_BATCH_FIXES:
+            raise ValueError(f'At most {MAX_BATCH_FIXES} fixes per batch')
+        return v
 
+class FixResponse(BaseModel):
+    latitude: float
+    longitude: float
+    timestamp: datetime
+
+class DeviceBatchAlertResponse(BaseModel):
+    unique_code: str
+    device_id: int
+    accepted: int
+    last_fix: FixResponse
+    phone_number: Optional[str]
+    status: str
+
+class LocationBatchResponse(BaseModel):
+    accepted: int
+    rejected: int
+    devices: List[DeviceBatchAlertResponse]
+    unknown_devices: List[str]
 
 # Routes
 @router.post("/location", response_model=PetAlertResponse, status_code=status.HTTP_201_CREATED)
-async def create_device_location(
+def create_device_location(
     location_data: LocationCreate,
     db: Session = Depends(get_db)
 ):
+    """Accept one fix from a tracker.
+
+    The fix is appended to the write-behind buffer and written with the
+    next flush, so ``location.location_id`` is not known yet and is null.
+    """
     try:
-        # Get current timestamp
-        timestamp = location_data.timestamp or datetime.utcnow()
-        
-        # Check device in Supabase
-        supabase_device = supabase.table("xxdevice_db") \
-            .select("*") \
-            .eq("unique_code", location_data.unique_code) \
-            .execute()
-        
-        if not supabase_device.data:
+        timestamp = naive_utc(location_data.timestamp) or datetime.utcnow()
+
+        device = device_alert_cache.get(db, location_data.unique_code)
+        if not device:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Device not found in xxdevice_db"
             )
-        
-        # Local database operations
-        device = db.query(Device).filter(Device.unique_code == location_data.unique_code).first()
-        if not device:
-            device = Device(
-                unique_code=location_data.unique_code,
-                is_active=True,
-                last_seen=timestamp,
-                is_online=True
-            )
-            db.add(device)
-            db.flush()
 
-        device.last_seen = timestamp
-        device.is_online = True
-
-        new_location = Location(
-            device_id=device.device_id,
-            latitude=location_data.latitude,
-            longitude=location_data.longitude,
-            timestamp=timestamp
+        location_buffer.append(
+            device.device_id,
+            location_data.latitude,
+            location_data.longitude,
+            timestamp
         )
-        db.add(new_location)
-        db.commit()
-        db.refresh(new_location)
-
-        # Check pet status
-        pet = get_pet_status(supabase_device.data[0]['device_id'])
-        response_data = {
-            "location": new_location,
-            "phone_number": None,
-            "status": "safe"
+        publish_fix(device.device_id, device.pet_id, location_data.latitude, location_data.longitude, timestamp)
+        check_geofences(db, [(device.pet_id, location_data.latitude, location_data.longitude, timestamp)])
+
+        return {
+            "location": {
+                "location_id": None,
+                "device_id": device.device_id,
+                "latitude": location_data.latitude,
+                "longitude": location_data.longitude,
+                "timestamp": timestamp
+            },
+            **alert_status(device.pet_status, device.phone_number)
         }
 
-        if pet and pet.get("status") == "Lost":
-            phone_number = get_user_phone_number(pet["user_id"])
-            response_data.update({
-                "phone_number": phone_number,
-                "status": "Lost"
-            })
-
-        return response_data
-
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error processing location: {str(e)}"
         )
 
+@router.post("/locations/batch", response_model=LocationBatchResponse, status_code=status.HTTP_201_CREATED)
+def create_device_locations_batch(
+    batch: LocationBatchCreate,
+    db: Session = Depends(get_db)
+):
+    """Ingest buffered fixes for one or many devices in one request.
+
+    All fixes are written with a single multi-row insert and one commit;
+    fixes for unknown devices are skipped and listed in ``unknown_devices``.
+    Each known device gets its pet's alert status, as from ``/location``.
+    """
+    try:
+        return ingest_fixes(db, batch.fixes)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error processing locations: {str(e)}"
+        )
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.get("/stream")
+async def stream_device_locations(
+    request: Request,
+    device_ids: List[int] = Query(default=[]),
+    pet_ids: List[int] = Query(default=[])
+):
+    """Server-Sent Events stream of live fixes for devices and/or pets.
+
+    Subscribe with ``?device_ids=1&pet_ids=7``. The stream starts with a
+    ``fix`` event for each watched device's latest known position, then
+    sends one ``fix`` event per new fix as it is accepted. A comment line
+    is sent every ``LIVE_STREAM_HEARTBEAT_SECONDS`` to keep proxies from
+    closing an idle connection.
+    """
+    topics = [device_topic(device_id) for device_id in device_ids] + [pet_topic(pet_id) for pet_id in pet_ids]
+    if not topics:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Pass at least one device_ids or pet_ids"
+        )
+    if len(topics) > MAX_STREAM_TOPICS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"At most {MAX_STREAM_TOPICS} devices and pets per stream"
+        )
+
+    # Subscribe before reading the snapshot so no fix falls in between
+    subscription = pubsub.subscribe(topics)
+    try:
+        # A short-lived session: the stream must not hold a connection open
+        db = SessionLocal()
+        try:
+            snapshot = db.query(Device.device_id, Device.pet_id, DeviceLatestLocation).join(
+                DeviceLatestLocation, DeviceLatestLocation.device_id == Device.device_id
+            ).filter(
+                or_(Device.device_id.in_(device_ids), Device.pet_id.in_(pet_ids))
+            ).all()
+        finally:
+            db.close()
+    except Exception:
+        subscription.close()
+        raise
+
+    async def events():
+        try:
+            for device_id, pet_id, latest in snapshot:
+                yield sse_event("fix", serialize_fix(device_id, pet_id, latest.latitude, latest.longitude, latest.timestamp))
+            while True:
+                message = await subscription.get(timeout=settings.LIVE_STREAM_HEARTBEAT_SECONDS)
+                if await request.is_disconnected():
+                    break
+                yield sse_event("fix", message) if message else ": keep-alive\n\n"
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/{unique_code}/locations", response_model=list[LocationResponse])
 async def get_device_locations(
     unique_code: str,
-    limit: int = 100,
+    response: Response,
+    limit: int = Query(100, ge=1, le=5000),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
+    """Newest-first fixes in ``[start, end)``; the next page's cursor is in ``X-Next-Cursor``."""
     device = db.query(Device).filter(Device.unique_code == unique_code).first()
     if not device:
         raise HTTPException(
@@ -169,27 +244,32 @@ async def get_device_locations(
             detail="Device not found"
         )
 
-    locations = db.query(Location)\
-        .filter(Location.device_id == device.device_id)\
-        .order_by(Location.timestamp.desc())\
-        .limit(limit)\
-        .all()
+    try:
+        locations, next_cursor = location_history.fetch_page(db, device.device_id, start, end, cursor, limit)
+    except location_history.CursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
 
-    return locations
+    return [{**location._asdict(), "device_id": device.device_id} for location in locations]
 
 @router.get("/{device_id}/alert-info", response_model=Dict[str, Any])
-async def get_alert_info(device_id: int):
+def get_alert_info(device_id: int, db: Session = Depends(get_db)):
     """Manual trigger endpoint for SMS alerts"""
-    pet = get_pet_status(device_id)
-    if not pet:
+    unique_code = db.query(Device.unique_code).filter(Device.device_id == device_id).scalar()
+    alert = device_alert_cache.get(db, unique_code) if unique_code else None
+    if not alert or alert.pet_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Pet device not found"
         )
     
     return {
-        "phone_number": get_user_phone_number(pet["user_id"]),
-        "pet_status": pet["status"],
+        "phone_number": alert.phone_number,
+        "pet_status": alert.pet_status,
         "device_id": device_id
     }
 
@@ -207,9 +287,14 @@ async def update_device_status(
         )
 
     device.is_online = is_online
-    device.last_seen = datetime.utcnow()
+    if is_online:
+        device.last_seen = datetime.utcnow()
     db.commit()
     db.refresh(device)
+    if is_online:
+        device_liveness.seen(device.device_id, device.last_seen)
+    else:
+        device_liveness.mark_offline(device.device_id)
     return device
 
 
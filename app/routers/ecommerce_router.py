@@ -4,7 +4,6 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from typing import List, Annotated, Optional
 from pathlib import Path
-import shutil
 import os
 from typing import Union
 from fastapi.staticfiles import StaticFiles
@@ -24,12 +23,26 @@ from app.schemas.ecommerce_schemas import (
     PromotionCreate, PromotionResponse, DeliverySettingsCreate, DeliverySettingsResponse
 )
 from app.auth.dependencies import admin_required
+from app.services.storage import storage, StorageError
 
 router = APIRouter(
     prefix="/api/ecommerce",
     tags=["ecommerce"]
 )
 
+# Storage bucket for product images (files go through app.services.storage);
+# products saved before this used local /uploads/products URLs, which still resolve
+PRODUCT_BUCKET = os.getenv("SUPABASE_PRODUCT_BUCKET", "products")
+
+async def store_product_image(sku: str, image: UploadFile) -> str:
+    """Upload a product image and return its public URL"""
+    path = f"{sku}_{image.filename}"
+    try:
+        await storage.upload(PRODUCT_BUCKET, path, await image.read(), image.content_type, upsert=True)
+    except StorageError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to upload product image: {str(e)}")
+    return storage.public_url(PRODUCT_BUCKET, path)
+
 
 
 # Product Categories Endpoints
@@ -205,16 +218,8 @@ async def create_product_admin(
     db: Session = Depends(get_db),
     # current_user: dict = Depends(admin_required)  # Uncomment when auth is ready
 ):
-    # Ensure upload directory exists
-    upload_dir = Path("app/uploads/products")
-    upload_dir.mkdir(parents=True, exist_ok=True)
-
     # Save image
-    file_location = upload_dir / f"{sku}_{image.filename}"
-    with file_location.open("wb") as buffer:
-        shutil.copyfileobj(image.file, buffer)
-
-    image_url = f"/uploads/products/{sku}_{image.filename}"
+    image_url = await store_product_image(sku, image)
 
     # Convert empty strings to None or correct type
     discounted_price = float(discounted_price) if discounted_price not in ("", None) else None
@@ -324,12 +329,7 @@ async def update_product_admin(
 
     # Handle image upload
     if image:
-        upload_dir = Path("app/uploads/products")
-        upload_dir.mkdir(parents=True, exist_ok=True)
-        file_location = upload_dir / f"{sku}_{image.filename}"
-        with file_location.open("wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-        db_product.image_url = f"/uploads/products/{sku}_{image.filename}"
+        db_product.image_url = await store_product_image(sku, image)
 
     db.commit()
     db.refresh(db_product)
@@ -2,11 +2,11 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
 import os
 from datetime import datetime
+from app.services.storage import storage
 
 router = APIRouter(prefix="/api/files", tags=["files"])
 
-UPLOAD_DIR = "app/uploads/pet_images"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+PET_IMAGE_BUCKET = os.getenv("SUPABASE_PET_BUCKET", "pet-images")
 
 @router.post("/upload-pet-image")
 async def upload_pet_image(file: UploadFile = File(...)):
@@ -14,16 +14,14 @@ async def upload_pet_image(file: UploadFile = File(...)):
         # Generate unique filename
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{timestamp}_{file.filename.replace(' ', '_')}"
-        file_path = os.path.join(UPLOAD_DIR, filename)
         
         # Save the file
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        content = await file.read()
+        await storage.upload(PET_IMAGE_BUCKET, filename, content, file.content_type)
             
         return {
             "filename": filename,
-            "filepath": file_path,
+            "filepath": storage.public_url(PET_IMAGE_BUCKET, filename),
             "size": len(content)
         }
     
@@ -1,41 +1,35 @@
 # backend\app\routers\message_router.py
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, WebSocket
+from starlette.concurrency import run_in_threadpool
+from starlette.websockets import WebSocketState
 from sqlalchemy.orm import Session
 from datetime import datetime
-from ..models.models import Message, Conversation, User, BlockedUser
-from ..database.database import get_db
+from ..models.models import Message, Conversation, User
+from ..database.database import get_db, SessionLocal
 from fastapi import UploadFile, File
 from pathlib import Path
 import os
 from sqlalchemy import func, or_, and_
 from sqlalchemy.orm import joinedload  # Add this import
-from supabase import create_client
+from ..services.storage import storage, StorageError
+from ..services import message_history, chat_events
+from ..services.block_cache import block_cache
+from ..services.pubsub import pubsub
+import asyncio
+import json
 import uuid
 
 router = APIRouter(prefix="/api/messages", tags=["messages"])
 
-# Supabase Setup
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+# Storage bucket (files go through app.services.storage)
 SUPABASE_BUCKET = os.getenv("SUPABASE_MESSAGE_BUCKET", "messages")
 
-# Initialize Supabase client
-try:
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-    print("Supabase initialized successfully for messages")
-except Exception as e:
-    print(f"Supabase init failed for messages: {str(e)}")
-    raise RuntimeError("Supabase initialization failed for messages") from e
-
 def check_users_blocked(user1_id: int, user2_id: int, db: Session) -> bool:
     """Check if either user has blocked the other"""
-    block_exists = db.query(BlockedUser).filter(
-        or_(
-            and_(BlockedUser.blocker_id == user1_id, BlockedUser.blocked_user_id == user2_id),
-            and_(BlockedUser.blocker_id == user2_id, BlockedUser.blocked_user_id == user1_id)
-        )
-    ).first()
-    return block_exists is not None
+    return block_cache.is_blocked(db, user1_id, user2_id)
+
+def other_participant(conversation: Conversation, user_id: int) -> int:
+    return conversation.user2 if conversation.user1 == user_id else conversation.user1
 
 # @router.post("/start-conversation")
 # async def start_conversation(
@@ -187,10 +181,15 @@ async def send_message(
         )
         
         db.add(new_message)
+        db.flush()
+        message_history.record_message(db, conversation, new_message)
         db.commit()
+        chat_events.publish_message(new_message)
         
         return {"success": True, "message_id": new_message.id}
     
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
@@ -201,8 +200,15 @@ async def send_message(
 async def get_conversation_messages(
     conversation_id: int,
     user_id: int,
+    cursor: str = None,
+    limit: int = Query(message_history.DEFAULT_PAGE, ge=1, le=message_history.MAX_PAGE),
     db: Session = Depends(get_db)
 ):
+    """
+    Get one page of a conversation, oldest first
+    - Without a cursor returns the newest messages; pass back next_cursor to load older ones
+    - Received messages on the returned page are marked as read
+    """
     try:
         # Verify user is part of the conversation
         conversation = db.query(Conversation).filter(
@@ -213,22 +219,22 @@ async def get_conversation_messages(
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found or unauthorized")
         
-        # Get all messages in the conversation
-        messages = db.query(Message).filter(
-            Message.conversation_id == conversation_id
-        ).order_by(Message.timestamp.asc()).all()
-        
-        # Mark messages as read
-        db.query(Message).filter(
-            Message.conversation_id == conversation_id,
-            Message.receiver_id == user_id,
-            Message.is_read == False
-        ).update({"is_read": True})
-        db.commit()
+        try:
+            messages, next_cursor = message_history.fetch_page(db, conversation_id, cursor, limit)
+        except message_history.CursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Mark the messages on this page as read
+        unread_ids = [msg.id for msg in messages if msg.receiver_id == user_id and not msg.is_read]
+        if unread_ids:
+            message_history.mark_read(db, conversation, user_id, Message.id.in_(unread_ids))
+            db.commit()
+            chat_events.publish_read(conversation_id, user_id, other_participant(conversation, user_id), unread_ids[-1])
         
         return {
             "conversation_id": conversation_id,
             "other_user_id": conversation.user2 if conversation.user1 == user_id else conversation.user1,
+            "next_cursor": next_cursor,
             "messages": [
                 {
                     "id": msg.id,
@@ -241,10 +247,129 @@ async def get_conversation_messages(
             ]
         }
     
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/conversation/{conversation_id}/read")
+async def mark_conversation_read(
+    conversation_id: int,
+    user_id: int = Body(...),
+    up_to_message_id: int = Body(...),
+    db: Session = Depends(get_db)
+):
+    """Mark the user's received messages up to and including up_to_message_id as read"""
+    try:
+        conversation = db.query(Conversation).filter(
+            Conversation.id == conversation_id,
+            or_(Conversation.user1 == user_id, Conversation.user2 == user_id)
+        ).first()
+        
+        if not conversation:
+            raise HTTPException(status_code=404, detail="Conversation not found or unauthorized")
+        
+        message = db.query(Message).filter(
+            Message.id == up_to_message_id,
+            Message.conversation_id == conversation_id
+        ).first()
+        
+        if not message:
+            raise HTTPException(status_code=404, detail="Message not found in this conversation")
+        
+        updated = message_history.mark_read_up_to(db, conversation, user_id, message)
+        db.commit()
+        if updated:
+            chat_events.publish_read(conversation_id, user_id, other_participant(conversation, user_id), message.id)
+        
+        return {"success": True, "marked_read": updated}
+    
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+def handle_chat_event(user_id: int, event: dict, conversations: dict) -> None:
+    """Apply a typing or read event sent by user_id over their chat socket.
+
+    conversations caches conversation_id -> other participant for this socket,
+    so typing events after the first touch no tables.
+    """
+    conversation_id = event.get("conversation_id")
+    kind = event.get("type")
+    if kind not in ("typing", "read") or not isinstance(conversation_id, int):
+        raise ValueError("Expected a typing or read event with a conversation_id")
+
+    db = None
+    try:
+        if conversation_id not in conversations or kind == "read":
+            db = SessionLocal()
+            conversation = db.query(Conversation).filter(
+                Conversation.id == conversation_id,
+                or_(Conversation.user1 == user_id, Conversation.user2 == user_id)
+            ).first()
+            if not conversation:
+                raise ValueError("Conversation not found or unauthorized")
+            conversations[conversation_id] = other_participant(conversation, user_id)
+        other_user_id = conversations[conversation_id]
+
+        if kind == "typing":
+            chat_events.publish_typing(conversation_id, user_id, other_user_id, event.get("is_typing", True))
+            return
+
+        message = db.query(Message).filter(
+            Message.id == event.get("up_to_message_id"),
+            Message.conversation_id == conversation_id
+        ).first()
+        if not message:
+            raise ValueError("Message not found in this conversation")
+        if message_history.mark_read_up_to(db, conversation, user_id, message):
+            db.commit()
+            chat_events.publish_read(conversation_id, user_id, other_user_id, message.id)
+    finally:
+        if db is not None:
+            db.close()
+
+@router.websocket("/ws/{user_id}")
+async def chat_socket(websocket: WebSocket, user_id: int):
+    """
+    Live chat events for a user
+    - Receives {"type": "message" | "read" | "typing", ...} events as JSON
+    - Accepts {"type": "typing", "conversation_id", "is_typing"} and
+      {"type": "read", "conversation_id", "up_to_message_id"} from the client
+    Messages are still sent with POST /send and /send-with-image.
+    """
+    await websocket.accept()
+    subscription = pubsub.subscribe([chat_events.user_topic(user_id)])
+    conversations = {}
+
+    async def receive_events():
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                await run_in_threadpool(handle_chat_event, user_id, json.loads(raw), conversations)
+            except (ValueError, AttributeError) as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+
+    async def send_events():
+        while True:
+            event = await subscription.get()
+            await websocket.send_json(event)
+
+    tasks = [asyncio.create_task(receive_events()), asyncio.create_task(send_events())]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            error = task.exception()
+            if error is not None and websocket.client_state == WebSocketState.CONNECTED:
+                print(f"Chat socket error: {str(error)}")
+    finally:
+        subscription.close()
+
 @router.post("/upload-image")
 async def upload_message_image(
     file: UploadFile = File(...),
@@ -269,21 +394,15 @@ async def upload_message_image(
         
         # Upload to Supabase Storage
         try:
-            result = supabase.storage.from_(SUPABASE_BUCKET).upload(
-                path=filename,
-                file=content,
-                file_options={"content-type": file.content_type}
-            )
-            
-            # Get public URL
-            public_url = supabase.storage.from_(SUPABASE_BUCKET).get_public_url(filename)
+            await storage.upload(SUPABASE_BUCKET, filename, content, file.content_type)
             
             return {
                 "success": True,
-                "filename": filename
+                "filename": filename,
+                "url": storage.public_url(SUPABASE_BUCKET, filename)
             }
             
-        except Exception as supabase_error:
+        except StorageError as supabase_error:
             print(f"Supabase upload error: {str(supabase_error)}")
             raise HTTPException(status_code=500, detail=f"Failed to upload image: {str(supabase_error)}")
 
@@ -312,6 +431,10 @@ async def send_message_with_image(
         # Determine receiver_id
         receiver_id = conversation.user2 if conversation.user1 == sender_id else conversation.user1
         
+        # Check if users are blocked
+        if check_users_blocked(sender_id, receiver_id, db):
+            raise HTTPException(status_code=403, detail="Cannot send message to blocked user")
+        
         if not text and not image_url:
             raise HTTPException(status_code=400, detail="Message must have text or image")
 
@@ -326,15 +449,65 @@ async def send_message_with_image(
         )
         
         db.add(new_message)
+        db.flush()
+        message_history.record_message(db, conversation, new_message)
         db.commit()
+        chat_events.publish_message(new_message)
         
         return {"success": True, "message_id": new_message.id}
     
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
     
 
+@router.get("/inbox")
+async def get_inbox(
+    current_user_id: int,
+    cursor: str = None,
+    limit: int = Query(message_history.DEFAULT_INBOX_PAGE, ge=1, le=message_history.MAX_INBOX_PAGE),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the user's conversations with their last message and unread count,
+    most recently active first. Pass back next_cursor for the next page.
+    """
+    try:
+        try:
+            rows, next_cursor = message_history.fetch_inbox(db, current_user_id, cursor, limit)
+        except message_history.CursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        return {
+            "conversations": [
+                {
+                    "conversation_id": conv.id,
+                    "other_user": {
+                        "id": other_user.id,
+                        "name": other_user.name,
+                        "profile_picture": other_user.profile_picture
+                    },
+                    "last_message": {
+                        "id": last_message.id,
+                        "sender_id": last_message.sender_id,
+                        "text": last_message.text,
+                        "image_url": last_message.image_url,
+                        "timestamp": last_message.timestamp.isoformat()
+                    } if last_message else None,
+                    "last_activity_at": conv.last_activity_at.isoformat(),
+                    "unread_count": message_history.unread_count(conv, current_user_id)
+                } for conv, other_user, last_message in rows
+            ],
+            "next_cursor": next_cursor
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/conversations")
 async def get_user_conversations(
     current_user_id: int,
@@ -6,6 +6,7 @@ from app.models.models import UserNotification, User, Notification
 from datetime import datetime, timedelta
 from app.models import models
 from sqlalchemy import func, and_, or_
+from app.services import notification_counter, announcements
 
 
 router = APIRouter(prefix="/api/notifications", tags=["notifications"])
@@ -19,12 +20,10 @@ async def get_unread_notification_count(
     Get count of unread notifications for the user (for Navbar badge)
     """
     try:
-        count = db.query(UserNotification).filter(
-            UserNotification.user_id == user_id,
-            UserNotification.is_read == False
-        ).count()
-        
-        return {"unread_count": count}
+        return {
+            "unread_count": notification_counter.unread_count(db, user_id)
+            + announcements.unread_count(db, user_id)
+        }
         
     except Exception as e:
         raise HTTPException(
@@ -223,19 +222,28 @@ async def get_user_notifications(
             UserNotification.created_at.desc()
         ).limit(limit).all()
 
-        return {
-            "notifications": [
-                {
-                    "id": n.id,
-                    "title": n.title,
-                    "message": n.message,
-                    "is_read": n.is_read,
-                    "created_at": n.created_at.isoformat(),
-                    "type": n.notification_type
-                }
-                for n in notifications
-            ]
-        }
+        results = [
+            {
+                "id": n.id,
+                "kind": "notification",
+                "title": n.title,
+                "message": n.message,
+                "is_read": n.is_read,
+                "created_at": n.created_at.isoformat(),
+                "type": n.notification_type
+            }
+            for n in notifications
+        ]
+
+        # Announcements are system notifications stored once for everyone
+        if notification_prefs.push_notifications:
+            results.extend(
+                announcements.serialize(announcement, is_read)
+                for announcement, is_read in announcements.recent(db, user, limit)
+            )
+            results = sorted(results, key=lambda n: n["created_at"], reverse=True)[:limit]
+
+        return {"notifications": results}
         
     except Exception as e:
         raise HTTPException(
@@ -288,7 +296,12 @@ async def mark_notification_as_read(
                 detail="Notification not found"
             )
             
-        notification.is_read = True
+        # Only the request that flips is_read counts it as read
+        if db.query(models.UserNotification).filter(
+            models.UserNotification.id == notification_id,
+            models.UserNotification.is_read == False
+        ).update({"is_read": True}, synchronize_session=False):
+            notification_counter.remove_unread(db, notification.user_id)
         db.commit()
         
         return {"message": "Notification marked as read"}
@@ -318,7 +331,12 @@ async def mark_notification_as_read(
             )
             
         # Update the read status
-        notification.is_read = True
+        # Only the request that flips is_read counts it as read
+        if db.query(models.UserNotification).filter(
+            models.UserNotification.id == notification_id,
+            models.UserNotification.is_read == False
+        ).update({"is_read": True}, synchronize_session=False):
+            notification_counter.remove_unread(db, notification.user_id)
         db.commit()
         
         return {
@@ -334,6 +352,37 @@ async def mark_notification_as_read(
             detail=str(e)
         )
     
+@router.patch("/announcements/{announcement_id}/read", status_code=status.HTTP_200_OK)
+async def mark_announcement_as_read(
+    announcement_id: int,
+    user_id: int,
+    db: Session = Depends(get_db)
+):
+    """Mark an announcement, and every older one, as read for the user"""
+    try:
+        if not db.query(models.Announcement.id).filter(models.Announcement.id == announcement_id).first():
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Announcement not found"
+            )
+        announcements.mark_read_up_to(db, user_id, announcement_id)
+        db.commit()
+        
+        return {
+            "success": True,
+            "message": "Announcement marked as read",
+            "announcement_id": announcement_id
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
 # backend/app/routers/notification_router.py
 @router.patch("/mark-all-read/{user_id}")
 async def mark_all_notifications_read(
@@ -346,6 +395,8 @@ async def mark_all_notifications_read(
             UserNotification.user_id == user_id,
             UserNotification.is_read == False
         ).update({"is_read": True})
+        notification_counter.remove_unread(db, user_id, result)
+        announcements.mark_all_read(db, user_id)
         
         db.commit()
         
@@ -9,17 +9,26 @@ from sqlalchemy.orm import Session
 from app.database.database import get_db
 from app.models import models
 from fastapi.responses import JSONResponse
-from geopy.distance import geodesic  # Install with: pip install geopy
 from app.models.models import User
 from typing import Dict, Optional
 from app.models.models import PetSimilaritySearch
 from datetime import datetime
 from fastapi.staticfiles import StaticFiles
 from ..services.pet_detector import verify_pet_image
+from ..services.fingerprint_index import fingerprint_index
+from ..services.fingerprint_store import fingerprint_store
+from ..services.fingerprint_jobs import fingerprint_jobs, serialize_job
+from ..services.device_alerts import device_alert_cache
+from ..services.geofence_engine import geofence_engine
+from ..services import notification_counter
+from ..services.device_liveness import device_liveness
+from ..services.storage import storage, StorageError
+from ..services.image_pipeline import prepare_images, ImageValidationError
+from ..services import geo, location_history
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy.orm.attributes import flag_modified
 from ..models.models import Pet
-from sqlalchemy import func
+from sqlalchemy import func, or_, and_
 
 import os
 import re
@@ -27,25 +36,13 @@ import uuid
 from pathlib import Path
 from PIL import Image
 import io
-import json
 
-from supabase import create_client
 import os
 import uuid
 
-# Supabase Setup
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+# Storage bucket (files go through app.services.storage)
 SUPABASE_BUCKET = os.getenv("SUPABASE_PET_BUCKET", "pet-images")
 
-# Initialize Supabase client
-try:
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-    print("Supabase initialized successfully")
-except Exception as e:
-    print(f"Supabase init failed: {str(e)}")
-    raise RuntimeError("Supabase initialization failed") from e
-
 # === TensorFlow conditional import ===
 try:
     import tensorflow as tf
@@ -82,10 +79,38 @@ def create_notification(db: Session, user_id: int, title: str, message: str, not
         created_at=datetime.utcnow()
     )
     db.add(notification)
+    notification_counter.add_unread(db, [user_id])
     db.commit()
     db.refresh(notification)
     return notification
 
+def save_local_pet_image(pet_id: int, filename: str, content: bytes):
+    """Keep a local copy of a fingerprint angle image for background jobs to read"""
+    pet_dir = Path(UPLOAD_DIR) / str(pet_id)
+    pet_dir.mkdir(parents=True, exist_ok=True)
+    (pet_dir / filename).write_bytes(content)
+
+def refresh_fingerprint_if_generated(db: Session, pet):
+    """Queue a regeneration when an angle image of a fingerprinted pet changes"""
+    if pet.fingerprint and not fingerprint_jobs.missing_images(pet.id):
+        return fingerprint_jobs.enqueue(db, pet, pet.fingerprint.status, reason="image_updated")
+    return None
+
+MAX_HISTORY_PAGE = 5000
+MIN_GEOFENCE_RADIUS_M = 20
+MAX_GEOFENCE_RADIUS_M = 50000
+MAX_GEOFENCE_POINTS = 200
+
+def serialize_latest_location(latest):
+    if latest is None:
+        return None
+    return {
+        "location_id": latest.location_id,
+        "latitude": latest.latitude,
+        "longitude": latest.longitude,
+        "timestamp": latest.timestamp.isoformat()
+    }
+
 @router.post("/")
 async def create_pet(pet_data: dict, db: Session = Depends(get_db)):
     try:
@@ -263,6 +288,7 @@ async def get_all_devices(
     - status: filter by status (working/removed)
     - skip: pagination offset
     - limit: max number of results
+    Online/offline counts cover every device and come from the liveness monitor
     """
     try:
         query = db.query(models.Device)
@@ -275,12 +301,13 @@ async def get_all_devices(
         
         return {
             "status": "success",
+            "counts": device_liveness.counts(),
             "data": [
                 {
                     "device_id": device.device_id,
                     "unique_code": device.unique_code,
                     "is_active": device.is_active,
-                    "is_online": device.is_online,
+                    "is_online": device_liveness.is_online(device.device_id),
                     "status": device.status
                 }
                 for device in devices
@@ -296,10 +323,20 @@ async def get_all_devices(
 @router.get("/device-locations/{device_id}", status_code=200)
 async def get_device_locations(
     device_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=MAX_HISTORY_PAGE),
+    max_points: Optional[int] = Query(None, ge=2, le=MAX_HISTORY_PAGE),
+    interval_minutes: Optional[int] = Query(None, ge=1),
     db: Session = Depends(get_db)
 ):
     """
-    Get location history for a specific device
+    Get location history for a specific device, newest first
+    - start/end: time window (UTC, end exclusive)
+    - cursor/limit: page through the window; pass back next_cursor for the next page
+    - max_points and/or interval_minutes: return the whole window downsampled
+      for a map instead (default window: last 24h), e.g. max_points=500
     """
     try:
         # Verify device exists
@@ -314,9 +351,15 @@ async def get_device_locations(
             )
 
         # Get locations
-        locations = db.query(models.Location).filter(
-            models.Location.device_id == device_id
-        ).order_by(models.Location.timestamp.desc()).all()
+        if max_points or interval_minutes:
+            locations = location_history.fetch_downsampled(
+                db, device_id, start, end,
+                max_points=max_points,
+                interval_minutes=interval_minutes
+            )
+            next_cursor = None
+        else:
+            locations, next_cursor = location_history.fetch_page(db, device_id, start, end, cursor, limit)
 
         return {
             "status": "success",
@@ -328,9 +371,17 @@ async def get_device_locations(
                     "timestamp": loc.timestamp.isoformat()
                 }
                 for loc in locations
-            ]
+            ],
+            "next_cursor": next_cursor
         }
         
+    except HTTPException:
+        raise
+    except location_history.CursorError as e:
+        raise HTTPException(
+            status_code=422,
+            detail={"message": str(e)}
+        )
     except Exception as e:
         raise HTTPException(
             status_code=400,
@@ -404,6 +455,7 @@ async def pair_device_with_pet(
         
         db.commit()
         db.refresh(device)
+        device_alert_cache.invalidate_device(device.unique_code)
         
         return {
             "status": "success",
@@ -506,6 +558,8 @@ async def update_pair_device_with_pet(
         
         db.commit()
         db.refresh(new_device)
+        device_alert_cache.invalidate_pet(pet_id)
+        device_alert_cache.invalidate_device(new_device.unique_code)
         
         return {
             "status": "success",
@@ -539,18 +593,22 @@ async def get_pet_device_info(
     Get device information for a specific pet
     """
     try:
-        # Find device paired with this pet
-        device = db.query(models.Device).filter(
+        # Find device paired with this pet, with its latest position
+        row = db.query(models.Device, models.DeviceLatestLocation).outerjoin(
+            models.DeviceLatestLocation,
+            models.DeviceLatestLocation.device_id == models.Device.device_id
+        ).filter(
             models.Device.pet_id == pet_id
         ).first()
         
-        if not device:
+        if not row:
             return {
                 "status": "success",
                 "data": None,
                 "message": "No device paired with this pet"
             }
         
+        device, latest = row
         return {
             "status": "success",
             "data": {
@@ -559,7 +617,9 @@ async def get_pet_device_info(
                 "is_active": device.is_active,
                 "is_online": device.is_online,
                 "status": device.status,
-                "paired_at": device.paired_at.isoformat() if device.paired_at else None
+                "paired_at": device.paired_at.isoformat() if device.paired_at else None,
+                "last_seen": device.last_seen.isoformat() if device.last_seen else None,
+                "last_location": serialize_latest_location(latest)
             }
         }
         
@@ -617,22 +677,21 @@ async def get_pet_current_location(
     Get current location of a pet using its paired device
     """
     try:
-        # Find device paired with this pet
-        device = db.query(models.Device).filter(
+        # Find device paired with this pet and its latest position
+        row = db.query(models.Device, models.DeviceLatestLocation).outerjoin(
+            models.DeviceLatestLocation,
+            models.DeviceLatestLocation.device_id == models.Device.device_id
+        ).filter(
             models.Device.pet_id == pet_id
         ).first()
         
-        if not device:
+        if not row:
             raise HTTPException(
                 status_code=404,
                 detail={"message": "No device paired with this pet"}
             )
         
-        # Get the most recent location from xxlocation_db
-        latest_location = db.query(models.Location).filter(
-            models.Location.device_id == device.device_id
-        ).order_by(models.Location.timestamp.desc()).first()
-        
+        device, latest_location = row
         if not latest_location:
             raise HTTPException(
                 status_code=404,
@@ -642,10 +701,7 @@ async def get_pet_current_location(
         return {
             "status": "success",
             "data": {
-                "location_id": latest_location.location_id,
-                "latitude": latest_location.latitude,
-                "longitude": latest_location.longitude,
-                "timestamp": latest_location.timestamp.isoformat(),
+                **serialize_latest_location(latest_location),
                 "device_id": device.device_id,
                 "unique_code": device.unique_code
             }
@@ -659,8 +715,192 @@ async def get_pet_current_location(
             detail={"message": f"Failed to fetch current location: {str(e)}"}
         )
 
+@router.get("/user-tracked-pets/{user_id}", status_code=200)
+async def get_user_tracked_pets(
+    user_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    Get every pet of a user that has a paired device, with its latest position
+    """
+    try:
+        rows = db.query(models.Pet, models.Device, models.DeviceLatestLocation).join(
+            models.Device, models.Device.pet_id == models.Pet.id
+        ).outerjoin(
+            models.DeviceLatestLocation,
+            models.DeviceLatestLocation.device_id == models.Device.device_id
+        ).filter(
+            models.Pet.user_id == user_id
+        ).order_by(models.Pet.id).all()
+        
+        return {
+            "status": "success",
+            "data": [
+                {
+                    "pet_id": pet.id,
+                    "name": pet.name,
+                    "type": pet.type,
+                    "status": pet.status,
+                    "image": pet.image,
+                    "device_id": device.device_id,
+                    "unique_code": device.unique_code,
+                    "is_online": device.is_online,
+                    "last_seen": device.last_seen.isoformat() if device.last_seen else None,
+                    "location": serialize_latest_location(latest)
+                }
+                for pet, device, latest in rows
+            ]
+        }
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail={"message": f"Failed to fetch tracked pets: {str(e)}"}
+        )
 
 
+
+def parse_geofence(data: dict):
+    """Validate a geofence body and return the Geofence column values"""
+    name = (data.get("name") or "").strip()
+    if not name or len(name) > 100:
+        raise HTTPException(status_code=422, detail={"message": "name is required (max 100 characters)"})
+
+    def valid_point(latitude, longitude):
+        return isinstance(latitude, (int, float)) and isinstance(longitude, (int, float)) \
+            and abs(latitude) <= 90 and abs(longitude) <= 180
+
+    kind = data.get("kind")
+    if kind == "circle":
+        latitude, longitude, radius_m = data.get("latitude"), data.get("longitude"), data.get("radius_m")
+        if not valid_point(latitude, longitude):
+            raise HTTPException(status_code=422, detail={"message": "A valid latitude and longitude are required"})
+        if not isinstance(radius_m, (int, float)) or not MIN_GEOFENCE_RADIUS_M <= radius_m <= MAX_GEOFENCE_RADIUS_M:
+            raise HTTPException(
+                status_code=422,
+                detail={"message": f"radius_m must be between {MIN_GEOFENCE_RADIUS_M} and {MAX_GEOFENCE_RADIUS_M}"}
+            )
+        return {"name": name, "kind": kind, "center_latitude": latitude, "center_longitude": longitude, "radius_m": radius_m}
+    if kind == "polygon":
+        points = data.get("points")
+        if not isinstance(points, list) or not 3 <= len(points) <= MAX_GEOFENCE_POINTS:
+            raise HTTPException(
+                status_code=422,
+                detail={"message": f"points must list 3 to {MAX_GEOFENCE_POINTS} [latitude, longitude] pairs"}
+            )
+        if not all(isinstance(point, list) and len(point) == 2 and valid_point(*point) for point in points):
+            raise HTTPException(status_code=422, detail={"message": "Every point must be a valid [latitude, longitude] pair"})
+        return {"name": name, "kind": kind, "polygon": points}
+    raise HTTPException(status_code=422, detail={"message": "kind must be 'circle' or 'polygon'"})
+
+def serialize_geofence(fence):
+    return {
+        "id": fence.id,
+        "pet_id": fence.pet_id,
+        "name": fence.name,
+        "kind": fence.kind,
+        "latitude": fence.center_latitude,
+        "longitude": fence.center_longitude,
+        "radius_m": fence.radius_m,
+        "points": fence.polygon,
+        "is_active": fence.is_active,
+        "pet_inside": fence.pet_inside,
+        "state_changed_at": fence.state_changed_at.isoformat() if fence.state_changed_at else None,
+        "created_at": fence.created_at.isoformat() if fence.created_at else None
+    }
+
+@router.post("/{pet_id}/geofences", status_code=201)
+async def create_geofence(
+    pet_id: int,
+    geofence_data: dict,
+    db: Session = Depends(get_db)
+):
+    """
+    Add a geofence to a pet; its owner is notified when the pet leaves or re-enters it
+    Expects: {"name": str, "kind": "circle", "latitude": float, "longitude": float, "radius_m": float}
+          or {"name": str, "kind": "polygon", "points": [[latitude, longitude], ...]}
+    """
+    pet = db.query(models.Pet).filter(models.Pet.id == pet_id).first()
+    if not pet:
+        raise HTTPException(status_code=404, detail={"message": "Pet not found"})
+    values = parse_geofence(geofence_data)
+    try:
+        fence = models.Geofence(pet_id=pet_id, **values)
+        db.add(fence)
+        db.commit()
+        db.refresh(fence)
+        geofence_engine.load(db)
+        return {"status": "success", "data": serialize_geofence(fence)}
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail={"message": f"Failed to create geofence: {str(e)}"})
+
+@router.get("/{pet_id}/geofences", status_code=200)
+async def get_geofences(
+    pet_id: int,
+    db: Session = Depends(get_db)
+):
+    fences = db.query(models.Geofence).filter(
+        models.Geofence.pet_id == pet_id
+    ).order_by(models.Geofence.id).all()
+    return {"status": "success", "data": [serialize_geofence(fence) for fence in fences]}
+
+@router.patch("/{pet_id}/geofences/{geofence_id}", status_code=200)
+async def update_geofence(
+    pet_id: int,
+    geofence_id: int,
+    geofence_data: dict,
+    db: Session = Depends(get_db)
+):
+    """
+    Update a geofence. Send the full shape to change it, and/or {"is_active": bool}
+    """
+    fence = db.query(models.Geofence).filter(
+        models.Geofence.id == geofence_id,
+        models.Geofence.pet_id == pet_id
+    ).first()
+    if not fence:
+        raise HTTPException(status_code=404, detail={"message": "Geofence not found"})
+    if "kind" in geofence_data:
+        values = parse_geofence(geofence_data)
+        fence.center_latitude = fence.center_longitude = fence.radius_m = fence.polygon = None
+        for key, value in values.items():
+            setattr(fence, key, value)
+        # The pet's position relative to the new shape is not known yet
+        fence.pet_inside = None
+    if "is_active" in geofence_data:
+        fence.is_active = bool(geofence_data["is_active"])
+        fence.pet_inside = None
+    try:
+        db.commit()
+        db.refresh(fence)
+        geofence_engine.load(db)
+        return {"status": "success", "data": serialize_geofence(fence)}
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail={"message": f"Failed to update geofence: {str(e)}"})
+
+@router.delete("/{pet_id}/geofences/{geofence_id}", status_code=200)
+async def delete_geofence(
+    pet_id: int,
+    geofence_id: int,
+    db: Session = Depends(get_db)
+):
+    fence = db.query(models.Geofence).filter(
+        models.Geofence.id == geofence_id,
+        models.Geofence.pet_id == pet_id
+    ).first()
+    if not fence:
+        raise HTTPException(status_code=404, detail={"message": "Geofence not found"})
+    try:
+        db.delete(fence)
+        db.commit()
+        geofence_engine.load(db)
+        return {"status": "success", "message": "Geofence deleted"}
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail={"message": f"Failed to delete geofence: {str(e)}"})
+
 @router.patch("/{pet_id}/device-activation", status_code=200)
 async def toggle_device_activation(
     pet_id: int,
@@ -819,22 +1059,19 @@ async def upload_pet_image(
         content = await file.read()
 
         # ✅ Upload to Supabase
-        res = supabase.storage.from_(SUPABASE_BUCKET).upload(
-            path=path_in_bucket,
-            file=content,
-            file_options={"content-type": file.content_type, "x-upsert": "true"}
-        )
-
-        # ✅ Handle errors
-        if res.get("error"):
-            raise HTTPException(status_code=500, detail=res["error"]["message"])
+        try:
+            await storage.upload(SUPABASE_BUCKET, path_in_bucket, content, file.content_type, upsert=True)
+        except StorageError as e:
+            raise HTTPException(status_code=500, detail=str(e))
 
         # ✅ Update DB record with the full path
         latest_pet.image = path_in_bucket  # This will be "1/main.jpg"
         db.commit()
+        save_local_pet_image(pet_id, filename, content)
+        refresh_fingerprint_if_generated(db, latest_pet)
 
         # ✅ Public URL
-        public_url = f"{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET}/{path_in_bucket}"
+        public_url = storage.public_url(SUPABASE_BUCKET, path_in_bucket)
 
         return {
             "filename": filename,
@@ -892,13 +1129,13 @@ async def get_pet(pet_id: int, db: Session = Depends(get_db)):
         # Generate Supabase URL for main image
         image_url = None
         if pet.image:
-            image_url = f"{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET}/{pet.image}"
+            image_url = storage.public_url(SUPABASE_BUCKET, pet.image)
         
         # Generate URLs for additional images
         additional_image_urls = []
         if pet.additional_images:
             for img in pet.additional_images:
-                additional_image_urls.append(f"{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET}/{img}")
+                additional_image_urls.append(storage.public_url(SUPABASE_BUCKET, img))
         
         response = {
             "id": pet.id,
@@ -961,16 +1198,21 @@ async def delete_pet(
         # Delete images from Supabase if they exist
         try:
             if pet.image:
-                supabase.storage.from_(SUPABASE_BUCKET).remove([pet.image])
+                await storage.remove(SUPABASE_BUCKET, [pet.image])
             
             if pet.additional_images:
-                supabase.storage.from_(SUPABASE_BUCKET).remove(pet.additional_images)
-        except Exception as e:
+                await storage.remove(SUPABASE_BUCKET, pet.additional_images)
+        except StorageError as e:
             print(f"Warning: Failed to delete images from Supabase: {str(e)}")
         
         db.delete(pet)
         db.commit()
-        
+        device_alert_cache.invalidate_pet(pet_id)
+        if geofence_engine.has_fences(pet_id):
+            geofence_engine.load(db)
+        fingerprint_index.remove_pet(pet_id)
+        fingerprint_store.delete(pet_id)
+
         return {"message": "Pet deleted successfully"}
     except Exception as e:
         db.rollback()
@@ -1010,7 +1252,8 @@ async def update_pet_status(
         pet.status = new_status
         db.commit()
         db.refresh(pet)
-        
+        device_alert_cache.invalidate_pet(pet_id)
+
         return {
             "message": f"Status updated to {new_status}",
             "status": pet.status,
@@ -1142,10 +1385,10 @@ async def update_pet_details(
                     reason_for_adoption=health_data.get('reason_for_adoption')
                 )
                 db.add(health_info)
-        
+
         db.commit()
         db.refresh(pet)
-        
+
         return {
             "message": "Pet details updated successfully",
             "pet_id": pet.id
@@ -1237,31 +1480,30 @@ async def update_pet_image_endpoint(
         # Delete old image if exists
         if pet.image:
             try:
-                supabase.storage.from_(SUPABASE_BUCKET).remove([pet.image])
-            except:
+                await storage.remove(SUPABASE_BUCKET, [pet.image])
+            except StorageError:
                 pass  # Continue even if deletion fails
 
         # Upload new image to Supabase
         try:
-            res = supabase.storage.from_(SUPABASE_BUCKET).upload(
-                path=path_in_bucket,
-                file=content,
-                file_options={"content-type": file.content_type, "x-upsert": "true"}
-            )
-        except Exception as e:
+            await storage.upload(SUPABASE_BUCKET, path_in_bucket, content, file.content_type, upsert=True)
+        except StorageError as e:
             raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
         # Update pet record with the full path
         pet.image = path_in_bucket  # This will be "1/main.jpg"
         db.commit()
+        save_local_pet_image(pet_id, filename, content)
+        fingerprint_job = refresh_fingerprint_if_generated(db, pet)
 
-        public_url = f"{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET}/{path_in_bucket}"
+        public_url = storage.public_url(SUPABASE_BUCKET, path_in_bucket)
 
         return {
             "success": True,
             "filename": filename,
             "file_path": path_in_bucket,  # Returns "1/main.jpg"
-            "url": public_url
+            "url": public_url,
+            "fingerprint_job_id": fingerprint_job.id if fingerprint_job else None
         }
 
     except HTTPException:
@@ -1386,18 +1628,14 @@ async def add_additional_image(
         if old_filename:
             old_path_in_bucket = f"{pet_id}/{old_filename}"
             try:
-                supabase.storage.from_(SUPABASE_BUCKET).remove([old_path_in_bucket])
-            except:
+                await storage.remove(SUPABASE_BUCKET, [old_path_in_bucket])
+            except StorageError:
                 pass
 
         # Upload new image to Supabase
         try:
-            res = supabase.storage.from_(SUPABASE_BUCKET).upload(
-                path=path_in_bucket,
-                file=content,
-                file_options={"content-type": file.content_type, "x-upsert": "true"}
-            )
-        except Exception as e:
+            await storage.upload(SUPABASE_BUCKET, path_in_bucket, content, file.content_type, upsert=True)
+        except StorageError as e:
             raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
         # Update the pet's additional_images array with the filename only
@@ -1406,15 +1644,109 @@ async def add_additional_image(
         flag_modified(pet, "additional_images")
         db.commit()
         db.refresh(pet)
+        save_local_pet_image(pet_id, filename, content)
+        fingerprint_job = refresh_fingerprint_if_generated(db, pet)
 
-        public_url = f"{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET}/{path_in_bucket}"
+        public_url = storage.public_url(SUPABASE_BUCKET, path_in_bucket)
 
         return {
             "success": True,
             "filename": filename,
             "file_path": path_in_bucket,  # Returns "1/face.jpg"
             "url": public_url,
-            "all_images": pet.additional_images
+            "all_images": pet.additional_images,
+            "fingerprint_job_id": fingerprint_job.id if fingerprint_job else None
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/{pet_id}/upload-angle-images")
+async def upload_angle_images(
+    pet_id: int,
+    main: Optional[UploadFile] = File(None),
+    face: Optional[UploadFile] = File(None),
+    side: Optional[UploadFile] = File(None),
+    fur: Optional[UploadFile] = File(None),
+    db: Session = Depends(get_db)
+):
+    """Upload any of the main/face/side/fur images in one request.
+
+    Images are validated, re-encoded and uploaded concurrently, the pet is
+    updated in a single commit, and fingerprinting is queued once when all
+    four angles are available.
+    """
+    try:
+        pet = db.query(models.Pet).filter(models.Pet.id == pet_id).first()
+        if not pet:
+            raise HTTPException(status_code=404, detail="Pet not found")
+
+        angle_files = {
+            angle: file for angle, file in
+            (("main", main), ("face", face), ("side", side), ("fur", fur))
+            if file is not None
+        }
+        if not angle_files:
+            raise HTTPException(status_code=400, detail="Upload at least one of main, face, side or fur")
+
+        try:
+            images = dict(zip(angle_files, await prepare_images(list(angle_files.values()))))
+        except ImageValidationError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        paths = {angle: f"{pet_id}/{angle}.jpg" for angle in images}
+        try:
+            await storage.upload_many(
+                SUPABASE_BUCKET,
+                [(paths[angle], content, "image/jpeg") for angle, content in images.items()],
+                upsert=True
+            )
+        except StorageError as e:
+            raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+        stale_paths = []
+        if "main" in images:
+            if pet.image and pet.image != paths["main"]:
+                stale_paths.append(pet.image)
+            pet.image = paths["main"]
+        additional_images = list(pet.additional_images or [])
+        for angle in ("face", "side", "fur"):
+            if angle in images and f"{angle}.jpg" not in additional_images:
+                additional_images.append(f"{angle}.jpg")
+        pet.additional_images = additional_images
+        flag_modified(pet, "additional_images")
+        db.commit()
+        db.refresh(pet)
+
+        for angle, content in images.items():
+            save_local_pet_image(pet_id, f"{angle}.jpg", content)
+
+        # One fingerprint job for the whole batch
+        fingerprint_job = None
+        fingerprint_status = pet.fingerprint.status if pet.fingerprint else (pet.status or "").lower()
+        if fingerprint_status in ("lost", "pet i found") and not fingerprint_jobs.missing_images(pet_id):
+            fingerprint_job = fingerprint_jobs.enqueue(
+                db, pet, fingerprint_status,
+                reason="image_updated" if pet.fingerprint else "requested"
+            )
+
+        if stale_paths:
+            try:
+                await storage.remove(SUPABASE_BUCKET, stale_paths)
+            except StorageError:
+                pass  # The new images are already saved
+
+        return {
+            "success": True,
+            "images": {
+                angle: {"file_path": path, "url": storage.public_url(SUPABASE_BUCKET, path)}
+                for angle, path in paths.items()
+            },
+            "all_images": pet.additional_images,
+            "fingerprint_job_id": fingerprint_job.id if fingerprint_job else None
         }
 
     except HTTPException:
@@ -1443,8 +1775,8 @@ async def remove_additional_image(
 
         # Delete from Supabase
         try:
-            supabase.storage.from_(SUPABASE_BUCKET).remove([image_path])
-        except Exception as e:
+            await storage.remove(SUPABASE_BUCKET, [image_path])
+        except StorageError as e:
             print(f"Warning: Failed to delete from Supabase: {str(e)}")
 
         # Remove from the array
@@ -1515,8 +1847,8 @@ async def clear_additional_images(
             try:
                 # Convert filenames to full paths for Supabase deletion
                 paths_to_delete = [f"{pet_id}/{filename}" for filename in pet.additional_images]
-                supabase.storage.from_(SUPABASE_BUCKET).remove(paths_to_delete)
-            except Exception as e:
+                await storage.remove(SUPABASE_BUCKET, paths_to_delete)
+            except StorageError as e:
                 print(f"Warning: Failed to delete images from Supabase: {str(e)}")
 
         # Clear additional_images array in database but keep main image
@@ -1536,7 +1868,7 @@ async def clear_additional_images(
         raise HTTPException(status_code=500, detail=str(e))
     
 
-@router.post("/{pet_id}/generate-fingerprint")
+@router.post("/{pet_id}/generate-fingerprint", status_code=202)
 async def generate_pet_fingerprint(
     pet_id: int,
     status_data: dict = Body(...),  # Accept status in request body
@@ -1559,36 +1891,32 @@ async def generate_pet_fingerprint(
             detail="Status must be either 'lost' or 'found'"
         )
     
-    # Generate fingerprint with type and status metadata
-    result = feature_extractor.generate_fingerprint(
-        pet_id=pet_id,
-        pet_type=pet.type.lower(),
-        status=status
-    )
-    
-    if not result:
+    if fingerprint_jobs.missing_images(pet_id):
         raise HTTPException(
             status_code=400,
             detail="Missing required images (main.jpg, face.jpg, side.jpg, fur.jpg)"
         )
     
-    # Update pet record
-    pet.has_generated_fingerprint = True
-    db.commit()
-    
+    # Generation runs in the background; poll check-fingerprint with the job id
+    job = fingerprint_jobs.enqueue(db, pet, status)
+
     return {
-        "message": "Fingerprint generated successfully",
+        "message": "Fingerprint generation queued",
         "pet_id": pet_id,
-        "status": status
+        "status": status,
+        "job_id": job.id,
+        "job_status": job.status
     }
-    
+
 @router.get("/{pet_id}/check-fingerprint")
 async def check_fingerprint_exists(
     pet_id: int,
     db: Session = Depends(get_db)
 ):
-    features_path = Path(f"app/uploads/pet_images/{pet_id}/features.json")
-    return {"exists": features_path.exists()}
+    return {
+        "exists": fingerprint_store.contains(pet_id),
+        "job": serialize_job(fingerprint_jobs.latest(db, pet_id))
+    }
 
 
 
@@ -1624,7 +1952,7 @@ def get_pet_flyer_data(pet_id: int, db: Session = Depends(get_db)):
                     "date_lost": pet.date.strftime("%Y-%m-%d") if pet.date else "Unknown",
                     "last_seen": pet.address,
                     "image": image_path,  # Now returns "1/main.jpg" directly
-                    "image_url": f"{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET}/{image_path}" if image_path else None
+                    "image_url": storage.public_url(SUPABASE_BUCKET, image_path)
                 },
                 "owner": {
                     "name": getattr(owner, 'full_name', getattr(owner, 'name', 'Unknown')),
@@ -1639,6 +1967,21 @@ def get_pet_flyer_data(pet_id: int, db: Session = Depends(get_db)):
 
 
 
+def _bounding_box_filter(latitude, longitude, max_km):
+    """SQL condition keeping pets within ``max_km`` of a point (or with no coordinates)."""
+    min_lat, max_lat, min_lon, max_lon = geo.bounding_box(latitude, longitude, max_km)
+    return or_(
+        Pet.latitude.is_(None),
+        Pet.longitude.is_(None),
+        Pet.latitude == 0,
+        Pet.longitude == 0,
+        and_(
+            Pet.latitude.between(min_lat, max_lat),
+            Pet.longitude.between(min_lon, max_lon)
+        )
+    )
+
+
 @router.get("/{pet_id}/find-similar")
 async def find_similar_pets(
     pet_id: int,
@@ -1653,14 +1996,11 @@ async def find_similar_pets(
         if not source_pet:
             raise HTTPException(status_code=404, detail="Source pet not found")
             
-        source_path = Path(f"app/uploads/pet_images/{pet_id}/features.json")
-        if not source_path.exists():
+        source_fingerprint = source_pet.fingerprint
+        if not source_fingerprint:
             raise HTTPException(status_code=404, detail="Source pet fingerprint not found")
-        
-        with open(source_path) as f:
-            source_data = json.load(f)
-        
-        source_type = source_data['metadata']['type']
+
+        source_type = source_fingerprint.pet_type
         source_status = source_pet.status.lower()
 
         if source_status == "lost":
@@ -1686,67 +2026,77 @@ async def find_similar_pets(
             "no limit": float('inf')
         }
         max_km = distance_map.get(max_distance.lower(), float('inf'))
-        
-        matches = []
-        pets_dir = Path("app/uploads/pet_images")
-        
-        for pet_dir in pets_dir.iterdir():
-            if pet_dir.is_dir() and pet_dir.name != str(pet_id):
-                features_path = pet_dir / "features.json"
-                if features_path.exists():
-                    target_pet = db.query(Pet).filter(Pet.id == int(pet_dir.name)).first()
-                    if not target_pet or target_pet.user_id == source_pet.user_id:
-                        continue
-                        
-                    if target_pet.status.lower() != target_status:
-                        continue
-                        
-                    with open(features_path) as f:
-                        target_data = json.load(f)
-                    
-                    if target_data['metadata']['type'] != source_type:
-                        continue
-                        
-                    distance_km = None
-                    if source_coords and target_pet.latitude and target_pet.longitude:
-                        target_coords = (target_pet.latitude, target_pet.longitude)
-                        distance_km = geodesic(source_coords, target_coords).km
-                        if distance_km > max_km:
-                            continue
-                    
-                    similarity = feature_extractor.compare_features(
-                        source_data['features'],
-                        target_data['features'],
-                        source_type
-                    )
-                    if similarity >= threshold:
-                        user = db.query(models.User).filter(models.User.id == target_pet.user_id).first()
-                        
-                        # Generate image URL for the match
-                        image_url = None
-                        if target_pet.image:
-                            image_url = f"{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET}/{target_pet.image}"
-                        
-                        matches.append({
-                            "pet_id": target_pet.id,
-                            "name": target_pet.name,
-                            "score": float(similarity),
-                            "image_url": image_url,  # Now uses Supabase URL
-                            "distance_km": float(distance_km) if distance_km else None,
-                            "description": target_pet.description,
-                            "date": target_pet.date.isoformat() if target_pet.date else None,
-                            "status": target_pet.status,
-                            "gender": target_pet.gender,
-                            "address": target_pet.address,
-                            "user": {
-                                "id": user.id,
-                                "name": user.name,
-                                "profile_picture": user.profile_picture
-                            } if user else None
-                        })
-        
-        matches.sort(key=lambda x: x["score"], reverse=True)
-        final_matches = matches[:limit]
+
+        # One indexed query picks every candidate (opposite status, same type,
+        # different owner, inside the bounding box) together with its owner
+        candidate_query = db.query(Pet, models.User)\
+            .join(models.PetFingerprint, models.PetFingerprint.pet_id == Pet.id)\
+            .outerjoin(models.User, models.User.id == Pet.user_id)\
+            .filter(
+                models.PetFingerprint.pet_type == source_type,
+                func.lower(Pet.status) == target_status,
+                Pet.user_id != source_pet.user_id,
+                Pet.id != pet_id
+            )
+        if source_coords and max_km != float('inf'):
+            candidate_query = candidate_query.filter(
+                _bounding_box_filter(source_coords[0], source_coords[1], max_km)
+            )
+        candidates = {target_pet.id: (target_pet, user) for target_pet, user in candidate_query.all()}
+
+        # Exact distances for the whole candidate list in one vectorised pass;
+        # pets outside max_distance are dropped before they are scored
+        distances = {}
+        if source_coords:
+            located = [
+                target_pet for target_pet, _ in candidates.values()
+                if geo.has_coordinates(target_pet.latitude, target_pet.longitude)
+            ]
+            if located:
+                km = geo.haversine_km(
+                    source_coords[0], source_coords[1],
+                    [target_pet.latitude for target_pet in located],
+                    [target_pet.longitude for target_pet in located]
+                )
+                distances = dict(zip((target_pet.id for target_pet in located), km.tolist()))
+                for target_id, distance_km in distances.items():
+                    if distance_km > max_km:
+                        del candidates[target_id]
+
+        scores = fingerprint_index.score(pet_id, list(candidates))
+
+        ranked = []
+        for target_id, similarity in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+            if similarity < threshold or len(ranked) >= limit:
+                break
+            ranked.append((target_id, similarity, distances.get(target_id)))
+
+        final_matches = []
+        for match_id, similarity, distance_km in ranked:
+            target_pet, user = candidates[match_id]
+
+            # Generate image URL for the match
+            image_url = None
+            if target_pet.image:
+                image_url = storage.public_url(SUPABASE_BUCKET, target_pet.image)
+
+            final_matches.append({
+                "pet_id": target_pet.id,
+                "name": target_pet.name,
+                "score": float(similarity),
+                "image_url": image_url,  # Now uses Supabase URL
+                "distance_km": float(distance_km) if distance_km else None,
+                "description": target_pet.description,
+                "date": target_pet.date.isoformat() if target_pet.date else None,
+                "status": target_pet.status,
+                "gender": target_pet.gender,
+                "address": target_pet.address,
+                "user": {
+                    "id": user.id,
+                    "name": user.name,
+                    "profile_picture": user.profile_picture
+                } if user else None
+            })
 
         # Fixed Notification Logic (4-5 arguments only)
         for match in final_matches:
@@ -1769,6 +2119,7 @@ async def find_similar_pets(
                         related_url=f"/pets/{match['pet_id']}",
                         created_at=datetime.utcnow()
                     ))
+                    notification_counter.add_unread(db, [source_pet.user_id])
 
                 # Notify matching pet owner
                 if match["user"] and not db.query(models.UserNotification).filter(
@@ -1788,6 +2139,7 @@ async def find_similar_pets(
                         related_url=f"/pets/{pet_id}",
                         created_at=datetime.utcnow()
                     ))
+                    notification_counter.add_unread(db, [match["user"]["id"]])
 
         # Existing search logging code remains unchanged
         existing_search = db.query(PetSimilaritySearch).filter(
@@ -2339,6 +2691,8 @@ async def update_adoption_status(
             pet.updated_at = datetime.utcnow()
 
         db.commit()
+        if pet:
+            device_alert_cache.invalidate_pet(pet.id)
 
         # Notify both parties
         status_message = {
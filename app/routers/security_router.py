@@ -4,7 +4,8 @@ from datetime import datetime
 from ..models.models import User
 from ..models.models import UserReport, BlockedUser
 from ..database.database import get_db
-from sqlalchemy import and_, or_
+from sqlalchemy import and_
+from ..services.block_cache import block_cache
 from typing import Optional
 
 router = APIRouter(prefix="/api/security", tags=["security"])
@@ -107,6 +108,7 @@ async def block_user(
         
         db.add(new_block)
         db.commit()
+        block_cache.invalidate(blocker_id, blocked_user_id)
         
         return {
             "success": True,
@@ -138,6 +140,7 @@ async def unblock_user(
         
         db.delete(block)
         db.commit()
+        block_cache.invalidate(blocker_id, blocked_user_id)
         
         return {
             "success": True,
@@ -183,16 +186,11 @@ async def check_block_status(
     """Check if either user has blocked the other"""
     try:
         # Check if user1 blocked user2 or vice versa
-        block_exists = db.query(BlockedUser).filter(
-            or_(
-                and_(BlockedUser.blocker_id == user1_id, BlockedUser.blocked_user_id == user2_id),
-                and_(BlockedUser.blocker_id == user2_id, BlockedUser.blocked_user_id == user1_id)
-            )
-        ).first()
+        blocker_id = block_cache.blocker_between(db, user1_id, user2_id)
         
         return {
-            "is_blocked": block_exists is not None,
-            "blocker_id": block_exists.blocker_id if block_exists else None
+            "is_blocked": blocker_id is not None,
+            "blocker_id": blocker_id
         }
     
     except Exception as e:
@@ -4,28 +4,18 @@ from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.database.database import get_db
 from app.models import models
-from pathlib import Path
 import uuid
 import os
 from typing import List
 from datetime import datetime
-from supabase import create_client
+from app.services.storage import storage
+from app.services.image_pipeline import prepare_images, ImageValidationError
 
 router = APIRouter(prefix="/api/success-stories", tags=["success_stories"])
 
-# Supabase Setup
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+# Storage bucket (files go through app.services.storage)
 SUPABASE_BUCKET = os.getenv("SUPABASE_SUCCESS_BUCKET", "success-stories")
 
-# Initialize Supabase client
-try:
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-    print("Supabase initialized successfully for success stories")
-except Exception as e:
-    print(f"Supabase init failed: {str(e)}")
-    raise RuntimeError("Supabase initialization failed") from e
-
 @router.post("/")
 async def create_success_story(
     name: str = Form(...),
@@ -35,30 +25,17 @@ async def create_success_story(
     db: Session = Depends(get_db)
 ):
     try:
-        filenames = []
-
-        for file in files:
-            # Validate file type
-            if not file.content_type.startswith('image/'):
-                raise HTTPException(status_code=400, detail="Only images are allowed")
-
-            # Generate unique filename
-            ext = Path(file.filename).suffix.lower()
-            unique_name = f"story_{uuid.uuid4().hex}{ext}"
-            content = await file.read()
-
-            # Upload to Supabase
-            res = supabase.storage.from_(SUPABASE_BUCKET).upload(
-                path=unique_name,
-                file=content,
-                file_options={"content-type": file.content_type, "x-upsert": "true"}
-            )
-
-            # Handle errors
-            if res.get("error"):
-                raise HTTPException(status_code=500, detail=res["error"]["message"])
-
-            filenames.append(unique_name)
+        # Validate and re-encode every image in parallel, then upload them together
+        try:
+            images = await prepare_images(files)
+        except ImageValidationError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        filenames = [f"story_{uuid.uuid4().hex}.jpg" for _ in images]
+        await storage.upload_many(
+            SUPABASE_BUCKET,
+            [(filename, content, "image/jpeg") for filename, content in zip(filenames, images)]
+        )
 
         new_story = models.SuccessStory(
             name=name,
@@ -74,6 +51,8 @@ async def create_success_story(
 
         return {"message": "Success story saved", "story_id": new_story.id}
 
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error saving story: {str(e)}")
@@ -87,7 +66,7 @@ def get_success_stories(db: Session = Depends(get_db)):
         image_urls = []
         if story.image_filenames:
             for filename in story.image_filenames:
-                image_urls.append(f"{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET}/{filename}")
+                image_urls.append(storage.public_url(SUPABASE_BUCKET, filename))
         
         result.append({
             "id": story.id,
@@ -8,7 +8,9 @@ from datetime import datetime, timedelta
 import secrets
 from app.utils.email_utils import send_password_reset_email
 from app.models.models import User
-from supabase import create_client
+from app.services.storage import storage
+from app.services.device_alerts import device_alert_cache
+from app.services import notification_counter
 
 from passlib.context import CryptContext
 import os
@@ -22,25 +24,12 @@ from pathlib import Path
 router = APIRouter(prefix="/api/user", tags=["users"])  # Changed tag to plural for consistency
 logger = logging.getLogger(__name__)
 
-# Supabase Setup
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+# Storage bucket (files go through app.services.storage)
 SUPABASE_BUCKET = os.getenv("SUPABASE_BUCKET", "profile-pictures")
 
-print("SUPABASE_URL:", SUPABASE_URL)
-print("SUPABASE_KEY:", SUPABASE_KEY[:5], "...")  # Only show part for safety
-
 # In-memory rate limiting (simple alternative)
 _request_counts = {}
 
-# Initialize Supabase client
-try:
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-    logger.info("Supabase initialized successfully")
-except Exception as e:
-    logger.error(f"Supabase init failed: {str(e)}")
-    raise RuntimeError("Supabase initialization failed") from e
-
 # Profile Picture Uploads
 UPLOAD_DIR = Path("app/uploads/profile_pictures")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
@@ -57,6 +46,7 @@ def create_notification(db: Session, user_id: int, title: str, message: str, not
         created_at=datetime.utcnow()
     )
     db.add(notification)
+    notification_counter.add_unread(db, [user_id])
     db.commit()
     db.refresh(notification)
     return notification
@@ -130,7 +120,7 @@ async def get_user(user_id: int, db: Session = Depends(get_db)):
         # Only add this if condition to handle profile picture
         profile_url = None
         if user.profile_picture:
-            profile_url = f"{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET}/{user.profile_picture}"
+            profile_url = storage.public_url(SUPABASE_BUCKET, user.profile_picture)
         
         return {
             "id": user.id,
@@ -159,15 +149,11 @@ async def upload_profile_picture(
         filename = f"user_{uuid.uuid4().hex}{ext}"
         content = await file.read()
 
-        # 3. Upload to Supabase (existing code)
-        res = supabase.storage.from_(SUPABASE_BUCKET).upload(
-            path=filename,
-            file=content,
-            file_options={"content-type": file.content_type}
-        )
+        # 3. Upload to Supabase off the event loop
+        await storage.upload(SUPABASE_BUCKET, filename, content, file.content_type)
 
         # 4. Return response (same structure as before)
-        public_url = f"{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET}/{filename}"
+        public_url = storage.public_url(SUPABASE_BUCKET, filename)
         
         return {
             "filename": filename,  # Keep returning filename
@@ -189,6 +175,7 @@ async def update_user(
             raise HTTPException(status_code=404, detail="User not found")
 
         changes = []
+        phone_changed = False
         
         # Basic user info updates
         if "name" in user_data and user_data["name"] != user.name:
@@ -198,6 +185,7 @@ async def update_user(
         if "phone_number" in user_data and user_data["phone_number"] != user.phone_number:
             changes.append("Phone number updated")
             user.phone_number = user_data["phone_number"]
+            phone_changed = True
         
         if "profile_picture" in user_data:
             changes.append("Profile picture updated")
@@ -227,6 +215,8 @@ async def update_user(
 
         if changes:
             db.commit()
+            if phone_changed:
+                device_alert_cache.invalidate_owner(user_id)
             
             # Only create notification if account updates are enabled
             if not user.notification_id or (
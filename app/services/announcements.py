@@ -0,0 +1,160 @@
+"""Fan-out-on-read platform announcements.
+
+An announcement is stored once in ``xxannouncements_db``, however many
+users there are. Each user has a "read up to" watermark (the id of the
+newest announcement they read) in ``xxuser_announcement_reads_db``, created
+on their first read. A user sees the announcements posted since their
+account was created; those above the watermark are unread. Notification
+lists and the unread badge merge them in when they are read, so posting
+is one INSERT and storage does not grow with the number of users.
+
+The badge never counts rows in ``xxannouncements_db``: each process keeps
+the ids and creation times of all announcements in ``timeline``, extended
+with the rows above its newest id every ``ANNOUNCEMENT_CACHE_TTL_SECONDS``
+(and right after it publishes one). A user's unread count is then the
+cached ids above their watermark that were posted after they signed up.
+"""
+import time
+import threading
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from sqlalchemy import func, true
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.core.config import settings
+from app.models.models import Announcement, UserAnnouncementRead, User
+
+TITLE_PREFIX = "Announcement: "
+DUPLICATE_WINDOW = timedelta(minutes=30)
+
+
+class _Timeline:
+    """``(id, created_at)`` of every announcement, in id order."""
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl or settings.ANNOUNCEMENT_CACHE_TTL_SECONDS
+        self._ids = []
+        self._created = []
+        self._expires = 0
+        self._lock = threading.Lock()
+
+    def refresh(self, db, force=False):
+        """Append announcements newer than the cached ones once the TTL has passed."""
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._expires > now:
+                return
+            latest = self._ids[-1] if self._ids else 0
+            rows = db.query(Announcement.id, Announcement.created_at).filter(
+                Announcement.id > latest
+            ).order_by(Announcement.id).all()
+            self._ids.extend(row.id for row in rows)
+            self._created.extend(row.created_at for row in rows)
+            self._expires = now + self.ttl
+
+    def expire(self):
+        with self._lock:
+            self._expires = 0
+
+    def unread(self, watermark, since=None):
+        """How many cached announcements are above ``watermark`` and not older than ``since``."""
+        with self._lock:
+            start = bisect_right(self._ids, watermark)
+            if since is None:
+                return len(self._ids) - start
+            return sum(1 for created in self._created[start:] if created >= since)
+
+
+timeline = _Timeline()
+
+
+def publish(db, title, message, related_url="/announcements"):
+    """Store an announcement and commit. Returns None for a recent duplicate."""
+    message = message[:500]
+    duplicate = db.query(Announcement.id).filter(
+        Announcement.title == title,
+        Announcement.message == message,
+        Announcement.created_at >= datetime.utcnow() - DUPLICATE_WINDOW
+    ).first()
+    if duplicate:
+        return None
+    announcement = Announcement(
+        title=title,
+        message=message,
+        related_url=related_url,
+        created_at=datetime.utcnow()
+    )
+    db.add(announcement)
+    db.commit()
+    db.refresh(announcement)
+    timeline.expire()
+    return announcement
+
+
+def _visible_to(user):
+    if user.created_at is None:
+        return true()
+    return Announcement.created_at >= user.created_at
+
+
+def read_up_to(db, user_id):
+    return db.query(UserAnnouncementRead.read_up_to_id).filter(
+        UserAnnouncementRead.user_id == user_id
+    ).scalar() or 0
+
+
+def unread_count(db, user_id):
+    """Announcements the user has not read: one primary-key lookup plus ``timeline``."""
+    row = db.query(User.created_at, UserAnnouncementRead.read_up_to_id).outerjoin(
+        UserAnnouncementRead, UserAnnouncementRead.user_id == User.id
+    ).filter(User.id == user_id).first()
+    if row is None:
+        return 0
+    timeline.refresh(db)
+    return timeline.unread(row.read_up_to_id or 0, row.created_at)
+
+
+def recent(db, user, limit):
+    """The user's ``limit`` newest announcements as ``(announcement, is_read)``, newest first."""
+    watermark = read_up_to(db, user.id)
+    announcements = db.query(Announcement).filter(_visible_to(user)).order_by(
+        Announcement.created_at.desc(), Announcement.id.desc()
+    ).limit(limit).all()
+    return [(announcement, announcement.id <= watermark) for announcement in announcements]
+
+
+def serialize(announcement, is_read):
+    """Shaped like a ``UserNotification`` for the notification endpoints.
+
+    ``id`` is the announcement's own id, so it may equal a notification's;
+    clients tell the two apart by ``kind``.
+    """
+    return {
+        "id": announcement.id,
+        "kind": "announcement",
+        "announcement_id": announcement.id,
+        "title": f"{TITLE_PREFIX}{announcement.title}",
+        "message": announcement.message,
+        "is_read": is_read,
+        "created_at": announcement.created_at.isoformat(),
+        "type": "system",
+        "related_url": announcement.related_url
+    }
+
+
+def mark_read_up_to(db, user_id, announcement_id):
+    """Move the user's watermark forward to ``announcement_id``. Does not commit."""
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(UserAnnouncementRead).values(user_id=user_id, read_up_to_id=announcement_id)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[UserAnnouncementRead.user_id],
+        set_={"read_up_to_id": stmt.excluded.read_up_to_id},
+        where=UserAnnouncementRead.read_up_to_id < stmt.excluded.read_up_to_id
+    ))
+
+
+def mark_all_read(db, user_id):
+    """Mark every current announcement read. Does not commit."""
+    latest = db.query(func.max(Announcement.id)).scalar()
+    if latest:
+        mark_read_up_to(db, user_id, latest)
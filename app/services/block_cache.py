@@ -0,0 +1,83 @@
+"""In-memory block graph for the messaging hot path.
+
+Every conversation start and message send has to know whether either user
+blocked the other. ``block_cache`` keeps, per user, the set of users they
+blocked and the set that blocked them, loaded with one query the first time
+the user is checked. Later checks between that user and anyone are set
+lookups.
+
+Block and unblock endpoints (including the admin one) drop both users'
+entries after they commit. Entries also expire after
+``BLOCK_CACHE_TTL_SECONDS`` so blocks written by other processes are picked
+up eventually. Each invalidation also bumps the user's generation, so a load
+that was already running when the block changed is returned but not stored.
+"""
+import time
+import threading
+from collections import namedtuple
+from sqlalchemy import or_
+
+from app.core.config import settings
+from app.models.models import BlockedUser
+
+BlockSets = namedtuple("BlockSets", "blocked blocked_by")
+
+
+class BlockCache:
+    def __init__(self, ttl=None):
+        self.ttl = ttl or settings.BLOCK_CACHE_TTL_SECONDS
+        self._entries = {}
+        self._generations = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def get(self, db, user_id):
+        """``BlockSets`` of the ids ``user_id`` blocked and was blocked by."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > now:
+                return entry[1]
+            generation = self._generation(user_id)
+        rows = db.query(BlockedUser.blocker_id, BlockedUser.blocked_user_id).filter(
+            or_(BlockedUser.blocker_id == user_id, BlockedUser.blocked_user_id == user_id)
+        ).all()
+        sets = BlockSets(
+            frozenset(blocked for blocker, blocked in rows if blocker == user_id),
+            frozenset(blocker for blocker, blocked in rows if blocked == user_id)
+        )
+        with self._lock:
+            # An invalidate() since the query began means the rows may be stale
+            if self._generation(user_id) == generation:
+                self._entries[user_id] = (now + self.ttl, sets)
+        return sets
+
+    def _generation(self, user_id):
+        return self._epoch, self._generations.get(user_id, 0)
+
+    def blocker_between(self, db, user1_id, user2_id):
+        """Id of the user who blocked the other (user1 first), or None."""
+        sets = self.get(db, user1_id)
+        if user2_id in sets.blocked:
+            return user1_id
+        if user2_id in sets.blocked_by:
+            return user2_id
+        return None
+
+    def is_blocked(self, db, user1_id, user2_id):
+        return self.blocker_between(db, user1_id, user2_id) is not None
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+                self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+            self._epoch += 1
+
+
+block_cache = BlockCache()
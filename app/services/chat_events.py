@@ -0,0 +1,67 @@
+"""Real-time chat fan-out.
+
+Each connected chat socket subscribes to its user's topic on ``pubsub``, so
+the subscriptions are the connection registry: a user may have several
+sockets (tabs, devices) and each gets every event once. Events are plain
+dicts with a ``type``:
+
+- ``message``: a new message, sent to the receiver and the sender's other sockets
+- ``read``: the reader marked messages up to ``up_to_message_id`` read
+- ``typing``: the other participant started or stopped typing
+
+Like the location streams this reaches only sockets in this process until
+``pubsub`` is backed by a broker.
+"""
+from .pubsub import pubsub
+
+
+def user_topic(user_id):
+    return f"user:{user_id}"
+
+
+def is_connected(user_id):
+    return pubsub.subscriber_count(user_topic(user_id)) > 0
+
+
+def serialize_message(message):
+    return {
+        "id": message.id,
+        "conversation_id": message.conversation_id,
+        "sender_id": message.sender_id,
+        "receiver_id": message.receiver_id,
+        "text": message.text,
+        "image_url": message.image_url,
+        "timestamp": message.timestamp.isoformat(),
+        "is_read": message.is_read
+    }
+
+
+def publish_message(message):
+    return pubsub.publish(
+        [user_topic(message.receiver_id), user_topic(message.sender_id)],
+        {"type": "message", "conversation_id": message.conversation_id, "message": serialize_message(message)}
+    )
+
+
+def publish_read(conversation_id, reader_id, other_user_id, up_to_message_id):
+    return pubsub.publish(
+        [user_topic(other_user_id), user_topic(reader_id)],
+        {
+            "type": "read",
+            "conversation_id": conversation_id,
+            "reader_id": reader_id,
+            "up_to_message_id": up_to_message_id
+        }
+    )
+
+
+def publish_typing(conversation_id, user_id, other_user_id, is_typing):
+    return pubsub.publish(
+        [user_topic(other_user_id)],
+        {
+            "type": "typing",
+            "conversation_id": conversation_id,
+            "user_id": user_id,
+            "is_typing": bool(is_typing)
+        }
+    )
@@ -0,0 +1,93 @@
+"""Device → pet → owner alert resolution for tracker pings.
+
+A ping has to answer "is this device's pet lost, and what is the owner's
+phone number". ``device_alert_cache`` keeps that answer per ``unique_code``
+in memory, so a ping only queries the database (one joined query) the
+first time a device is seen or after its entry was invalidated.
+
+Endpoints that change the answer drop the affected entries after they
+commit: pet status changes, (re)pairing a device, deleting a pet and owner
+phone edits. Entries also expire after ``DEVICE_ALERT_TTL_SECONDS`` so
+writes from other processes are picked up eventually.
+"""
+import time
+import threading
+from collections import namedtuple
+
+from app.core.config import settings
+from app.models.models import Device, Pet, User
+
+DeviceAlert = namedtuple("DeviceAlert", "device_id unique_code pet_id owner_id pet_status phone_number")
+
+
+def device_alert_rows(db, unique_codes):
+    """``{unique_code: DeviceAlert}`` for the devices that exist."""
+    rows = db.query(
+        Device.device_id,
+        Device.unique_code,
+        Pet.id.label("pet_id"),
+        Pet.user_id.label("owner_id"),
+        Pet.status.label("pet_status"),
+        User.phone_number
+    ).outerjoin(Pet, Pet.id == Device.pet_id)\
+        .outerjoin(User, User.id == Pet.user_id)\
+        .filter(Device.unique_code.in_(unique_codes))\
+        .all()
+    return {row.unique_code: DeviceAlert(*row) for row in rows}
+
+
+def alert_status(pet_status, phone_number):
+    if pet_status == "Lost":
+        return {"status": "Lost", "phone_number": phone_number}
+    return {"status": "safe", "phone_number": None}
+
+
+class DeviceAlertCache:
+    def __init__(self, ttl=None):
+        self.ttl = ttl or settings.DEVICE_ALERT_TTL_SECONDS
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, db, unique_codes):
+        """``{unique_code: DeviceAlert}``; unknown devices are left out."""
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for code in unique_codes:
+                entry = self._entries.get(code)
+                if entry and entry[0] > now:
+                    found[code] = entry[1]
+        missing = [code for code in unique_codes if code not in found]
+        if missing:
+            loaded = device_alert_rows(db, missing)
+            expires = now + self.ttl
+            with self._lock:
+                for code, alert in loaded.items():
+                    self._entries[code] = (expires, alert)
+            found.update(loaded)
+        return found
+
+    def get(self, db, unique_code):
+        return self.get_many(db, [unique_code]).get(unique_code)
+
+    def _drop(self, matches):
+        with self._lock:
+            for code in [code for code, (_, alert) in self._entries.items() if matches(alert)]:
+                del self._entries[code]
+
+    def invalidate_device(self, unique_code):
+        with self._lock:
+            self._entries.pop(unique_code, None)
+
+    def invalidate_pet(self, pet_id):
+        self._drop(lambda alert: alert.pet_id == pet_id)
+
+    def invalidate_owner(self, user_id):
+        self._drop(lambda alert: alert.owner_id == user_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+device_alert_cache = DeviceAlertCache()
@@ -0,0 +1,139 @@
+"""Marks tracker devices offline after ``DEVICE_OFFLINE_AFTER_SECONDS`` of silence.
+
+Pings only ever set ``Device.is_online`` to True, so a tracker that died
+would show as online forever. This monitor keeps every device's
+``last_seen`` in memory together with a min-heap of offline deadlines.
+Each sweep (every ``DEVICE_SWEEP_SECONDS``) pops only the deadlines that
+have passed, skipping entries superseded by a newer ping, and flips every
+expired device in one bulk UPDATE. The UPDATE re-checks ``last_seen`` so a
+ping recorded by another worker in the meantime keeps its device online.
+
+Before popping, each sweep reads the devices whose ``last_seen`` moved
+since the previous sweep (and any newly registered ones), so every worker
+converges on the same state whichever worker received the pings. The
+online/offline counts for the admin device list come from this state.
+"""
+import heapq
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import or_, update
+
+from app.core.config import settings
+from app.database.database import SessionLocal
+from app.models.models import Device
+
+
+class DeviceLivenessMonitor:
+    def __init__(self, session_factory=SessionLocal, offline_after=None, interval=None):
+        self.session_factory = session_factory
+        self.offline_after = timedelta(seconds=offline_after or settings.DEVICE_OFFLINE_AFTER_SECONDS)
+        self.interval = interval or settings.DEVICE_SWEEP_SECONDS
+        self._last_seen = {}  # device_id -> last_seen (None if never seen)
+        self._online = set()
+        self._heap = []  # (offline deadline, device_id)
+        self._watermark = None  # newest last_seen read from the table
+        self._max_device_id = 0
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def seen(self, device_id, timestamp):
+        """Record a fix; the device is online until ``timestamp + offline_after``."""
+        with self._lock:
+            self._record(device_id, timestamp)
+
+    def _record(self, device_id, timestamp):
+        self._max_device_id = max(self._max_device_id, device_id)
+        current = self._last_seen.get(device_id)
+        if timestamp is None or (current is not None and timestamp <= current):
+            self._last_seen.setdefault(device_id, None)
+            return
+        self._last_seen[device_id] = timestamp
+        self._online.add(device_id)
+        heapq.heappush(self._heap, (timestamp + self.offline_after, device_id))
+
+    def mark_offline(self, device_id):
+        with self._lock:
+            self._online.discard(device_id)
+
+    def is_online(self, device_id):
+        return device_id in self._online
+
+    def counts(self):
+        with self._lock:
+            online = len(self._online)
+            return {"online": online, "offline": len(self._last_seen) - online}
+
+    def refresh(self, db):
+        """Pick up pings and registrations recorded by other workers."""
+        query = db.query(Device.device_id, Device.last_seen, Device.is_online)
+        first_load = self._watermark is None
+        if not first_load:
+            # Re-read a little before the watermark: write-behind flushes land late
+            since = self._watermark - self.offline_after
+            query = query.filter(or_(Device.last_seen > since, Device.device_id > self._max_device_id))
+        rows = query.all()
+        with self._lock:
+            for device_id, last_seen, is_online in rows:
+                self._record(device_id, last_seen)
+                if last_seen is None and is_online and first_load:
+                    # Flagged online but never seen: expire on the first sweep
+                    self._online.add(device_id)
+                    heapq.heappush(self._heap, (datetime.min, device_id))
+                if last_seen is not None and (self._watermark is None or last_seen > self._watermark):
+                    self._watermark = last_seen
+            if self._watermark is None:
+                self._watermark = datetime.utcnow()
+        return len(rows)
+
+    def sweep(self, now=None):
+        """Mark every device whose deadline passed offline. Returns their ids."""
+        now = now or datetime.utcnow()
+        db = self.session_factory()
+        try:
+            self.refresh(db)
+            expired = []
+            with self._lock:
+                while self._heap and self._heap[0][0] <= now:
+                    deadline, device_id = heapq.heappop(self._heap)
+                    last_seen = self._last_seen.get(device_id)
+                    if last_seen is not None and last_seen + self.offline_after != deadline:
+                        continue  # superseded by a newer ping
+                    if device_id in self._online:
+                        self._online.discard(device_id)
+                        expired.append(device_id)
+            if expired:
+                db.execute(
+                    update(Device)
+                    .where(
+                        Device.device_id.in_(expired),
+                        or_(Device.last_seen.is_(None), Device.last_seen <= now - self.offline_after)
+                    )
+                    .values(is_online=False)
+                )
+                db.commit()
+            return expired
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Device liveness sweep failed: {str(e)}")
+
+    def start(self):
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="device-liveness", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
+
+
+device_liveness = DeviceLivenessMonitor()
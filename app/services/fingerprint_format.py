@@ -0,0 +1,132 @@
+"""Binary on-disk format for pet fingerprints.
+
+A fingerprint file is a fixed 64-byte little-endian header followed by one
+float32 row per angle (``main``, ``face``, ``side``, ``fur``)::
+
+    magic   4s   b"PFP1"
+    version H
+    angles  H    number of rows that follow
+    dim     I    bins per row (768 for an RGB histogram)
+    pet_id  q
+    created d    generated_at as a POSIX timestamp
+    type    8s   "dog" / "cat", NUL padded
+    status  16s  "lost" / "pet i found", NUL padded
+    (12 bytes padding)
+
+It replaces the indented ``features.json`` files: 12KB per pet instead
+of ~90KB of JSON text, and no parsing on read.
+"""
+import os
+import json
+import struct
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+
+FINGERPRINT_FILENAME = "fingerprint.bin"
+LEGACY_FILENAME = "features.json"
+ANGLES = ['main', 'face', 'side', 'fur']
+
+MAGIC = b"PFP1"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIqd8s16s12x")
+DTYPE = np.dtype("<f4")
+
+
+def fingerprint_path(pet_dir):
+    return Path(pet_dir) / FINGERPRINT_FILENAME
+
+
+def find_fingerprint_file(pet_dir):
+    """Path of the pet's fingerprint, preferring the binary file over legacy JSON."""
+    pet_dir = Path(pet_dir)
+    for name in (FINGERPRINT_FILENAME, LEGACY_FILENAME):
+        path = pet_dir / name
+        if path.exists():
+            return path
+    return None
+
+
+def write_fingerprint(path, pet_id, pet_type, status, features, generated_at=None):
+    """Write ``features`` (angle -> vector) atomically to ``path``."""
+    generated_at = generated_at or datetime.now()
+    rows = np.stack([np.asarray(features[angle], dtype=DTYPE) for angle in ANGLES])
+    header = HEADER.pack(
+        MAGIC, VERSION, len(ANGLES), rows.shape[1], int(pet_id),
+        generated_at.timestamp(),
+        pet_type.lower().encode()[:8],
+        status.lower().encode()[:16]
+    )
+    path = Path(path)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(rows.tobytes())
+    os.replace(tmp_path, path)
+    return path
+
+
+def _unpack_header(raw, path):
+    magic, version, angles, dim, pet_id, created, pet_type, status = HEADER.unpack(raw)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} fingerprint file")
+    metadata = {
+        'type': pet_type.rstrip(b"\0").decode(),
+        'status': status.rstrip(b"\0").decode(),
+        'generated_at': datetime.fromtimestamp(created).isoformat(),
+        'pet_id': pet_id
+    }
+    return metadata, angles, dim
+
+
+def read_fingerprint(path, mmap=True):
+    """Read a fingerprint file as ``{'metadata': ..., 'features': ...}``.
+
+    With ``mmap`` the vectors are a read-only ``np.memmap`` view of the file.
+    Bulk scans should pass ``mmap=False``: every live memmap pins a file
+    descriptor, and a 12KB read is as cheap as mapping it.
+    """
+    with open(path, "rb") as f:
+        metadata, angles, dim = _unpack_header(f.read(HEADER.size), path)
+        if mmap:
+            rows = np.memmap(f, dtype=DTYPE, mode="r", offset=HEADER.size, shape=(angles, dim))
+        else:
+            rows = np.fromfile(f, dtype=DTYPE, count=angles * dim).reshape(angles, dim)
+    return {
+        'metadata': metadata,
+        'features': {angle: rows[i] for i, angle in enumerate(ANGLES[:angles])}
+    }
+
+
+def read_any(path, mmap=True):
+    """Read a binary fingerprint, or a features.json not yet migrated."""
+    path = Path(path)
+    if path.suffix == ".json":
+        with open(path) as f:
+            return json.load(f)
+    return read_fingerprint(path, mmap=mmap)
+
+
+def migrate_legacy_file(pet_dir, remove_legacy=False):
+    """Convert ``pet_dir/features.json`` to the binary format.
+
+    Returns the new path, or None when there was nothing to convert.
+    """
+    pet_dir = Path(pet_dir)
+    legacy_path = pet_dir / LEGACY_FILENAME
+    if not legacy_path.exists():
+        return None
+    with open(legacy_path) as f:
+        data = json.load(f)
+    metadata = data['metadata']
+    path = write_fingerprint(
+        pet_dir / FINGERPRINT_FILENAME,
+        metadata['pet_id'],
+        metadata['type'],
+        metadata['status'],
+        data['features'],
+        generated_at=datetime.fromisoformat(metadata['generated_at'])
+    )
+    if remove_legacy:
+        legacy_path.unlink()
+    return path
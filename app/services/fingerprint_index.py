@@ -0,0 +1,159 @@
+import threading
+import numpy as np
+
+from .pet_feature_extractor import PetFeatureExtractor
+
+ANGLES = ['main', 'face', 'side', 'fur']
+
+
+class _TypeBlock:
+    """Fingerprints of a single pet type, one contiguous float32 matrix per angle.
+
+    Rows are L2-normalised on insert so a cosine similarity is a plain dot
+    product.
+    """
+
+    def __init__(self, dim, capacity=64):
+        self.dim = dim
+        self.size = 0
+        self.matrices = {angle: np.zeros((capacity, dim), dtype=np.float32) for angle in ANGLES}
+        self.pet_ids = np.zeros(capacity, dtype=np.int64)
+        self.rows = {}  # pet_id -> row
+
+    def _grow(self):
+        capacity = max(64, len(self.pet_ids) * 2)
+        for angle in ANGLES:
+            grown = np.zeros((capacity, self.dim), dtype=np.float32)
+            grown[:self.size] = self.matrices[angle][:self.size]
+            self.matrices[angle] = grown
+        pet_ids = np.zeros(capacity, dtype=np.int64)
+        pet_ids[:self.size] = self.pet_ids[:self.size]
+        self.pet_ids = pet_ids
+
+    def upsert(self, pet_id, vectors):
+        row = self.rows.get(pet_id)
+        if row is None:
+            if self.size == len(self.pet_ids):
+                self._grow()
+            row = self.size
+            self.size += 1
+            self.rows[pet_id] = row
+        for angle in ANGLES:
+            self.matrices[angle][row] = vectors[angle]
+        self.pet_ids[row] = pet_id
+
+    def remove(self, pet_id):
+        row = self.rows.pop(pet_id, None)
+        if row is None:
+            return
+        last = self.size - 1
+        if row != last:
+            # Swap the last row into the hole to keep the matrix dense
+            moved_id = int(self.pet_ids[last])
+            for angle in ANGLES:
+                self.matrices[angle][row] = self.matrices[angle][last]
+            self.pet_ids[row] = moved_id
+            self.rows[moved_id] = row
+        self.size = last
+
+
+class FingerprintIndex:
+    """Process-resident copy of every fingerprint, grouped by pet type.
+
+    Built once at startup from the fingerprint store and kept up to date by
+    the fingerprint and delete endpoints. Which pets are worth comparing is
+    decided in SQL (see ``PetFingerprint``); the index only scores a
+    candidate list against the source pet in one weighted-cosine pass.
+    """
+
+    def __init__(self):
+        self.extractor = PetFeatureExtractor()
+        self.blocks = {}
+        self.pet_types = {}  # pet_id -> type
+        self.store_rows = {}  # pet_id -> store row the indexed vectors came from
+        self.lock = threading.RLock()
+
+    def _upsert_locked(self, pet_id, pet_type, features, store_row=None):
+        if any(angle not in features for angle in ANGLES):
+            return False
+        vectors = {angle: self.extractor.normalize_features(features[angle]) for angle in ANGLES}
+        previous_type = self.pet_types.get(pet_id)
+        if previous_type is not None and previous_type != pet_type:
+            self.blocks[previous_type].remove(pet_id)
+        block = self.blocks.get(pet_type)
+        if block is None:
+            block = self.blocks[pet_type] = _TypeBlock(len(vectors['main']))
+        block.upsert(pet_id, vectors)
+        self.pet_types[pet_id] = pet_type
+        self.store_rows[pet_id] = store_row
+        return True
+
+    def rebuild(self):
+        """Reload every fingerprint from the store."""
+        store = self.extractor.store
+        store.refresh()
+        with self.lock:
+            self.blocks = {}
+            self.pet_types = {}
+            self.store_rows = {}
+            for pet_id in list(store.entries):
+                data = store.get(pet_id)
+                self._upsert_locked(pet_id, data['metadata']['type'], data['features'], data['row'])
+        print(f"Fingerprint index built with {len(self.pet_types)} pets")
+        return len(self.pet_types)
+
+    def add_pet(self, pet_id):
+        """Index the stored fingerprint of ``pet_id``; False if it has none."""
+        data = self.extractor.store.get(pet_id)
+        if data is None:
+            return False
+        with self.lock:
+            return self._upsert_locked(pet_id, data['metadata']['type'], data['features'], data['row'])
+
+    def remove_pet(self, pet_id):
+        with self.lock:
+            pet_type = self.pet_types.pop(pet_id, None)
+            self.store_rows.pop(pet_id, None)
+            if pet_type is not None:
+                self.blocks[pet_type].remove(pet_id)
+
+    def contains(self, pet_id):
+        return pet_id in self.pet_types
+
+    def score(self, pet_id, candidate_ids):
+        """Weighted cosine similarity of ``pet_id`` against ``candidate_ids``.
+
+        Fingerprints written or regenerated by another process since they
+        were indexed are reloaded from the store first. Returns
+        ``{candidate_id: score}`` for the candidates that share the source
+        pet's type.
+        """
+        store = self.extractor.store
+        store.refresh()
+        for i in [pet_id, *candidate_ids]:
+            entry = store.entries.get(i)
+            if entry is None:
+                if i in self.pet_types:
+                    self.remove_pet(i)
+            elif self.store_rows.get(i) != entry['row']:
+                self.add_pet(i)
+
+        with self.lock:
+            pet_type = self.pet_types.get(pet_id)
+            if pet_type is None:
+                return {}
+            block = self.blocks[pet_type]
+            rows = np.array(
+                [block.rows[i] for i in candidate_ids if i in block.rows and i != pet_id],
+                dtype=np.int64
+            )
+            if len(rows) == 0:
+                return {}
+            source_row = block.rows[pet_id]
+            candidates = {angle: block.matrices[angle][rows] for angle in ANGLES}
+            query = {angle: block.matrices[angle][source_row] for angle in ANGLES}
+            scores = self.extractor.compare_features_batch(query, candidates, pet_type)
+            return dict(zip(block.pet_ids[rows].tolist(), scores.tolist()))
+
+
+fingerprint_index = FingerprintIndex()
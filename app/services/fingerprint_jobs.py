@@ -0,0 +1,225 @@
+"""Background fingerprint generation.
+
+Decoding, resizing and histogramming four photos is slow enough to stall
+the event loop, so the endpoints only record a ``FingerprintJob`` row and
+hand its id to a local process pool. The pool process claims the job,
+writes the vectors to the fingerprint store (its flock makes that safe from
+any process) and records the outcome on the job row; the API process then
+refreshes its in-memory index. On startup, queued jobs and jobs stuck
+running for longer than ``FINGERPRINT_JOB_TIMEOUT_SECONDS`` are submitted
+again; the conditional claim in ``_run_job`` makes sure only one process
+runs each job, even while other API processes are still up.
+"""
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+
+from app.core.config import settings
+from app.database.database import SessionLocal, engine
+from app.models import models
+from .fingerprint_index import fingerprint_index
+from .pet_feature_extractor import PetFeatureExtractor
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+_extractor = None
+
+
+def _init_worker():
+    # Never reuse pooled connections of the parent (a no-op in a fresh spawned process)
+    engine.dispose(close=False)
+
+
+def _run_job(job_id):
+    """Generate the fingerprint for one job. Runs in a pool process.
+
+    Returns the pet id on success so the API process can re-index it.
+    """
+    global _extractor
+    if _extractor is None:
+        _extractor = PetFeatureExtractor()
+
+    db = SessionLocal()
+    try:
+        # Claim the job; another worker may already have run it
+        claimed = db.query(models.FingerprintJob).filter(
+            models.FingerprintJob.id == job_id,
+            models.FingerprintJob.status == QUEUED
+        ).update({"status": RUNNING, "started_at": datetime.utcnow()}, synchronize_session=False)
+        db.commit()
+        if not claimed:
+            return None
+
+        job = db.query(models.FingerprintJob).filter(models.FingerprintJob.id == job_id).first()
+        pet = db.query(models.Pet).filter(models.Pet.id == job.pet_id).first()
+        if not pet:
+            _finish(db, job, FAILED, "Pet not found")
+            return None
+
+        result = _extractor.generate_fingerprint(
+            pet_id=pet.id,
+            pet_type=pet.type.lower(),
+            status=job.pet_status
+        )
+        if not result:
+            missing = ", ".join(_extractor.missing_images(pet.id))
+            _finish(db, job, FAILED, f"Missing required images: {missing}")
+            return None
+
+        pet.has_generated_fingerprint = True
+        fingerprint = pet.fingerprint or models.PetFingerprint(pet_id=pet.id)
+        fingerprint.pet_type = result['type']
+        fingerprint.status = result['status']
+        fingerprint.generated_at = datetime.fromisoformat(result['generated_at'])
+        db.add(fingerprint)
+        _finish(db, job, COMPLETED)
+        return pet.id
+    except Exception as e:
+        db.rollback()
+        _mark_failed(db, job_id, str(e))
+        raise
+    finally:
+        db.close()
+
+
+def _finish(db, job, status, error=None):
+    job.status = status
+    job.error = error
+    job.finished_at = datetime.utcnow()
+    db.commit()
+
+
+def _mark_failed(db, job_id, error):
+    db.query(models.FingerprintJob).filter(
+        models.FingerprintJob.id == job_id,
+        models.FingerprintJob.status.in_([QUEUED, RUNNING])
+    ).update({"status": FAILED, "error": error, "finished_at": datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+
+
+class FingerprintJobQueue:
+    def __init__(self, workers=None):
+        self.workers = workers or settings.FINGERPRINT_WORKERS
+        self.extractor = PetFeatureExtractor()
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # Spawn rather than fork: the API process already runs threads
+                # (storage pool, location flusher, liveness sweeper) whose held
+                # locks a forked child would inherit and deadlock on
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _submit(self, job_id):
+        future = self._executor().submit(_run_job, job_id)
+        future.add_done_callback(lambda done: self._on_done(job_id, done))
+
+    def _on_done(self, job_id, future):
+        if future.cancelled():
+            return
+        try:
+            pet_id = future.result()
+        except Exception as e:
+            print(f"Fingerprint job {job_id} failed: {str(e)}")
+            # The pool itself may have died before the job could record this
+            db = SessionLocal()
+            try:
+                _mark_failed(db, job_id, str(e))
+            finally:
+                db.close()
+            return
+        if pet_id is not None:
+            fingerprint_index.add_pet(pet_id)
+
+    def missing_images(self, pet_id):
+        """Angles without a local image; a job for such a pet would fail."""
+        return self.extractor.missing_images(pet_id)
+
+    def enqueue(self, db, pet, pet_status, reason="requested"):
+        """Queue fingerprint generation for ``pet`` and return its job.
+
+        A job for the same pet that has not started yet is reused; it reads
+        the images when it runs, so it will pick up the latest upload.
+        """
+        pending = db.query(models.FingerprintJob).filter(
+            models.FingerprintJob.pet_id == pet.id,
+            models.FingerprintJob.status == QUEUED
+        ).order_by(models.FingerprintJob.id.desc()).first()
+        if pending:
+            reused = db.query(models.FingerprintJob).filter(
+                models.FingerprintJob.id == pending.id,
+                models.FingerprintJob.status == QUEUED
+            ).update({"pet_status": pet_status}, synchronize_session=False)
+            db.commit()
+            if reused:
+                db.refresh(pending)
+                return pending
+
+        job = models.FingerprintJob(pet_id=pet.id, pet_status=pet_status, status=QUEUED, reason=reason)
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        self._submit(job.id)
+        return job
+
+    def latest(self, db, pet_id):
+        return db.query(models.FingerprintJob).filter(
+            models.FingerprintJob.pet_id == pet_id
+        ).order_by(models.FingerprintJob.id.desc()).first()
+
+    def resume(self, db, timeout=None):
+        """Resubmit queued jobs and jobs stuck running past ``timeout`` seconds. Returns how many.
+
+        Jobs another live process started recently are left alone.
+        """
+        timeout = timedelta(seconds=timeout or settings.FINGERPRINT_JOB_TIMEOUT_SECONDS)
+        db.query(models.FingerprintJob).filter(
+            models.FingerprintJob.status == RUNNING,
+            or_(
+                models.FingerprintJob.started_at.is_(None),
+                models.FingerprintJob.started_at < datetime.utcnow() - timeout
+            )
+        ).update({"status": QUEUED, "started_at": None}, synchronize_session=False)
+        db.commit()
+        job_ids = [job_id for (job_id,) in db.query(models.FingerprintJob.id).filter(
+            models.FingerprintJob.status == QUEUED
+        ).order_by(models.FingerprintJob.id)]
+        for job_id in job_ids:
+            self._submit(job_id)
+        return len(job_ids)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                # Unstarted jobs stay queued in the table and resume next startup
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+def serialize_job(job):
+    if job is None:
+        return None
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "reason": job.reason,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
+
+
+fingerprint_jobs = FingerprintJobQueue()
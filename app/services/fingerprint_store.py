@@ -0,0 +1,290 @@
+"""Catalog-wide, append-only fingerprint store.
+
+All fingerprints live in one data file of fixed-size records (four
+L2-normalised float32 rows per pet) that readers memory-map, so every
+uvicorn worker shares the same pages through the OS page cache. A JSON-lines
+sidecar log maps pet_id to row, type, status and generated_at:
+
+    {"op": "open", "data": "fingerprints-1.dat", "dim": 768}
+    {"op": "put", "pet_id": 7, "row": 0, "type": "dog", ...}
+    {"op": "del", "pet_id": 7}
+
+A re-generated fingerprint appends a new record and a ``put`` that
+supersedes the old row; a deleted pet gets a ``del`` tombstone. Dead rows
+are only reclaimed by ``compact()``, which writes a new data file and swaps
+the log in one rename. Writers serialise on an flock so several workers
+can append safely; readers pick up other workers' appends on ``refresh()``.
+"""
+import os
+import json
+import fcntl
+import threading
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+
+from .fingerprint_format import ANGLES, DTYPE
+
+STORE_DIR = "app/uploads/fingerprints"
+DEFAULT_DIM = 768
+
+
+class FingerprintStore:
+    def __init__(self, directory=STORE_DIR, dim=DEFAULT_DIM):
+        self.directory = Path(directory)
+        self.log_path = self.directory / "fingerprints.idx"
+        self.lock_path = self.directory / "fingerprints.lock"
+        self.dim = dim
+        self.entries = {}  # pet_id -> {'row', 'type', 'status', 'generated_at'}
+        self.data_path = None
+        self._log_inode = None
+        self._log_offset = 0
+        self._matrix = None
+        self._thread_lock = threading.RLock()
+
+    @property
+    def record_bytes(self):
+        return len(ANGLES) * self.dim * DTYPE.itemsize
+
+    # --- locking -----------------------------------------------------------
+
+    def _file_lock(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        lock_file = open(self.lock_path, "a")
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    @staticmethod
+    def _release(lock_file):
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+
+    # --- reading the sidecar log -------------------------------------------
+
+    def _reset(self):
+        self.entries = {}
+        self.data_path = None
+        self._log_inode = None
+        self._log_offset = 0
+        self._matrix = None
+
+    def _apply(self, record):
+        op = record['op']
+        if op == 'open':
+            self.data_path = self.directory / record['data']
+            self.dim = record['dim']
+            self._matrix = None
+        elif op == 'put':
+            self.entries[record['pet_id']] = {
+                'row': record['row'],
+                'type': record['type'],
+                'status': record['status'],
+                'generated_at': record['generated_at']
+            }
+        elif op == 'del':
+            self.entries.pop(record['pet_id'], None)
+
+    def refresh(self):
+        """Apply log records appended since the last call (by any worker)."""
+        with self._thread_lock:
+            try:
+                stat = os.stat(self.log_path)
+            except FileNotFoundError:
+                self._reset()
+                return
+            if stat.st_ino != self._log_inode:
+                # First open, or the log was swapped by a compaction
+                self._reset()
+                self._log_inode = stat.st_ino
+            if stat.st_size == self._log_offset:
+                return
+            with open(self.log_path, "rb") as f:
+                f.seek(self._log_offset)
+                chunk = f.read()
+            # Ignore a trailing partial line; it is picked up once complete
+            complete = chunk[:chunk.rfind(b"\n") + 1]
+            for line in complete.splitlines():
+                if line.strip():
+                    self._apply(json.loads(line))
+            self._log_offset += len(complete)
+
+    def _rows_on_disk(self):
+        if self.data_path is None or not self.data_path.exists():
+            return 0
+        return self.data_path.stat().st_size // self.record_bytes
+
+    def _mapped(self):
+        """Read-only (rows, angles, dim) memmap over the whole data file."""
+        rows = self._rows_on_disk()
+        if self._matrix is None or len(self._matrix) < rows:
+            self._matrix = np.memmap(
+                self.data_path, dtype=DTYPE, mode="r",
+                shape=(rows, len(ANGLES), self.dim)
+            ) if rows else np.zeros((0, len(ANGLES), self.dim), dtype=DTYPE)
+        return self._matrix
+
+    # --- writing -----------------------------------------------------------
+
+    def _append_log(self, records):
+        with open(self.log_path, "ab") as f:
+            for record in records:
+                f.write(json.dumps(record).encode() + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _ensure_open_locked(self):
+        self.refresh()
+        if self.data_path is None:
+            data_name = "fingerprints-1.dat"
+            (self.directory / data_name).touch()
+            self._append_log([{'op': 'open', 'data': data_name, 'dim': self.dim}])
+            self.refresh()
+
+    def put(self, pet_id, pet_type, status, features, generated_at=None):
+        """Append a fingerprint, superseding any earlier row for ``pet_id``."""
+        vectors = np.asarray([features[angle] for angle in ANGLES], dtype=DTYPE)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        record = (vectors / norms).astype(DTYPE)
+
+        lock_file = self._file_lock()
+        try:
+            with self._thread_lock:
+                self._ensure_open_locked()
+                with open(self.data_path, "r+b") as f:
+                    size = f.seek(0, os.SEEK_END)
+                    row, torn = divmod(size, self.record_bytes)
+                    if torn:
+                        # Drop a record torn by a crash mid-write
+                        f.truncate(row * self.record_bytes)
+                        f.seek(row * self.record_bytes)
+                    f.write(record.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                entry = {
+                    'op': 'put',
+                    'pet_id': int(pet_id),
+                    'row': row,
+                    'type': pet_type.lower(),
+                    'status': status.lower(),
+                    'generated_at': (generated_at or datetime.now()).isoformat()
+                }
+                self._append_log([entry])
+                self.refresh()
+                return self.entries[int(pet_id)]
+        finally:
+            self._release(lock_file)
+
+    def delete(self, pet_id):
+        """Tombstone ``pet_id``; its row stays on disk until compaction."""
+        self.refresh()
+        if pet_id not in self.entries:
+            return False
+        lock_file = self._file_lock()
+        try:
+            with self._thread_lock:
+                self._append_log([{'op': 'del', 'pet_id': int(pet_id)}])
+                self.refresh()
+                return True
+        finally:
+            self._release(lock_file)
+
+    def compact(self):
+        """Rewrite the data file with live rows only. Run with the API stopped.
+
+        Returns ``(rows_before, rows_after)``.
+        """
+        lock_file = self._file_lock()
+        try:
+            with self._thread_lock:
+                self.refresh()
+                if self.data_path is None:
+                    return 0, 0
+                old_data_path = self.data_path
+                rows_before = self._rows_on_disk()
+                matrix = self._mapped()
+                generation = int(old_data_path.stem.rsplit("-", 1)[1]) + 1
+                new_name = f"fingerprints-{generation}.dat"
+                new_log = self.log_path.with_suffix(".idx.compact")
+
+                live = sorted(self.entries.items(), key=lambda item: item[1]['row'])
+                records = [{'op': 'open', 'data': new_name, 'dim': self.dim}]
+                with open(self.directory / new_name, "wb") as f:
+                    for new_row, (pet_id, entry) in enumerate(live):
+                        f.write(np.ascontiguousarray(matrix[entry['row']]).tobytes())
+                        records.append({'op': 'put', 'pet_id': pet_id, 'row': new_row, **{
+                            key: entry[key] for key in ('type', 'status', 'generated_at')
+                        }})
+                    f.flush()
+                    os.fsync(f.fileno())
+                with open(new_log, "wb") as f:
+                    for record in records:
+                        f.write(json.dumps(record).encode() + b"\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                # The log rename is the commit point; the old data file is then garbage
+                os.replace(new_log, self.log_path)
+                self._reset()
+                self.refresh()
+                old_data_path.unlink()
+                return rows_before, len(live)
+        finally:
+            self._release(lock_file)
+
+    # --- queries -----------------------------------------------------------
+
+    def contains(self, pet_id):
+        self.refresh()
+        return pet_id in self.entries
+
+    def metadata(self, pet_id):
+        entry = self.entries.get(pet_id)
+        if entry is None:
+            return None
+        return {
+            'type': entry['type'],
+            'status': entry['status'],
+            'generated_at': entry['generated_at'],
+            'pet_id': pet_id
+        }
+
+    def get(self, pet_id):
+        """Fingerprint of one pet as ``{'metadata', 'features', 'row'}``; features are views."""
+        with self._thread_lock:
+            self.refresh()
+            entry = self.entries.get(pet_id)
+            if entry is None:
+                return None
+            rows = self._mapped()[entry['row']]
+            return {
+                'metadata': self.metadata(pet_id),
+                'features': {angle: rows[i] for i, angle in enumerate(ANGLES)},
+                'row': entry['row']
+            }
+
+    def list_metadata(self):
+        self.refresh()
+        return [self.metadata(pet_id) for pet_id in self.entries]
+
+    def live_rows(self, pet_type=None):
+        """Live ``(pet_ids, rows, statuses)`` arrays, optionally for one type."""
+        with self._thread_lock:
+            self.refresh()
+            items = [
+                (pet_id, entry['row'], entry['status'])
+                for pet_id, entry in self.entries.items()
+                if pet_type is None or entry['type'] == pet_type
+            ]
+        pet_ids = np.array([item[0] for item in items], dtype=np.int64)
+        rows = np.array([item[1] for item in items], dtype=np.int64)
+        statuses = [item[2] for item in items]
+        return pet_ids, rows, statuses
+
+    def angle_vectors(self, rows):
+        """Map each angle to the (len(rows), dim) normalised vectors of ``rows``."""
+        with self._thread_lock:
+            matrix = self._mapped()
+            return {angle: matrix[rows, i] for i, angle in enumerate(ANGLES)}
+
+
+fingerprint_store = FingerprintStore()
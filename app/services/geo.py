@@ -0,0 +1,68 @@
+"""Distance helpers for location-bounded pet matching.
+
+``bounding_box`` gives a cheap lat/lon window that SQL can answer from the
+``ix_xxpets_db_lat_lon`` index; ``haversine_km`` then computes exact
+great-circle distances for the rows that survive, all at once over NumPy
+arrays instead of one ``geodesic`` call per pet. ``haversine_pairs_km`` and
+``points_in_polygon`` do the same for many points at once, for geofences.
+"""
+import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 110.574
+KM_PER_DEGREE_LON = 111.320
+
+
+def has_coordinates(latitude, longitude):
+    """Pets saved without a location have NULL or 0 coordinates."""
+    return bool(latitude and longitude)
+
+
+def bounding_box(latitude, longitude, max_km):
+    """``(min_lat, max_lat, min_lon, max_lon)`` covering every point within ``max_km``.
+
+    The box is padded by 1% so rounding never drops a pet the exact check
+    would keep.
+    """
+    lat_delta = max_km / KM_PER_DEGREE_LAT * 1.01
+    lon_delta = max_km / (KM_PER_DEGREE_LON * max(math.cos(math.radians(latitude)), 0.01)) * 1.01
+    return (
+        latitude - lat_delta,
+        latitude + lat_delta,
+        longitude - lon_delta,
+        longitude + lon_delta
+    )
+
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """Great-circle distance in km from one point to arrays of points."""
+    return haversine_pairs_km(latitude, longitude, latitudes, longitudes)
+
+
+def haversine_pairs_km(lats1, lons1, lats2, lons2):
+    """Element-wise great-circle distance in km between two (broadcastable) arrays of points."""
+    lat1 = np.radians(np.asarray(lats1, dtype=np.float64))
+    lat2 = np.radians(np.asarray(lats2, dtype=np.float64))
+    dlat = lat2 - lat1
+    dlon = np.radians(np.asarray(lons2, dtype=np.float64)) - np.radians(np.asarray(lons1, dtype=np.float64))
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def points_in_polygon(latitudes, longitudes, polygon_lats, polygon_lons):
+    """Boolean array: which points fall inside the polygon (even-odd ray casting).
+
+    Tests every point against every edge at once; fine for the small,
+    city-scale polygons used as geofences.
+    """
+    y = np.asarray(latitudes, dtype=np.float64)[:, None]
+    x = np.asarray(longitudes, dtype=np.float64)[:, None]
+    y1 = np.asarray(polygon_lats, dtype=np.float64)
+    x1 = np.asarray(polygon_lons, dtype=np.float64)
+    y2 = np.roll(y1, -1)
+    x2 = np.roll(x1, -1)
+    crosses = (y1 > y) != (y2 > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_at_y = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return np.count_nonzero(crosses & (x < x_at_y), axis=1) % 2 == 1
@@ -0,0 +1,204 @@
+"""Geofence evaluation for tracked pets.
+
+Every active ``Geofence`` is held in flat NumPy arrays sorted by pet, so a
+batch of fixes is checked against all of its pets' fences in one pass:
+each fix is paired with its pet's slice of the fence arrays, circle pairs
+are resolved with one vectorized haversine call and polygon pairs with one
+ray-casting call per polygon. A fix for a pet without fences costs one set
+lookup.
+
+Each fence remembers whether its pet was last seen inside. When a fix flips
+that state the fence row is updated with a conditional UPDATE, and only the
+process whose UPDATE changed the row writes the "entered"/"left"
+``UserNotification`` for the owner, so several API workers never notify
+twice. A worker whose UPDATE matches no row reloads that fence's state,
+since another worker (or an edit) moved it. The first fix after a fence is
+created only records the state.
+
+The fence endpoints reload the index in the worker that handled the edit;
+every other worker reloads it on its next fix once
+``GEOFENCE_RELOAD_SECONDS`` have passed, so created, edited, deactivated
+and deleted fences reach all workers within that window.
+"""
+import time
+import threading
+from collections import namedtuple
+from datetime import datetime
+import numpy as np
+from sqlalchemy import or_
+
+from app.core.config import settings
+from app.models.models import Geofence, Pet, UserNotification
+from . import geo
+from .notification_counter import add_unread
+
+CIRCLE = "circle"
+POLYGON = "polygon"
+
+GeofenceEvent = namedtuple("GeofenceEvent", "geofence_id pet_id entered timestamp")
+
+
+class _FenceIndex:
+    """Immutable arrays of all active fences, sorted by pet_id."""
+
+    def __init__(self, fences, pets):
+        fences = sorted(fences, key=lambda fence: (fence.pet_id, fence.id))
+        self.ids = np.array([fence.id for fence in fences], dtype=np.int64)
+        self.pet_ids = np.array([fence.pet_id for fence in fences], dtype=np.int64)
+        self.is_circle = np.array([fence.kind == CIRCLE for fence in fences], dtype=bool)
+        self.center_lats = np.array([fence.center_latitude or 0.0 for fence in fences])
+        self.center_lons = np.array([fence.center_longitude or 0.0 for fence in fences])
+        self.radius_km = np.array([(fence.radius_m or 0.0) / 1000 for fence in fences])
+        self.polygons = {
+            position: (
+                np.array([point[0] for point in fence.polygon]),
+                np.array([point[1] for point in fence.polygon])
+            )
+            for position, fence in enumerate(fences) if fence.kind == POLYGON
+        }
+        self.names = [fence.name for fence in fences]
+        self.pets = pets  # pet_id -> (name, owner_id)
+        self.pet_set = set(self.pet_ids.tolist())
+
+    def containment(self, pet_ids, lats, lons):
+        """``(fix_index, fence_position, inside)`` for every fix paired with each of its pet's fences."""
+        start = np.searchsorted(self.pet_ids, pet_ids, side="left")
+        counts = np.searchsorted(self.pet_ids, pet_ids, side="right") - start
+        fix_index = np.repeat(np.arange(len(pet_ids)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        fence_position = np.repeat(start, counts) + offsets
+
+        inside = np.zeros(len(fix_index), dtype=bool)
+        circles = np.nonzero(self.is_circle[fence_position])[0]
+        if len(circles):
+            fences = fence_position[circles]
+            fixes = fix_index[circles]
+            inside[circles] = geo.haversine_pairs_km(
+                lats[fixes], lons[fixes], self.center_lats[fences], self.center_lons[fences]
+            ) <= self.radius_km[fences]
+        polygons = np.nonzero(~self.is_circle[fence_position])[0]
+        for position in np.unique(fence_position[polygons]):
+            pairs = polygons[fence_position[polygons] == position]
+            fixes = fix_index[pairs]
+            inside[pairs] = geo.points_in_polygon(lats[fixes], lons[fixes], *self.polygons[int(position)])
+        return fix_index, fence_position, inside
+
+
+class GeofenceEngine:
+    def __init__(self, reload_after=None):
+        self.reload_after = reload_after or settings.GEOFENCE_RELOAD_SECONDS
+        self._index = _FenceIndex([], {})
+        self._state = {}  # geofence_id -> pet last seen inside (None until known)
+        self._expires = 0
+        self._lock = threading.Lock()
+
+    def load(self, db):
+        """(Re)build the index from every active fence. Returns how many."""
+        rows = db.query(Geofence, Pet.name, Pet.user_id).join(
+            Pet, Pet.id == Geofence.pet_id
+        ).filter(Geofence.is_active == True).all()
+        fences = [fence for fence, _, _ in rows]
+        pets = {fence.pet_id: (name, owner_id) for fence, name, owner_id in rows}
+        with self._lock:
+            self._index = _FenceIndex(fences, pets)
+            self._state = {fence.id: fence.pet_inside for fence in fences}
+            self._expires = time.monotonic() + self.reload_after
+        return len(fences)
+
+    def refresh(self, db):
+        """Reload the index if it is older than ``reload_after``."""
+        if time.monotonic() >= self._expires:
+            self.load(db)
+
+    def has_fences(self, pet_id):
+        return pet_id in self._index.pet_set
+
+    def evaluate(self, db, fixes):
+        """Check ``(pet_id, latitude, longitude, timestamp)`` fixes and notify owners.
+
+        Fixes are applied in time order. Commits when a fence changes state.
+        Returns the ``GeofenceEvent``s this call recorded.
+        """
+        self.refresh(db)
+        index = self._index
+        fixes = sorted((fix for fix in fixes if fix[0] in index.pet_set), key=lambda fix: fix[3])
+        if not fixes:
+            return []
+        fix_index, fence_position, inside = index.containment(
+            np.array([fix[0] for fix in fixes], dtype=np.int64),
+            np.array([fix[1] for fix in fixes], dtype=np.float64),
+            np.array([fix[2] for fix in fixes], dtype=np.float64)
+        )
+
+        # Walk the pairs in fix order, keeping only real state changes
+        changes = []
+        with self._lock:
+            for i, position, now_inside in zip(fix_index.tolist(), fence_position.tolist(), inside.tolist()):
+                geofence_id = int(index.ids[position])
+                previous = self._state.get(geofence_id)
+                if previous == now_inside:
+                    continue
+                self._state[geofence_id] = now_inside
+                changes.append((position, geofence_id, previous, now_inside, fixes[i][3]))
+
+        events = []
+        stale = set()
+        for position, geofence_id, previous, now_inside, timestamp in changes:
+            updated = db.query(Geofence).filter(
+                Geofence.id == geofence_id,
+                or_(Geofence.pet_inside.is_(None), Geofence.pet_inside != now_inside)
+            ).update({"pet_inside": now_inside, "state_changed_at": timestamp}, synchronize_session=False)
+            if not updated:
+                stale.add(geofence_id)
+                continue
+            if previous is None:
+                continue
+            pet_id = int(index.pet_ids[position])
+            pet_name, owner_id = index.pets[pet_id]
+            fence_name = index.names[position]
+            if now_inside:
+                title, message = f"{pet_name} entered {fence_name}", f"{pet_name} is inside {fence_name} again."
+            else:
+                title, message = f"{pet_name} left {fence_name}", f"{pet_name} left {fence_name}. Check their live location."
+            db.add(UserNotification(
+                user_id=owner_id,
+                title=title,
+                message=message,
+                notification_type="pet",
+                related_url=f"/pets/{pet_id}",
+                is_read=False,
+                created_at=datetime.utcnow()
+            ))
+            events.append(GeofenceEvent(geofence_id, pet_id, now_inside, timestamp))
+        add_unread(db, [index.pets[event.pet_id][1] for event in events])
+        if changes:
+            db.commit()
+        if stale:
+            self._reload_state(db, stale)
+        return events
+
+    def _reload_state(self, db, geofence_ids):
+        """Replace the remembered state of ``geofence_ids`` with the database's."""
+        rows = dict(db.query(Geofence.id, Geofence.pet_inside).filter(
+            Geofence.id.in_(geofence_ids),
+            Geofence.is_active == True
+        ).all())
+        with self._lock:
+            for geofence_id in geofence_ids:
+                if geofence_id in rows:
+                    self._state[geofence_id] = rows[geofence_id]
+                else:
+                    self._state.pop(geofence_id, None)
+
+
+geofence_engine = GeofenceEngine()
+
+
+def check_geofences(db, fixes):
+    """``geofence_engine.evaluate`` for ingest paths: a failure is logged, never raised."""
+    try:
+        return geofence_engine.evaluate(db, fixes)
+    except Exception as e:
+        db.rollback()
+        print(f"Geofence check failed: {str(e)}")
+        return []
@@ -0,0 +1,62 @@
+"""Validate and re-encode uploaded images before they are stored.
+
+Every image is decoded, EXIF-rotated, converted to RGB, shrunk to at most
+``MAX_IMAGE_SIDE`` pixels and saved as JPEG, so stored objects are small,
+strip metadata and always match their ``.jpg`` names. Decoding and encoding
+run on a bounded thread pool (Pillow releases the GIL while it works), so N
+files are processed in parallel without blocking the event loop; the
+results are then handed to ``storage.upload_many``.
+"""
+import io
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+
+JPEG_CONTENT_TYPE = "image/jpeg"
+JPEG_QUALITY = 85
+
+_executor = ThreadPoolExecutor(max_workers=settings.IMAGE_WORKERS, thread_name_prefix="images")
+
+
+class ImageValidationError(Exception):
+    pass
+
+
+def reencode_jpeg(content, max_side=None):
+    """Decode ``content`` and return it as RGB JPEG bytes."""
+    max_side = max_side or settings.MAX_IMAGE_SIDE
+    try:
+        img = Image.open(io.BytesIO(content))
+        img = ImageOps.exif_transpose(img)
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+    except Exception as e:
+        raise ImageValidationError(f"Could not read image: {str(e)}") from e
+    img.thumbnail((max_side, max_side))
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+async def prepare_images(files):
+    """Read, validate and re-encode ``UploadFile`` objects concurrently.
+
+    Returns the JPEG bytes of each file in order. Raises
+    ``ImageValidationError`` naming the first bad file, before anything is
+    uploaded.
+    """
+    for file in files:
+        if not file.content_type or not file.content_type.startswith('image/'):
+            raise ImageValidationError(f"{file.filename}: only images are allowed")
+    contents = [await file.read() for file in files]
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(
+        *(loop.run_in_executor(_executor, reencode_jpeg, content) for content in contents),
+        return_exceptions=True
+    )
+    for file, result in zip(files, results):
+        if isinstance(result, Exception):
+            raise ImageValidationError(f"{file.filename}: {str(result)}")
+    return results
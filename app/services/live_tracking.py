@@ -0,0 +1,33 @@
+"""Live location fan-out for tracking streams.
+
+Every accepted fix is published on its device's topic and, when the device
+is paired, on its pet's topic, so a client can watch either. Fixes are
+published as soon as they are accepted, before the write-behind flush, so
+``location_id`` is not part of the message.
+"""
+from .pubsub import pubsub
+
+
+def device_topic(device_id):
+    return f"device:{device_id}"
+
+
+def pet_topic(pet_id):
+    return f"pet:{pet_id}"
+
+
+def serialize_fix(device_id, pet_id, latitude, longitude, timestamp):
+    return {
+        "device_id": device_id,
+        "pet_id": pet_id,
+        "latitude": latitude,
+        "longitude": longitude,
+        "timestamp": timestamp.isoformat()
+    }
+
+
+def publish_fix(device_id, pet_id, latitude, longitude, timestamp):
+    topics = [device_topic(device_id)]
+    if pet_id is not None:
+        topics.append(pet_topic(pet_id))
+    return pubsub.publish(topics, serialize_fix(device_id, pet_id, latitude, longitude, timestamp))
@@ -0,0 +1,177 @@
+"""Write-behind buffer for single tracker fixes.
+
+``POST /api/device/location`` used to insert a ``Location`` row, update the
+device and commit for every ping. Now the endpoint only appends the fix to
+this buffer; a background thread writes the buffered fixes to
+``xxlocation_db`` with one multi-row INSERT whenever ``LOCATION_FLUSH_SIZE``
+fixes are waiting or every ``LOCATION_FLUSH_SECONDS``, and moves each
+device's ``last_seen`` and latest position forward once per flush, however
+many fixes it sent.
+
+Fixes are therefore visible in the table up to one flush interval after
+they were acknowledged. On shutdown the buffer is flushed before the
+process exits; if the database is unreachable then, the fixes are appended
+to ``LOCATION_SPILL_FILE`` and written on the next startup instead of being
+dropped. The same file bounds memory during an outage: once a failed flush
+leaves more than ``LOCATION_BUFFER_MAX_FIXES`` fixes waiting, the oldest are
+spilled, and the flusher writes them back after its next successful flush.
+"""
+import os
+import json
+import threading
+from datetime import datetime
+
+from app.core.config import settings
+from app.database.database import SessionLocal
+from .location_ingest import write_fixes
+
+
+class LocationWriteBuffer:
+    def __init__(self, session_factory=SessionLocal, max_fixes=None, interval=None, spill_file=None,
+                 max_pending=None):
+        self.session_factory = session_factory
+        self.max_fixes = max_fixes or settings.LOCATION_FLUSH_SIZE
+        self.interval = interval or settings.LOCATION_FLUSH_SECONDS
+        self.spill_file = spill_file or settings.LOCATION_SPILL_FILE
+        self.max_pending = max_pending or settings.LOCATION_BUFFER_MAX_FIXES
+        self._pending = []
+        self._lock = threading.Lock()
+        # Only one flush writes at a time so retried rows keep their order
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def append(self, device_id, latitude, longitude, timestamp):
+        """Buffer one fix; returns without touching the database."""
+        with self._lock:
+            self._pending.append({
+                "device_id": device_id,
+                "latitude": latitude,
+                "longitude": longitude,
+                "timestamp": timestamp
+            })
+            full = len(self._pending) >= self.max_fixes
+        if full:
+            self._wake.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Write every buffered fix now. Returns how many were written.
+
+        On failure the fixes go back to the front of the buffer for the
+        next flush, anything beyond ``max_pending`` is spilled, and the
+        error is raised.
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return 0
+            try:
+                self._write(rows)
+            except Exception:
+                with self._lock:
+                    self._pending[:0] = rows
+                    overflow = len(self._pending) - self.max_pending
+                    if overflow > 0:
+                        rows, self._pending = self._pending[:overflow], self._pending[overflow:]
+                    else:
+                        rows = []
+                if rows:
+                    print(f"Location buffer full, spilling {len(rows)} fixes to {self.spill_file}")
+                    try:
+                        self._append_spill(rows)
+                    except OSError as e:
+                        print(f"Location spill failed, keeping fixes in memory: {str(e)}")
+                        with self._lock:
+                            self._pending[:0] = rows
+                raise
+            return len(rows)
+
+    def _write(self, rows):
+        db = self.session_factory()
+        try:
+            write_fixes(db, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stopping.is_set():
+                break
+            try:
+                self.flush()
+                if os.path.exists(self.spill_file):
+                    self.replay_spill()
+            except Exception as e:
+                print(f"Location flush failed, will retry: {str(e)}")
+
+    def start(self):
+        """Replay spilled fixes and start the background flusher."""
+        try:
+            replayed = self.replay_spill()
+            if replayed:
+                print(f"Wrote {replayed} spilled location fixes")
+        except Exception as e:
+            # The spill file stays in place for the next startup
+            print(f"Location spill replay failed: {str(e)}")
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="location-flush", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the flusher and write out everything still buffered."""
+        if self._thread is not None:
+            self._stopping.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Final location flush failed, spilling to {self.spill_file}: {str(e)}")
+            self._spill()
+
+    def _spill(self):
+        with self._lock:
+            rows, self._pending = self._pending, []
+        self._append_spill(rows)
+
+    def _append_spill(self, rows):
+        if not rows:
+            return
+        os.makedirs(os.path.dirname(self.spill_file) or ".", exist_ok=True)
+        with open(self.spill_file, "a") as f:
+            for row in rows:
+                f.write(json.dumps({**row, "timestamp": row["timestamp"].isoformat()}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def replay_spill(self):
+        """Write fixes spilled by an earlier shutdown or flush. Returns how many."""
+        # Held throughout so a failing flush can't append while the file is read
+        with self._flush_lock:
+            if not os.path.exists(self.spill_file):
+                return 0
+            with open(self.spill_file) as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+            for row in rows:
+                row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+            if rows:
+                self._write(rows)
+            os.remove(self.spill_file)
+            return len(rows)
+
+
+location_buffer = LocationWriteBuffer()
@@ -0,0 +1,210 @@
+"""Time-window reads of a device's location history.
+
+A tracker pinging every 30 seconds writes about 100k rows a month, so
+history is never read whole. ``fetch_page`` returns one page of a time
+window, newest first, continuing from an opaque keyset cursor (the last
+row's timestamp and id), which keeps every page an index-range scan on
+``(device_id, timestamp)`` however deep the client pages.
+``fetch_downsampled`` returns a whole window reduced for map display,
+either to at most ``max_points`` by Douglas–Peucker simplification or to
+one fix per ``interval_minutes``.
+
+Fixes older than the retention window only survive as the simplified
+paths of hourly ``LocationRollup`` rows (see ``location_retention``). Both
+reads stitch those path points in after the raw fixes, with a null
+``location_id``, so clients page and draw across the boundary unchanged.
+"""
+import heapq
+from collections import namedtuple
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import tuple_
+
+from app.models.models import Location, LocationRollup
+from .location_ingest import naive_utc
+
+DEFAULT_WINDOW = timedelta(hours=24)
+EPOCH = datetime(1970, 1, 1)
+
+HistoryPoint = namedtuple("HistoryPoint", "location_id latitude longitude timestamp")
+
+
+class CursorError(ValueError):
+    pass
+
+
+def _key(row):
+    # Rolled-up points have no id and sort before raw fixes of the same instant
+    return row.timestamp, row.location_id or 0
+
+
+def encode_cursor(row):
+    return f"{row.timestamp.isoformat()}_{row.location_id or 0}"
+
+
+def decode_cursor(cursor):
+    try:
+        timestamp, location_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(timestamp), int(location_id)
+    except (AttributeError, ValueError) as e:
+        raise CursorError(f"Invalid cursor: {cursor}") from e
+
+
+def _window(db, device_id, start, end):
+    start, end = naive_utc(start), naive_utc(end)
+    query = db.query(
+        Location.location_id,
+        Location.latitude,
+        Location.longitude,
+        Location.timestamp
+    ).filter(Location.device_id == device_id)
+    if start is not None:
+        query = query.filter(Location.timestamp >= start)
+    if end is not None:
+        query = query.filter(Location.timestamp < end)
+    return query
+
+
+def path_points(rollup):
+    return [
+        HistoryPoint(None, latitude, longitude, datetime.fromisoformat(timestamp))
+        for latitude, longitude, timestamp in rollup.path
+    ]
+
+
+def _rolled_up(db, device_id, start, end, before=None, needed=None):
+    """Rolled-up points in ``[start, end)`` and before the ``before`` key, newest first.
+
+    Stops loading rollups once ``needed`` points are collected.
+    """
+    start, end = naive_utc(start), naive_utc(end)
+    query = db.query(LocationRollup).filter(LocationRollup.device_id == device_id)
+    if start is not None:
+        query = query.filter(LocationRollup.last_at >= start)
+    if end is not None:
+        query = query.filter(LocationRollup.first_at < end)
+    if before is not None:
+        query = query.filter(LocationRollup.first_at <= before[0])
+    query = query.order_by(LocationRollup.period_start.desc())
+
+    points = []
+    oldest_period = None
+    while needed is None or len(points) < needed:
+        batch_query = query
+        if oldest_period is not None:
+            batch_query = batch_query.filter(LocationRollup.period_start < oldest_period)
+        rollups = batch_query.limit(needed).all() if needed else batch_query.all()
+        if not rollups:
+            break
+        for rollup in rollups:
+            points.extend(
+                point for point in reversed(path_points(rollup))
+                if (start is None or point.timestamp >= start)
+                and (end is None or point.timestamp < end)
+                and (before is None or _key(point) < before)
+            )
+        if needed is None:
+            break
+        oldest_period = rollups[-1].period_start
+    return points
+
+
+def fetch_page(db, device_id, start=None, end=None, cursor=None, limit=500):
+    """Up to ``limit`` fixes in ``[start, end)``, newest first.
+
+    Returns ``(rows, next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    query = _window(db, device_id, start, end)
+    before = None
+    if cursor:
+        before = decode_cursor(cursor)
+        query = query.filter(tuple_(Location.timestamp, Location.location_id) < tuple_(*before))
+    rows = query.order_by(Location.timestamp.desc(), Location.location_id.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        rolled = _rolled_up(db, device_id, start, end, before, limit + 1 - len(rows))
+        if rolled:
+            rows = sorted(rows + rolled, key=_key, reverse=True)
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    return rows, None
+
+
+def fetch_downsampled(db, device_id, start=None, end=None, max_points=None, interval_minutes=None):
+    """All of ``[start, end)`` reduced to a drawable track, newest first.
+
+    ``start`` defaults to 24 hours before ``end`` (or now).
+    """
+    if start is None:
+        start = (naive_utc(end) or datetime.utcnow()) - DEFAULT_WINDOW
+    rows = _window(db, device_id, start, end).order_by(Location.timestamp, Location.location_id).all()
+    rolled = _rolled_up(db, device_id, start, end)
+    if rolled:
+        rows = sorted(rows + rolled, key=_key)
+    if interval_minutes:
+        rows = one_per_interval(rows, timedelta(minutes=interval_minutes))
+    if max_points:
+        rows = simplify_track(rows, max_points)
+    return rows[::-1]
+
+
+def one_per_interval(rows, interval):
+    """Keep the latest fix of each ``interval``-long bucket of time-ordered ``rows``."""
+    kept = []
+    bucket = None
+    for row in rows:
+        row_bucket = (row.timestamp - EPOCH) // interval
+        if row_bucket == bucket:
+            kept[-1] = row
+        else:
+            kept.append(row)
+            bucket = row_bucket
+    return kept
+
+
+def simplify_track(rows, max_points):
+    """Douglas–Peucker simplification of time-ordered ``rows`` to ``max_points``.
+
+    Starting from the two endpoints, repeatedly keeps the fix that lies
+    farthest from the track drawn so far, so the shape survives with far
+    fewer points. Distances are planar on longitude scaled by cos(latitude),
+    which is accurate enough at the scale of one pet's track.
+    """
+    n = len(rows)
+    if n <= max_points:
+        return rows
+    if max_points < 2:
+        return rows[-max_points:] if max_points else []
+
+    lat = np.array([row.latitude for row in rows])
+    lon = np.array([row.longitude for row in rows])
+    x = lon * np.cos(np.radians(lat.mean()))
+    y = lat
+
+    def farthest(i, j):
+        # Largest distance from the points strictly between i and j to segment i-j
+        px, py = x[i + 1:j], y[i + 1:j]
+        dx, dy = x[j] - x[i], y[j] - y[i]
+        length_sq = dx * dx + dy * dy
+        if length_sq == 0:
+            t = np.zeros_like(px)
+        else:
+            t = np.clip(((px - x[i]) * dx + (py - y[i]) * dy) / length_sq, 0, 1)
+        distances = np.hypot(px - (x[i] + t * dx), py - (y[i] + t * dy))
+        k = int(distances.argmax())
+        return distances[k], i + 1 + k
+
+    keep = {0, n - 1}
+    heap = []
+
+    def push(i, j):
+        if j - i > 1:
+            distance, k = farthest(i, j)
+            heapq.heappush(heap, (-distance, i, j, k))
+
+    push(0, n - 1)
+    while heap and len(keep) < max_points:
+        _, i, j, k = heapq.heappop(heap)
+        keep.add(k)
+        push(i, k)
+        push(k, j)
+    return [rows[i] for i in sorted(keep)]
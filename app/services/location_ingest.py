@@ -0,0 +1,150 @@
+"""Batched ingestion of tracker GPS fixes.
+
+One call resolves every device in the batch (with its pet's status and the
+owner's phone number) through ``device_alert_cache``, writes all fixes with one
+multi-row INSERT, moves each device's ``last_seen`` and latest position
+forward and commits once.
+"""
+from datetime import datetime, timezone
+from sqlalchemy import insert, update, case, or_, bindparam
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.models.models import Device, DeviceLatestLocation, Location
+from .device_alerts import device_alert_cache, alert_status
+from .live_tracking import publish_fix
+from .geofence_engine import check_geofences
+from .device_liveness import device_liveness
+
+
+def naive_utc(timestamp):
+    """Fixes may carry a UTC offset; the table stores naive UTC."""
+    if timestamp is not None and timestamp.tzinfo is not None:
+        return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def ingest_fixes(db, fixes):
+    """Store ``fixes`` (objects with unique_code, latitude, longitude, timestamp).
+
+    Fixes for unknown devices are skipped and reported. Each device's newest
+    fix is published to live tracking streams and every fix is checked
+    against its pet's geofences. Returns a summary with per-device alert
+    status.
+    """
+    now = datetime.utcnow()
+    devices = device_alert_cache.get_many(db, {fix.unique_code for fix in fixes})
+
+    rows = []
+    fence_fixes = []
+    per_device = {}
+    unknown = set()
+    for fix in fixes:
+        device = devices.get(fix.unique_code)
+        if device is None:
+            unknown.add(fix.unique_code)
+            continue
+        timestamp = naive_utc(fix.timestamp) or now
+        rows.append({
+            "device_id": device.device_id,
+            "latitude": fix.latitude,
+            "longitude": fix.longitude,
+            "timestamp": timestamp
+        })
+        if device.pet_id is not None:
+            fence_fixes.append((device.pet_id, fix.latitude, fix.longitude, timestamp))
+        summary = per_device.get(fix.unique_code)
+        if summary is None:
+            summary = per_device[fix.unique_code] = {"accepted": 0, "last_fix": None}
+        summary["accepted"] += 1
+        if summary["last_fix"] is None or timestamp >= summary["last_fix"]["timestamp"]:
+            summary["last_fix"] = {"latitude": fix.latitude, "longitude": fix.longitude, "timestamp": timestamp}
+
+    if rows:
+        write_fixes(db, rows)
+        db.commit()
+        for unique_code, summary in per_device.items():
+            device = devices[unique_code]
+            publish_fix(device.device_id, device.pet_id, **summary["last_fix"])
+        check_geofences(db, fence_fixes)
+
+    return {
+        "accepted": len(rows),
+        "rejected": len(fixes) - len(rows),
+        "devices": [
+            {
+                "unique_code": unique_code,
+                "device_id": devices[unique_code].device_id,
+                "accepted": summary["accepted"],
+                "last_fix": summary["last_fix"],
+                **alert_status(devices[unique_code].pet_status, devices[unique_code].phone_number)
+            }
+            for unique_code, summary in per_device.items()
+        ],
+        "unknown_devices": sorted(unknown)
+    }
+
+
+def write_fixes(db, rows):
+    """Insert Location ``rows`` and bring their devices up to date.
+
+    Does not commit. Each device's ``last_seen`` and latest position get one
+    statement per device, however many of its fixes are in ``rows``.
+    """
+    inserted = db.execute(
+        insert(Location).returning(Location.location_id, sort_by_parameter_order=True),
+        rows
+    ).scalars().all()
+    latest = {}
+    for location_id, row in zip(inserted, rows):
+        current = latest.get(row["device_id"])
+        if current is None or row["timestamp"] >= current["timestamp"]:
+            latest[row["device_id"]] = {**row, "location_id": location_id}
+    touch_devices(db, {device_id: fix["timestamp"] for device_id, fix in latest.items()})
+    upsert_latest_locations(db, list(latest.values()))
+    for device_id, fix in latest.items():
+        device_liveness.seen(device_id, fix["timestamp"])
+
+
+def upsert_latest_locations(db, fixes):
+    """Store each fix as its device's latest position unless a newer one is stored."""
+    if not fixes:
+        return
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(DeviceLatestLocation)
+    table = DeviceLatestLocation.__table__
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[table.c.device_id],
+            set_={
+                "location_id": stmt.excluded.location_id,
+                "latitude": stmt.excluded.latitude,
+                "longitude": stmt.excluded.longitude,
+                "timestamp": stmt.excluded.timestamp
+            },
+            where=table.c.timestamp <= stmt.excluded.timestamp
+        ),
+        fixes
+    )
+
+
+def touch_devices(db, last_seen):
+    """Mark devices online and move ``last_seen`` forward, one UPDATE per device.
+
+    ``last_seen`` maps device_id to its newest fix; an older fix (e.g. a
+    late buffered one) never moves ``last_seen`` back.
+    """
+    if not last_seen:
+        return
+    devices = Device.__table__
+    db.execute(
+        update(devices)
+        .where(devices.c.device_id == bindparam("b_device_id"))
+        .values(
+            last_seen=case(
+                (or_(devices.c.last_seen.is_(None), devices.c.last_seen < bindparam("b_last_seen")), bindparam("b_last_seen")),
+                else_=devices.c.last_seen
+            ),
+            is_online=True
+        ),
+        [{"b_device_id": device_id, "b_last_seen": timestamp} for device_id, timestamp in last_seen.items()]
+    )
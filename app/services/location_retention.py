@@ -0,0 +1,126 @@
+"""Retention and hourly rollup of ``xxlocation_db``.
+
+Raw fixes are kept for ``LOCATION_RETENTION_DAYS``. Older fixes are
+compacted into one ``LocationRollup`` per device-hour (point count, bounding
+box, first/last time and a Douglas–Peucker path of at most
+``LOCATION_ROLLUP_POINTS`` points) and then deleted. Each device is
+processed one day at a time: the day's rollups are upserted and its raw
+rows deleted with one range DELETE in the same transaction, so a crash
+never loses or double-counts fixes and no transaction grows beyond a day
+of one device's pings.
+
+Run it on a schedule with ``scripts/location_retention.py``.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import func, delete
+
+from app.core.config import settings
+from app.models.models import Location, LocationRollup
+from .location_history import simplify_track, path_points, HistoryPoint
+
+CHUNK = timedelta(days=1)
+
+
+def hour_start(timestamp):
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def rollup_cutoff(now=None, retention_days=None):
+    """Fixes before this hour boundary are rolled up."""
+    retention_days = retention_days if retention_days is not None else settings.LOCATION_RETENTION_DAYS
+    return hour_start((now or datetime.utcnow()) - timedelta(days=retention_days))
+
+
+def _merge(rollup, device_id, period_start, points, max_points):
+    """Fold time-ordered ``points`` into ``rollup`` (None for a new hour)."""
+    if rollup is not None:
+        # Late fixes for an hour that was already rolled up
+        count = rollup.point_count + len(points)
+        points = sorted(path_points(rollup) + points, key=lambda point: point.timestamp)
+    else:
+        rollup = LocationRollup(device_id=device_id, period_start=period_start)
+        count = len(points)
+    latitudes = [point.latitude for point in points]
+    longitudes = [point.longitude for point in points]
+    rollup.point_count = count
+    rollup.min_latitude = min(latitudes)
+    rollup.max_latitude = max(latitudes)
+    rollup.min_longitude = min(longitudes)
+    rollup.max_longitude = max(longitudes)
+    rollup.first_at = points[0].timestamp
+    rollup.last_at = points[-1].timestamp
+    rollup.path = [
+        [point.latitude, point.longitude, point.timestamp.isoformat()]
+        for point in simplify_track(points, max_points)
+    ]
+    return rollup
+
+
+def roll_up_device(db, device_id, cutoff, max_points=None):
+    """Roll up and delete every raw fix of one device before ``cutoff``.
+
+    Commits once per day of data. Returns ``(fixes, rollups)`` counts.
+    """
+    max_points = max_points or settings.LOCATION_ROLLUP_POINTS
+    fixes = rollups = 0
+    while True:
+        oldest = db.query(func.min(Location.timestamp)).filter(
+            Location.device_id == device_id,
+            Location.timestamp < cutoff
+        ).scalar()
+        if oldest is None:
+            return fixes, rollups
+        chunk_start = hour_start(oldest)
+        chunk_end = min(chunk_start + CHUNK, cutoff)
+
+        rows = db.query(
+            Location.location_id,
+            Location.latitude,
+            Location.longitude,
+            Location.timestamp
+        ).filter(
+            Location.device_id == device_id,
+            Location.timestamp >= chunk_start,
+            Location.timestamp < chunk_end
+        ).order_by(Location.timestamp, Location.location_id).all()
+
+        hours = {}
+        for row in rows:
+            hours.setdefault(hour_start(row.timestamp), []).append(HistoryPoint(*row))
+        existing = {
+            rollup.period_start: rollup
+            for rollup in db.query(LocationRollup).filter(
+                LocationRollup.device_id == device_id,
+                LocationRollup.period_start.in_(list(hours))
+            )
+        }
+        for period_start, points in hours.items():
+            db.add(_merge(existing.get(period_start), device_id, period_start, points, max_points))
+
+        # Ids only grow, so a fix written meanwhile is never deleted unsummarised
+        db.execute(delete(Location).where(
+            Location.device_id == device_id,
+            Location.timestamp >= chunk_start,
+            Location.timestamp < chunk_end,
+            Location.location_id <= max(row.location_id for row in rows)
+        ))
+        db.commit()
+        fixes += len(rows)
+        rollups += len(hours)
+
+
+def run_retention(db, now=None, retention_days=None, max_points=None):
+    """Roll up every device's fixes older than the retention window.
+
+    Returns ``{"cutoff", "devices", "fixes", "rollups"}``.
+    """
+    cutoff = rollup_cutoff(now, retention_days)
+    device_ids = [device_id for (device_id,) in db.query(Location.device_id).filter(
+        Location.timestamp < cutoff
+    ).distinct()]
+    fixes = rollups = 0
+    for device_id in device_ids:
+        device_fixes, device_rollups = roll_up_device(db, device_id, cutoff, max_points)
+        fixes += device_fixes
+        rollups += device_rollups
+    return {"cutoff": cutoff, "devices": len(device_ids), "fixes": fixes, "rollups": rollups}
@@ -0,0 +1,133 @@
+"""Paged reads, read receipts and the inbox summary for chat conversations.
+
+Conversations are never loaded whole. ``fetch_page`` returns the newest
+``limit`` messages older than an opaque keyset cursor (the oldest shown
+message's timestamp and id), so opening a chat or scrolling back is one
+index-range scan on ``(conversation_id, timestamp, id)`` however long the
+history is. Read receipts only move forward: ``mark_read_up_to`` marks the
+reader's unread messages up to the newest one the client rendered.
+
+Each ``Conversation`` row also carries its last message, last activity time
+and both participants' unread counts. ``record_message`` and ``mark_read``
+keep them current with one UPDATE each, so ``fetch_inbox`` pages a user's
+conversations by last activity without touching ``xxmessages_db`` beyond
+the one last message per row.
+"""
+from datetime import datetime
+from sqlalchemy import tuple_, case, or_
+
+from app.models.models import Conversation, Message, User
+
+DEFAULT_PAGE = 50
+MAX_PAGE = 200
+DEFAULT_INBOX_PAGE = 20
+MAX_INBOX_PAGE = 100
+
+
+class CursorError(ValueError):
+    pass
+
+
+def encode_cursor(timestamp, row_id):
+    return f"{timestamp.isoformat()}_{row_id}"
+
+
+def decode_cursor(cursor):
+    try:
+        timestamp, row_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (AttributeError, ValueError) as e:
+        raise CursorError(f"Invalid cursor: {cursor}") from e
+
+
+def fetch_page(db, conversation_id, cursor=None, limit=DEFAULT_PAGE):
+    """Up to ``limit`` messages before ``cursor`` (or the newest), oldest first.
+
+    Returns ``(messages, next_cursor)``; ``next_cursor`` pages further back
+    and is None once the start of the conversation is reached.
+    """
+    query = db.query(Message).filter(Message.conversation_id == conversation_id)
+    if cursor:
+        query = query.filter(tuple_(Message.timestamp, Message.id) < tuple_(*decode_cursor(cursor)))
+    messages = query.order_by(Message.timestamp.desc(), Message.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        next_cursor = encode_cursor(messages[-1].timestamp, messages[-1].id)
+    return messages[::-1], next_cursor
+
+
+def unread_column(conversation, user_id):
+    return Conversation.user1_unread_count if conversation.user1 == user_id else Conversation.user2_unread_count
+
+
+def unread_count(conversation, user_id):
+    return conversation.user1_unread_count if conversation.user1 == user_id else conversation.user2_unread_count
+
+
+def record_message(db, conversation, message):
+    """Count ``message`` as unread for its receiver and as the conversation's latest.
+
+    ``message`` must be flushed. Does not commit.
+    """
+    # Ids only grow, so they order messages whatever clock stamped them
+    newer = or_(Conversation.last_message_id.is_(None), Conversation.last_message_id < message.id)
+    counter = unread_column(conversation, message.receiver_id)
+    db.query(Conversation).filter(Conversation.id == conversation.id).update({
+        counter: counter + 1,
+        Conversation.last_message_id: case((newer, message.id), else_=Conversation.last_message_id),
+        Conversation.last_activity_at: case((newer, message.timestamp), else_=Conversation.last_activity_at)
+    }, synchronize_session=False)
+
+
+def mark_read(db, conversation, reader_id, *criteria):
+    """Mark ``reader_id``'s unread messages matching ``criteria`` read.
+
+    Does not commit. Returns how many messages changed.
+    """
+    updated = db.query(Message).filter(
+        Message.conversation_id == conversation.id,
+        Message.receiver_id == reader_id,
+        Message.is_read == False,
+        *criteria
+    ).update({"is_read": True}, synchronize_session=False)
+    if updated:
+        counter = unread_column(conversation, reader_id)
+        db.query(Conversation).filter(Conversation.id == conversation.id).update({
+            counter: case((counter > updated, counter - updated), else_=0)
+        }, synchronize_session=False)
+    return updated
+
+
+def mark_read_up_to(db, conversation, reader_id, message):
+    """Mark ``reader_id``'s unread messages up to and including ``message`` read."""
+    return mark_read(
+        db, conversation, reader_id,
+        tuple_(Message.timestamp, Message.id) <= tuple_(message.timestamp, message.id)
+    )
+
+
+def fetch_inbox(db, user_id, cursor=None, limit=DEFAULT_INBOX_PAGE):
+    """Up to ``limit`` of the user's conversations, most recently active first.
+
+    Returns ``([(conversation, other_user, last_message or None)], next_cursor)``.
+    """
+    before = decode_cursor(cursor) if cursor else None
+    rows = {}
+    # One index-range scan per side of the conversation
+    for own, other in ((Conversation.user1, Conversation.user2), (Conversation.user2, Conversation.user1)):
+        query = db.query(Conversation, User, Message).join(
+            User, User.id == other
+        ).outerjoin(
+            Message, Message.id == Conversation.last_message_id
+        ).filter(own == user_id)
+        if before is not None:
+            query = query.filter(tuple_(Conversation.last_activity_at, Conversation.id) < tuple_(*before))
+        for row in query.order_by(Conversation.last_activity_at.desc(), Conversation.id.desc()).limit(limit + 1):
+            rows[row[0].id] = row
+    rows = sorted(rows.values(), key=lambda row: (row[0].last_activity_at, row[0].id), reverse=True)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][0].last_activity_at, rows[-1][0].id)
+    return rows, next_cursor
@@ -0,0 +1,83 @@
+"""Maintained unread-notification counts for the navbar badge.
+
+``xxuser_notification_counts_db`` holds one unread count per user, so the
+badge is a primary-key read instead of a ``COUNT(*)`` over the user's
+notifications. Every path that inserts ``UserNotification`` rows calls
+``add_unread`` and every path that marks them read calls ``remove_unread``,
+in the same transaction, so the count commits or rolls back with the rows.
+
+``reconcile`` recomputes counts from the notifications table; run it with
+``scripts/reconcile_notification_counts.py`` after writing notifications
+outside these helpers (e.g. by hand in SQL).
+"""
+from collections import Counter
+from sqlalchemy import case, func
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.models.models import UserNotification, UserNotificationCount
+
+
+def add_unread(db, user_ids):
+    """Count one new unread notification per occurrence of each id in ``user_ids``.
+
+    Does not commit.
+    """
+    counts = Counter(user_ids)
+    if not counts:
+        return
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(UserNotificationCount)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[UserNotificationCount.user_id],
+            set_={"unread_count": UserNotificationCount.unread_count + stmt.excluded.unread_count}
+        ),
+        [{"user_id": user_id, "unread_count": count} for user_id, count in counts.items()]
+    )
+
+
+def remove_unread(db, user_id, count=1):
+    """Count ``count`` of the user's notifications as read. Does not commit."""
+    if count <= 0:
+        return
+    column = UserNotificationCount.unread_count
+    db.query(UserNotificationCount).filter(UserNotificationCount.user_id == user_id).update(
+        {column: case((column > count, column - count), else_=0)},
+        synchronize_session=False
+    )
+
+
+def unread_count(db, user_id):
+    return db.query(UserNotificationCount.unread_count).filter(
+        UserNotificationCount.user_id == user_id
+    ).scalar() or 0
+
+
+def reconcile(db, user_ids=None):
+    """Reset counts to the actual number of unread notifications and commit.
+
+    Covers ``user_ids``, or every user with a count or an unread notification.
+    Returns ``{user_id: (old, new)}`` for the counts that were wrong.
+    """
+    actual_query = db.query(UserNotification.user_id, func.count()).filter(UserNotification.is_read == False)
+    stored_query = db.query(UserNotificationCount.user_id, UserNotificationCount.unread_count)
+    if user_ids is not None:
+        actual_query = actual_query.filter(UserNotification.user_id.in_(user_ids))
+        stored_query = stored_query.filter(UserNotificationCount.user_id.in_(user_ids))
+    actual = dict(actual_query.group_by(UserNotification.user_id).all())
+    stored = dict(stored_query.all())
+
+    fixed = {
+        user_id: (stored.get(user_id, 0), actual.get(user_id, 0))
+        for user_id in set(actual) | set(stored)
+        if stored.get(user_id, 0) != actual.get(user_id, 0)
+    }
+    for user_id, (old, new) in fixed.items():
+        if user_id in stored:
+            db.query(UserNotificationCount).filter(UserNotificationCount.user_id == user_id).update(
+                {"unread_count": new}, synchronize_session=False
+            )
+        else:
+            db.add(UserNotificationCount(user_id=user_id, unread_count=new))
+    db.commit()
+    return fixed
@@ -1,12 +1,14 @@
-import os
-import json
 import numpy as np
 from datetime import datetime
 from pathlib import Path
 from PIL import Image
 
+from . import fingerprint_format
+from .fingerprint_store import fingerprint_store
+
 class PetFeatureExtractor:
-    def __init__(self):
+    def __init__(self, store=None):
+        self.store = store or fingerprint_store
         self.img_size = (224, 224)
         self.type_weights = {
             'dog': {'main': 0.4, 'face': 0.3, 'side': 0.2, 'fur': 0.1},
@@ -34,32 +36,27 @@ class PetFeatureExtractor:
         hist = np.array(hist) / np.sum(hist)
         return hist.tolist()
 
+    def missing_images(self, pet_id, upload_dir="app/uploads/pet_images"):
+        pet_dir = Path(upload_dir) / str(pet_id)
+        return [img_type for img_type in fingerprint_format.ANGLES if not (pet_dir / f"{img_type}.jpg").exists()]
+
     def generate_fingerprint(self, pet_id, pet_type, status, upload_dir="app/uploads/pet_images"):
         pet_dir = Path(upload_dir) / str(pet_id)
-        features = {
-            'metadata': {
-                'type': pet_type.lower(),
-                'status': status.lower(),
-                'generated_at': datetime.now().isoformat(),
-                'pet_id': pet_id
-            },
-            'features': {}
-        }
-        required_images = ['main', 'face', 'side', 'fur']
-        missing_images = []
-        for img_type in required_images:
-            img_path = pet_dir / f"{img_type}.jpg"
-            if img_path.exists():
-                features['features'][img_type] = self.extract_features(img_path)
-            else:
-                missing_images.append(img_type)
+        missing_images = self.missing_images(pet_id, upload_dir)
         if missing_images:
             print(f"Missing images for pet {pet_id}: {', '.join(missing_images)}")
             return None
-        features_path = pet_dir / "features.json"
-        with open(features_path, 'w') as f:
-            json.dump(features, f, indent=2)
-        return features_path
+        features = {
+            img_type: self.extract_features(pet_dir / f"{img_type}.jpg")
+            for img_type in fingerprint_format.ANGLES
+        }
+        entry = self.store.put(pet_id, pet_type, status, features, generated_at=datetime.now())
+        # The catalog store supersedes any per-pet fingerprint file
+        for name in (fingerprint_format.FINGERPRINT_FILENAME, fingerprint_format.LEGACY_FILENAME):
+            stale_path = pet_dir / name
+            if stale_path.exists():
+                stale_path.unlink()
+        return entry
 
     def compare_features(self, source_features, target_features, pet_type):
         if pet_type not in self.type_weights:
@@ -79,40 +76,65 @@ class PetFeatureExtractor:
                 total_weight += weight
         return total_score / total_weight if total_weight > 0 else 0.0
 
-    def find_similar_pets(self, source_pet_id, threshold=0.65, base_dir="app/uploads/pet_images"):
-        source_path = Path(base_dir) / str(source_pet_id) / "features.json"
-        if not source_path.exists():
+    def normalize_features(self, vectors, dtype=np.float32):
+        """Stack one or more feature vectors and L2-normalise each row."""
+        matrix = np.asarray(vectors, dtype=dtype)
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        norms[norms == 0] = 1
+        return matrix / norms
+
+    def compare_features_batch(self, query_features, candidate_features, pet_type):
+        """Weighted cosine similarity of one query against N candidates.
+
+        ``query_features`` maps each angle to a normalised 1-D vector and
+        ``candidate_features`` maps each angle to a normalised (N, D) matrix,
+        both as produced by ``normalize_features``. Returns an (N,) array of
+        the same scores ``compare_features`` gives pair by pair.
+        """
+        if pet_type not in self.type_weights:
+            pet_type = 'dog'
+        weights = self.type_weights[pet_type]
+        scores = None
+        total_weight = 0.0
+        for img_type, weight in weights.items():
+            if img_type in query_features and img_type in candidate_features:
+                angle_scores = candidate_features[img_type] @ query_features[img_type]
+                scores = angle_scores * weight if scores is None else scores + angle_scores * weight
+                total_weight += weight
+        if scores is None:
+            first = next(iter(candidate_features.values()), np.empty((0,)))
+            return np.zeros(len(first), dtype=np.float32)
+        return scores / total_weight
+
+    def _rank_stored(self, query_features, pet_type, threshold, exclude_pet_id=None):
+        """Score every stored fingerprint of ``pet_type`` in one batch."""
+        pet_ids, rows, statuses = self.store.live_rows(pet_type)
+        if len(pet_ids) == 0:
+            return []
+        scores = self.compare_features_batch(query_features, self.store.angle_vectors(rows), pet_type)
+        matches = []
+        for pet_id, score, status in zip(pet_ids, scores, statuses):
+            if score >= threshold and pet_id != exclude_pet_id:
+                matches.append({
+                    'pet_id': int(pet_id),
+                    'similarity': float(score),
+                    'status': status
+                })
+        return matches
+
+    def find_similar_pets(self, source_pet_id, threshold=0.65):
+        source_data = self.store.get(source_pet_id)
+        if source_data is None:
             raise FileNotFoundError(f"Source pet features not found for ID {source_pet_id}")
-        with open(source_path) as f:
-            source_data = json.load(f)
         source_type = source_data['metadata']['type']
-        matches = []
-        pets_dir = Path(base_dir)
-        for pet_dir in pets_dir.iterdir():
-            if pet_dir.is_dir() and pet_dir.name != str(source_pet_id):
-                target_path = pet_dir / "features.json"
-                if target_path.exists():
-                    with open(target_path) as f:
-                        target_data = json.load(f)
-                    if target_data['metadata']['type'] == source_type:
-                        similarity = self.compare_features(
-                            source_data['features'],
-                            target_data['features'],
-                            source_type
-                        )
-                        if similarity >= threshold:
-                            matches.append({
-                                'pet_id': int(pet_dir.name),
-                                'similarity': similarity,
-                                'features_path': str(target_path),
-                                'status': target_data['metadata']['status']
-                            })
+        matches = self._rank_stored(source_data['features'], source_type, threshold, exclude_pet_id=source_pet_id)
         matches.sort(key=lambda x: x['similarity'], reverse=True)
         return matches
 
-    def get_matched_angles(self, pet_features_path, query_img_path):
-        with open(pet_features_path) as f:
-            pet_data = json.load(f)
+    def get_matched_angles(self, pet_id, query_img_path):
+        pet_data = self.store.get(pet_id)
+        if pet_data is None:
+            return {}
         pet_type = pet_data['metadata']['type']
         weights = self.type_weights.get(pet_type, self.type_weights['dog'])
         query_features = self.extract_features(query_img_path)
@@ -131,57 +153,23 @@ class PetFeatureExtractor:
                 }
         return angle_scores
 
-    def search_by_image(self, query_img_path, pet_type=None, threshold=0.7, base_dir="app/uploads/pet_images"):
+    def search_by_image(self, query_img_path, pet_type=None, threshold=0.7):
         query_features = self.extract_features(query_img_path)
         if query_features is None:
             return []
+        # The query histogram stands in for every angle, so normalise it once
+        query_vec = self.normalize_features(query_features)
+        query = {img_type: query_vec for img_type in ['main', 'face', 'side', 'fur']}
+        pet_types = [pet_type] if pet_type else {m['type'] for m in self.store.list_metadata()}
         matches = []
-        pets_dir = Path(base_dir)
-        for pet_dir in pets_dir.iterdir():
-            if pet_dir.is_dir():
-                features_path = pet_dir / "features.json"
-                if features_path.exists():
-                    with open(features_path) as f:
-                        pet_data = json.load(f)
-                    if pet_type and pet_data['metadata']['type'] != pet_type:
-                        continue
-                    temp_source = {
-                        'main': query_features,
-                        'face': query_features,
-                        'side': query_features,
-                        'fur': query_features
-                    }
-                    similarity = self.compare_features(
-                        temp_source,
-                        pet_data['features'],
-                        pet_data['metadata']['type']
-                    )
-                    if similarity >= threshold:
-                        matches.append({
-                            'pet_id': pet_data['metadata']['pet_id'],
-                            'similarity': similarity,
-                            'features_path': str(features_path),
-                            'status': pet_data['metadata']['status']
-                        })
+        for candidate_type in pet_types:
+            matches.extend(self._rank_stored(query, candidate_type, threshold))
         matches.sort(key=lambda x: x['similarity'], reverse=True)
         return matches
 
-    def get_all_pets_with_fingerprints(self, base_dir="app/uploads/pet_images"):
-        pets_dir = Path(base_dir)
-        pet_ids = []
-        for pet_dir in pets_dir.iterdir():
-            if pet_dir.is_dir():
-                features_path = pet_dir / "features.json"
-                if features_path.exists():
-                    with open(features_path) as f:
-                        data = json.load(f)
-                    pet_ids.append({
-                        'pet_id': data['metadata']['pet_id'],
-                        'type': data['metadata']['type'],
-                        'status': data['metadata']['status'],
-                        'generated_at': data['metadata']['generated_at']
-                    })
-        return pet_ids
+    def get_all_pets_with_fingerprints(self):
+        # Served from the sidecar index; no fingerprint data is read
+        return self.store.list_metadata()
         
 
 
@@ -389,7 +377,7 @@ class PetFeatureExtractor:
 
 #         return angle_scores
 
-#     def search_by_image(self, query_img_path, pet_type=None, threshold=0.7, base_dir="app/uploads/pet_images"):
+#     def search_by_image(self, query_img_path, pet_type=None, threshold=0.7):
 #         if not self.enabled:
 #             print("Feature extractor is disabled. Cannot search by image.")
 #             return []
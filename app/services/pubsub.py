@@ -0,0 +1,85 @@
+"""In-process publish/subscribe for pushing live updates to clients.
+
+Publishers call ``pubsub.publish(topics, message)`` from any thread (sync
+endpoints run in the threadpool); every subscriber whose topics overlap
+receives the message once on its own asyncio queue. A slow subscriber's
+queue is bounded and drops its oldest messages rather than holding up the
+publisher.
+
+Only subscribers in this process are reached. To fan out across several
+API workers, replace ``LocalPubSub`` with a broker-backed class exposing
+the same ``publish``/``subscribe`` methods (e.g. Redis or Postgres
+LISTEN/NOTIFY) and keep the module-level ``pubsub`` name.
+"""
+import asyncio
+import threading
+
+QUEUE_SIZE = 100
+
+
+class Subscription:
+    def __init__(self, pubsub, topics, loop):
+        self._pubsub = pubsub
+        self.topics = frozenset(topics)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def _put(self, message):
+        # Runs on the subscriber's loop
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout=None):
+        """Next message, or None after ``timeout`` seconds without one."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self._pubsub._unsubscribe(self)
+
+
+class LocalPubSub:
+    def __init__(self):
+        self._topics = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, topics):
+        """Subscribe the running event loop to ``topics``. Close when done."""
+        subscription = Subscription(self, topics, asyncio.get_running_loop())
+        with self._lock:
+            for topic in subscription.topics:
+                self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._topics[topic]
+
+    def publish(self, topics, message):
+        """Deliver ``message`` once to each subscriber of any of ``topics``."""
+        with self._lock:
+            subscribers = set()
+            for topic in topics:
+                subscribers.update(self._topics.get(topic, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._put, message)
+            except RuntimeError:
+                # The subscriber's loop has closed
+                subscription.close()
+        return len(subscribers)
+
+    def subscriber_count(self, topic):
+        with self._lock:
+            return len(self._topics.get(topic, ()))
+
+
+pubsub = LocalPubSub()
@@ -0,0 +1,203 @@
+"""Object storage for uploaded images.
+
+Every router stores files through one ``StorageBackend``: Supabase buckets
+in production, or plain directories on local disk (``STORAGE_BACKEND=local``)
+so the whole app can run and be benchmarked offline. Backends are
+synchronous; ``AsyncStorage`` runs their calls on a small bounded thread
+pool so an upload never stalls the event loop, and shares one client (and
+its HTTP connection pool) across all routers.
+
+Routers keep only the object path (e.g. ``"12/main.jpg"``) in the database
+and turn it into a URL with ``storage.public_url(bucket, path)``.
+"""
+import os
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from pathlib import Path
+
+from app.core.config import settings
+
+
+class StorageError(Exception):
+    pass
+
+
+class StorageBackend(ABC):
+    """Blocking storage operations on ``bucket``/``path`` objects."""
+
+    @abstractmethod
+    def upload(self, bucket, path, content, content_type, upsert=False):
+        pass
+
+    def upload_many(self, bucket, files, upsert=False):
+        """Upload ``(path, content, content_type)`` tuples."""
+        for path, content, content_type in files:
+            self.upload(bucket, path, content, content_type, upsert=upsert)
+
+    @abstractmethod
+    def remove(self, bucket, paths):
+        """Delete every path in one call; missing objects are ignored."""
+
+    @abstractmethod
+    def list(self, bucket, prefix=""):
+        pass
+
+    def existing(self, bucket, paths):
+        """The subset of ``paths`` that already exist, one listing per folder."""
+        folders = {}
+        for path in paths:
+            folder, _, name = path.rpartition("/")
+            folders.setdefault(folder, set()).add(name)
+        found = set()
+        for folder, names in folders.items():
+            present = set(self.list(bucket, folder)) & names
+            found.update(f"{folder}/{name}" if folder else name for name in present)
+        return found
+
+    @abstractmethod
+    def url_prefix(self, bucket):
+        """Public URL of ``bucket`` without the trailing object path."""
+
+
+class SupabaseStorage(StorageBackend):
+    def __init__(self, url, key):
+        from supabase import create_client
+        self.url = url
+        self.client = create_client(url, key)
+
+    def upload(self, bucket, path, content, content_type, upsert=False):
+        file_options = {"content-type": content_type}
+        if upsert:
+            file_options["x-upsert"] = "true"
+        try:
+            self.client.storage.from_(bucket).upload(path=path, file=content, file_options=file_options)
+        except Exception as e:
+            raise StorageError(f"Upload of {path} failed: {str(e)}") from e
+
+    def remove(self, bucket, paths):
+        try:
+            self.client.storage.from_(bucket).remove(list(paths))
+        except Exception as e:
+            raise StorageError(f"Delete from {bucket} failed: {str(e)}") from e
+
+    def list(self, bucket, prefix=""):
+        try:
+            return [item["name"] for item in self.client.storage.from_(bucket).list(prefix)]
+        except Exception as e:
+            raise StorageError(f"Listing {bucket}/{prefix} failed: {str(e)}") from e
+
+    def url_prefix(self, bucket):
+        return f"{self.url}/storage/v1/object/public/{bucket}"
+
+
+class LocalStorage(StorageBackend):
+    """Keeps each bucket as a directory under ``root``, served at ``base_url``."""
+
+    def __init__(self, root, base_url):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+
+    def _path(self, bucket, path):
+        target = (self.root / bucket / path).resolve()
+        if not target.is_relative_to((self.root / bucket).resolve()):
+            raise StorageError(f"Invalid object path: {path}")
+        return target
+
+    def upload(self, bucket, path, content, content_type, upsert=False):
+        target = self._path(bucket, path)
+        if target.exists() and not upsert:
+            raise StorageError(f"Upload of {path} failed: object already exists")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content)
+
+    def remove(self, bucket, paths):
+        for path in paths:
+            self._path(bucket, path).unlink(missing_ok=True)
+
+    def list(self, bucket, prefix=""):
+        directory = self._path(bucket, prefix)
+        if not directory.is_dir():
+            return []
+        return sorted(entry.name for entry in directory.iterdir())
+
+    def url_prefix(self, bucket):
+        return f"{self.base_url}/{bucket}"
+
+
+class AsyncStorage:
+    """Awaitable wrapper that runs a blocking ``StorageBackend`` on a thread pool."""
+
+    def __init__(self, backend_factory, max_workers):
+        self._backend_factory = backend_factory
+        self._backend = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="storage")
+
+    @property
+    def backend(self):
+        with self._lock:
+            if self._backend is None:
+                self._backend = self._backend_factory()
+            return self._backend
+
+    async def _run(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(method, *args, **kwargs))
+
+    async def upload(self, bucket, path, content, content_type, upsert=False):
+        await self._run(self.backend.upload, bucket, path, content, content_type, upsert=upsert)
+
+    async def upload_many(self, bucket, files, upsert=False):
+        """Upload ``(path, content, content_type)`` tuples concurrently.
+
+        If any upload fails, the objects this call created are deleted again
+        and the first error is raised. Objects that existed before are never
+        deleted: with ``upsert`` an overwritten path keeps its new content.
+        """
+        existed = set()
+        if upsert:
+            existed = await self._run(self.backend.existing, bucket, [path for path, _, _ in files])
+        results = await asyncio.gather(
+            *(self.upload(bucket, path, content, content_type, upsert=upsert) for path, content, content_type in files),
+            return_exceptions=True
+        )
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            uploaded = [
+                path for (path, _, _), result in zip(files, results)
+                if not isinstance(result, Exception) and path not in existed
+            ]
+            try:
+                await self.remove(bucket, uploaded)
+            except StorageError:
+                pass
+            raise errors[0]
+
+    async def remove(self, bucket, paths):
+        if paths:
+            await self._run(self.backend.remove, bucket, list(paths))
+
+    async def list(self, bucket, prefix=""):
+        return await self._run(self.backend.list, bucket, prefix)
+
+    def public_url(self, bucket, path):
+        """Public URL of an object, or None for an empty path."""
+        if not path:
+            return None
+        return f"{self._url_prefix(bucket)}/{path}"
+
+    @lru_cache(maxsize=None)
+    def _url_prefix(self, bucket):
+        return self.backend.url_prefix(bucket)
+
+
+def _default_backend():
+    if settings.STORAGE_BACKEND == "local":
+        return LocalStorage(settings.LOCAL_STORAGE_DIR, settings.LOCAL_STORAGE_URL)
+    return SupabaseStorage(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+
+
+storage = AsyncStorage(_default_backend, max_workers=settings.STORAGE_WORKERS)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Pet fingerprint backfill script
+Creates a PetFingerprint row for every pet that has a fingerprint in the
+fingerprint store. Run scripts/migrate_fingerprints.py --into-store first
+if fingerprints are still in per-pet files.
+"""
+import os
+import sys
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime
+from app.database.database import SessionLocal
+from app.models.models import Pet, PetFingerprint
+from app.services.fingerprint_store import FingerprintStore, STORE_DIR
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def backfill(db, store):
+    """Insert missing rows and mark their pets, returning (created, skipped) counts"""
+    store.refresh()
+    stored = {m['pet_id']: m for m in store.list_metadata()}
+    if not stored:
+        return 0, 0
+    existing = {pet_id for (pet_id,) in db.query(PetFingerprint.pet_id).filter(PetFingerprint.pet_id.in_(stored))}
+    known_pets = {pet_id for (pet_id,) in db.query(Pet.id).filter(Pet.id.in_(stored))}
+
+    created = 0
+    for pet_id, metadata in stored.items():
+        if pet_id in existing or pet_id not in known_pets:
+            continue
+        db.add(PetFingerprint(
+            pet_id=pet_id,
+            pet_type=metadata['type'],
+            status=metadata['status'],
+            generated_at=datetime.fromisoformat(metadata['generated_at'])
+        ))
+        created += 1
+    db.query(Pet).filter(Pet.id.in_(known_pets)).update(
+        {Pet.has_generated_fingerprint: True}, synchronize_session=False
+    )
+    db.commit()
+    return created, len(stored) - created
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--store-dir", default=STORE_DIR)
+    args = parser.parse_args()
+
+    logger.info("🚀 Backfilling pet fingerprint rows...")
+    db = SessionLocal()
+    try:
+        created, skipped = backfill(db, FingerprintStore(args.store_dir))
+        logger.info(f"✅ Created {created} rows, skipped {skipped} existing or orphaned fingerprints")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Backfill failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
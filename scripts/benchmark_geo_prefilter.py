@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Distance prefilter benchmark
+Simulates find-similar over a city-scale catalog and compares scoring every
+candidate with one geodesic call each against the bounding-box prefilter
+plus vectorised haversine used by the endpoint
+"""
+import os
+import sys
+import time
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from geopy.distance import geodesic
+from app.services import geo
+from app.services.pet_feature_extractor import PetFeatureExtractor
+
+ANGLES = ['main', 'face', 'side', 'fur']
+DIM = 768  # RGB histogram bins
+CENTER = (14.5995, 120.9842)  # Manila
+GEODESIC_SAMPLE = 5000
+
+def random_catalog(rng, count, spread_km):
+    """Pets normally distributed around the city centre"""
+    lats = CENTER[0] + rng.normal(0, spread_km / geo.KM_PER_DEGREE_LAT, count)
+    lons = CENTER[1] + rng.normal(0, spread_km / geo.KM_PER_DEGREE_LON, count)
+    return lats, lons
+
+def bench_before(extractor, query, vectors, lats, lons, max_km):
+    """Score every candidate, then check each with geodesic (extrapolated from a sample)"""
+    start = time.perf_counter()
+    extractor.compare_features_batch(query, vectors, 'dog')
+    score_time = time.perf_counter() - start
+
+    sample = min(len(lats), GEODESIC_SAMPLE)
+    start = time.perf_counter()
+    kept = sum(geodesic(CENTER, (lats[i], lons[i])).km <= max_km for i in range(sample))
+    geodesic_time = (time.perf_counter() - start) * len(lats) / sample
+    return len(lats), score_time + geodesic_time, kept * len(lats) / sample
+
+def bench_after(extractor, query, vectors, lats, lons, max_km):
+    """Bounding box (answered by the lat/lon index in SQL), haversine, then score survivors"""
+    start = time.perf_counter()
+    min_lat, max_lat, min_lon, max_lon = geo.bounding_box(CENTER[0], CENTER[1], max_km)
+    in_box = np.flatnonzero((lats >= min_lat) & (lats <= max_lat) & (lons >= min_lon) & (lons <= max_lon))
+    km = geo.haversine_km(CENTER[0], CENTER[1], lats[in_box], lons[in_box])
+    survivors = in_box[km <= max_km]
+    extractor.compare_features_batch(query, {angle: vectors[angle][survivors] for angle in ANGLES}, 'dog')
+    return len(in_box), time.perf_counter() - start, len(survivors)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pets", type=int, default=50000)
+    parser.add_argument("--spread-km", type=float, default=15.0, help="Standard deviation of pet locations around the centre")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    extractor = PetFeatureExtractor()
+    lats, lons = random_catalog(rng, args.pets, args.spread_km)
+    matrix = extractor.normalize_features(rng.random((args.pets, DIM), dtype=np.float32))
+    vectors = {angle: matrix for angle in ANGLES}
+    query = {angle: matrix[0] for angle in ANGLES}
+
+    sample = min(args.pets, 1000)
+    exact = np.array([geodesic(CENTER, (lats[i], lons[i])).km for i in range(sample)])
+    fast = geo.haversine_km(CENTER[0], CENTER[1], lats[:sample], lons[:sample])
+    print(f"{args.pets} pets, sd {args.spread_km}km; haversine vs geodesic max error {np.abs(fast - exact).max() * 1000:.0f}m")
+
+    print(f"{'max km':>7} {'scored before':>14} {'bbox rows':>10} {'scored after':>13} {'before (ms)':>12} {'after (ms)':>11} {'speedup':>8}")
+    for max_km in [1, 3, 5]:
+        scored_before, before_time, _ = bench_before(extractor, query, vectors, lats, lons, max_km)
+        in_box, after_time, kept = bench_after(extractor, query, vectors, lats, lons, max_km)
+        print(f"{max_km:>7} {scored_before:>14} {in_box:>10} {kept:>13} {before_time * 1000:>12.1f} {after_time * 1000:>11.1f} {before_time / after_time:>7.0f}x")
+
+    if args.pets > GEODESIC_SAMPLE:
+        print(f"geodesic times are extrapolated from a {GEODESIC_SAMPLE} pet sample")
+
+if __name__ == "__main__":
+    main()
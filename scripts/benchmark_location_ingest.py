@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+GPS ingestion benchmark
+Measures fixes per second for the one-fix-per-request path (device lookup,
+insert and commit per fix) against the write-behind buffer behind /location
+and the batched ingest_fixes path. Runs on a
+throwaway SQLite database unless --database-url points elsewhere; use a
+scratch Postgres database to measure production-like numbers.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, select, delete
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from app.core.config import settings
+from app.models.models import Base, Device, DeviceLatestLocation, Location, Pet, User
+from app.services.location_ingest import ingest_fixes
+from app.services.location_buffer import LocationWriteBuffer
+
+@compiles(JSONB, "sqlite")
+def _jsonb_on_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+def make_fixes(device_count, per_device):
+    start = datetime.utcnow() - timedelta(hours=1)
+    return [
+        SimpleNamespace(
+            unique_code=f"BENCH-{d:04d}",
+            latitude=14.5995 + i * 1e-5,
+            longitude=120.9842 + d * 1e-4,
+            timestamp=start + timedelta(seconds=i * 10)
+        )
+        for i in range(per_device)
+        for d in range(device_count)
+    ]
+
+def bench_single(Session, fixes):
+    """What /location does per fix, minus its Supabase REST round trips"""
+    db = Session()
+    start = time.perf_counter()
+    for fix in fixes:
+        device = db.query(Device).filter(Device.unique_code == fix.unique_code).first()
+        device.last_seen = fix.timestamp
+        device.is_online = True
+        location = Location(
+            device_id=device.device_id,
+            latitude=fix.latitude,
+            longitude=fix.longitude,
+            timestamp=fix.timestamp
+        )
+        db.add(location)
+        db.commit()
+        db.refresh(location)
+    elapsed = time.perf_counter() - start
+    db.close()
+    return elapsed
+
+def bench_write_behind(Session, fixes, flush_size):
+    """/location now: one device lookup and a buffer append per fix"""
+    buffer = LocationWriteBuffer(Session, max_fixes=flush_size, spill_file=os.devnull)
+    db = Session()
+    start = time.perf_counter()
+    for fix in fixes:
+        device = db.query(Device.device_id).filter(Device.unique_code == fix.unique_code).first()
+        buffer.append(device.device_id, fix.latitude, fix.longitude, fix.timestamp)
+        if buffer.pending() >= flush_size:
+            buffer.flush()
+    buffer.flush()
+    elapsed = time.perf_counter() - start
+    db.close()
+    return elapsed
+
+def bench_batch(Session, fixes, batch_size):
+    db = Session()
+    start = time.perf_counter()
+    for offset in range(0, len(fixes), batch_size):
+        ingest_fixes(db, fixes[offset:offset + batch_size])
+    elapsed = time.perf_counter() - start
+    db.close()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--fixes-per-device", type=int, default=100)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[50, 500, 5000])
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/ingest.db"
+    engine = create_engine(url)
+    tables = [User.__table__, Pet.__table__, Device.__table__, Location.__table__, DeviceLatestLocation.__table__]
+    Base.metadata.create_all(engine, tables=tables)
+    Session = sessionmaker(bind=engine)
+
+    db = Session()
+    db.add_all(Device(unique_code=f"BENCH-{d:04d}", is_active=True) for d in range(args.devices))
+    db.commit()
+    db.close()
+
+    fixes = make_fixes(args.devices, args.fixes_per_device)
+    print(f"{len(fixes)} fixes from {args.devices} devices on {engine.dialect.name}")
+    print(f"{'path':>16} {'seconds':>9} {'fixes/s':>10}")
+
+    elapsed = bench_single(Session, fixes)
+    print(f"{'one per request':>16} {elapsed:>9.2f} {len(fixes) / elapsed:>10.0f}")
+    elapsed = bench_write_behind(Session, fixes, settings.LOCATION_FLUSH_SIZE)
+    print(f"{'write-behind':>16} {elapsed:>9.2f} {len(fixes) / elapsed:>10.0f}")
+    for batch_size in args.batch_sizes:
+        elapsed = bench_batch(Session, fixes, batch_size)
+        print(f"{'batch of ' + str(batch_size):>16} {elapsed:>9.2f} {len(fixes) / elapsed:>10.0f}")
+
+    if args.database_url:
+        bench_devices = select(Device.device_id).where(Device.unique_code.like("BENCH-%"))
+        with engine.begin() as conn:
+            conn.execute(delete(Location).where(Location.device_id.in_(bench_devices)))
+            conn.execute(delete(DeviceLatestLocation).where(DeviceLatestLocation.device_id.in_(bench_devices)))
+            conn.execute(delete(Device).where(Device.unique_code.like("BENCH-%")))
+
+if __name__ == "__main__":
+    main()
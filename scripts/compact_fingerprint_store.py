@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Fingerprint store compaction script
+Rewrites the fingerprint store without superseded or deleted rows.
+Stop the API before running it; workers keep the old file mapped.
+"""
+import os
+import sys
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.fingerprint_store import FingerprintStore, STORE_DIR
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--store-dir", default=STORE_DIR)
+    args = parser.parse_args()
+
+    logger.info(f"🚀 Compacting fingerprint store in {args.store_dir}...")
+    store = FingerprintStore(args.store_dir)
+    rows_before, rows_after = store.compact()
+    logger.info(f"✅ Compacted {rows_before} rows down to {rows_after} live fingerprints")
+
+if __name__ == "__main__":
+    main()
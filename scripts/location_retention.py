@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Location retention job
+Rolls raw GPS fixes older than LOCATION_RETENTION_DAYS up into hourly
+track summaries and deletes them from xxlocation_db. Safe to re-run or
+interrupt; schedule it daily (e.g. a Railway cron service or crontab).
+"""
+import os
+import sys
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.database.database import SessionLocal
+from app.services.location_retention import run_retention
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--retention-days", type=int, default=settings.LOCATION_RETENTION_DAYS)
+    parser.add_argument("--max-points", type=int, default=settings.LOCATION_ROLLUP_POINTS,
+                        help="points kept per hourly path")
+    args = parser.parse_args()
+
+    logger.info(f"🚀 Rolling up fixes older than {args.retention_days} days...")
+    db = SessionLocal()
+    try:
+        result = run_retention(db, retention_days=args.retention_days, max_points=args.max_points)
+        logger.info(
+            f"✅ Rolled {result['fixes']} fixes from {result['devices']} devices "
+            f"into {result['rollups']} hourly rollups (before {result['cutoff'].isoformat()})"
+        )
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Retention failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Fingerprint migration script
+Converts every legacy features.json under the pet image directory
+into the binary fingerprint.bin format. Safe to run more than once.
+With --into-store, imports every per-pet fingerprint into the
+catalog-wide fingerprint store instead.
+"""
+import os
+import sys
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pathlib import Path
+from datetime import datetime
+from app.services import fingerprint_format
+from app.services.fingerprint_store import FingerprintStore, STORE_DIR
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def migrate(base_dir, remove_legacy=False, force=False):
+    """Convert each pet directory, returning (converted, skipped, failed) counts"""
+    converted = skipped = failed = 0
+    bytes_before = bytes_after = 0
+    for pet_dir in sorted(Path(base_dir).iterdir()):
+        legacy_path = pet_dir / fingerprint_format.LEGACY_FILENAME
+        if not pet_dir.is_dir() or not legacy_path.exists():
+            continue
+        if fingerprint_format.fingerprint_path(pet_dir).exists() and not force:
+            skipped += 1
+            continue
+        try:
+            size = legacy_path.stat().st_size
+            path = fingerprint_format.migrate_legacy_file(pet_dir, remove_legacy=remove_legacy)
+            bytes_before += size
+            bytes_after += path.stat().st_size
+            converted += 1
+        except Exception as e:
+            logger.error(f"❌ Failed to convert {legacy_path}: {e}")
+            failed += 1
+    if converted:
+        logger.info(f"Fingerprint storage: {bytes_before / 1024:.0f}KB JSON -> {bytes_after / 1024:.0f}KB binary")
+    return converted, skipped, failed
+
+def import_into_store(base_dir, store_dir, remove_files=False):
+    """Append each per-pet fingerprint to the store, returning (imported, skipped, failed) counts"""
+    store = FingerprintStore(store_dir)
+    store.refresh()
+    imported = skipped = failed = 0
+    for pet_dir in sorted(Path(base_dir).iterdir()):
+        path = fingerprint_format.find_fingerprint_file(pet_dir) if pet_dir.is_dir() else None
+        if path is None:
+            continue
+        try:
+            data = fingerprint_format.read_any(path, mmap=False)
+            metadata = data['metadata']
+            if store.contains(metadata['pet_id']):
+                skipped += 1
+            else:
+                store.put(
+                    metadata['pet_id'],
+                    metadata['type'],
+                    metadata['status'],
+                    data['features'],
+                    generated_at=datetime.fromisoformat(metadata['generated_at'])
+                )
+                imported += 1
+            if remove_files:
+                path.unlink()
+        except Exception as e:
+            logger.error(f"❌ Failed to import {path}: {e}")
+            failed += 1
+    return imported, skipped, failed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-dir", default="app/uploads/pet_images")
+    parser.add_argument("--remove-json", action="store_true", help="Delete each source file after converting or importing it")
+    parser.add_argument("--force", action="store_true", help="Rewrite fingerprint.bin even if it already exists")
+    parser.add_argument("--into-store", action="store_true", help="Import per-pet fingerprints into the fingerprint store")
+    parser.add_argument("--store-dir", default=STORE_DIR)
+    args = parser.parse_args()
+
+    if args.into_store:
+        logger.info(f"🚀 Importing fingerprints from {args.base_dir} into {args.store_dir}...")
+        imported, skipped, failed = import_into_store(args.base_dir, args.store_dir, args.remove_json)
+        logger.info(f"✅ Imported {imported}, skipped {skipped} already stored, {failed} failed")
+        if failed:
+            sys.exit(1)
+        return
+
+    logger.info(f"🚀 Migrating fingerprints in {args.base_dir}...")
+    converted, skipped, failed = migrate(args.base_dir, args.remove_json, args.force)
+    logger.info(f"✅ Converted {converted}, skipped {skipped} already migrated, {failed} failed")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Notification count reconciliation
+Recomputes every user's unread notification count (the navbar badge) from
+xxuser_notifications_db and fixes the ones that drifted. Only needed after
+notifications were written outside the app; safe to re-run.
+"""
+import os
+import sys
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.database import SessionLocal
+from app.services.notification_counter import reconcile
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--user-id", type=int, action="append", dest="user_ids",
+                        help="only reconcile this user (repeatable)")
+    args = parser.parse_args()
+
+    logger.info("🚀 Reconciling unread notification counts...")
+    db = SessionLocal()
+    try:
+        fixed = reconcile(db, args.user_ids)
+        for user_id, (old, new) in sorted(fixed.items()):
+            logger.info(f"🔧 User {user_id}: {old} -> {new}")
+        logger.info(f"✅ Fixed {len(fixed)} counts")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Reconciliation failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
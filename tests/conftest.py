@@ -0,0 +1,69 @@
+"""Shared fixtures: a throwaway SQLite database with every table.
+
+The models use PostgreSQL's JSONB, which SQLite stores as plain JSON.
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from app.database.database import get_db
+from app.models.models import Base, User
+from app.routers import notification_router
+from app.services import announcements
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_as_json(type_, compiler, **kw):
+    return "JSON"
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def announcement_timeline(monkeypatch):
+    # The per-process cache would otherwise carry ids between test databases
+    monkeypatch.setattr(announcements, "timeline", announcements._Timeline())
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def make_user(db):
+    def make(email, **fields):
+        user = User(name=email.split("@")[0], email=email, hashed_password="x", roles="user", **fields)
+        db.add(user)
+        db.commit()
+        return user
+    return make
+
+
+@pytest.fixture
+def client(session_factory):
+    """``TestClient`` for the notification endpoints on the test database."""
+    app = FastAPI()
+    app.include_router(notification_router.router)
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.models import Announcement, Notification, UserNotification
+from app.services import announcements
+
+
+@pytest.fixture
+def user(db, make_user):
+    settings = Notification(account_updates=True, pet_reminders=True, marketing_emails=False, push_notifications=True)
+    db.add(settings)
+    db.commit()
+    return make_user("alice@example.com", created_at=datetime.utcnow() - timedelta(days=1),
+                     notification_id=settings.id)
+
+
+def _badge(client, user):
+    return client.get(f"/api/notifications/unread-count/{user.id}").json()["unread_count"]
+
+
+def test_publish_drops_recent_duplicates(db):
+    assert announcements.publish(db, "Maintenance", "Down at noon") is not None
+    assert announcements.publish(db, "Maintenance", "Down at noon") is None
+    assert announcements.publish(db, "Maintenance", "Down at one") is not None
+
+
+def test_watermark_moves_forward_only(db, client, user):
+    first = announcements.publish(db, "One", "1")
+    second = announcements.publish(db, "Two", "2")
+    third = announcements.publish(db, "Three", "3")
+    assert _badge(client, user) == 3
+
+    client.patch(f"/api/notifications/announcements/{second.id}/read", params={"user_id": user.id})
+    assert announcements.read_up_to(db, user.id) == second.id
+    assert _badge(client, user) == 1
+
+    client.patch(f"/api/notifications/announcements/{first.id}/read", params={"user_id": user.id})
+    db.expire_all()
+    assert announcements.read_up_to(db, user.id) == second.id
+
+    client.patch(f"/api/notifications/announcements/{third.id}/read", params={"user_id": user.id})
+    assert _badge(client, user) == 0
+
+
+def test_unknown_announcement_is_not_found(client, user):
+    response = client.patch("/api/notifications/announcements/999/read", params={"user_id": user.id})
+    assert response.status_code == 404
+
+
+def test_users_only_see_announcements_after_signing_up(db, client, user, make_user):
+    announcements.publish(db, "Old news", "before")
+    newcomer = make_user("bob@example.com", created_at=datetime.utcnow() + timedelta(seconds=1))
+    db.add(Announcement(title="Fresh", message="after", created_at=datetime.utcnow() + timedelta(seconds=2)))
+    db.commit()
+    announcements.timeline.expire()
+
+    assert _badge(client, user) == 2
+    assert _badge(client, newcomer) == 1
+
+
+def test_badge_picks_up_other_processes_after_the_ttl(db, client, user):
+    announcements.publish(db, "Here", "local")
+    assert _badge(client, user) == 1
+
+    # Written by another process: invisible until the cache expires
+    db.add(Announcement(title="There", message="remote", created_at=datetime.utcnow()))
+    db.commit()
+    assert _badge(client, user) == 1
+    announcements.timeline.expire()
+    assert _badge(client, user) == 2
+
+
+def test_mark_all_read_covers_announcements(db, client, user):
+    announcements.publish(db, "One", "1")
+    announcements.publish(db, "Two", "2")
+
+    client.patch(f"/api/notifications/mark-all-read/{user.id}")
+
+    assert _badge(client, user) == 0
+    assert announcements.unread_count(db, user.id) == 0
+
+
+def test_notification_list_merges_announcements_with_kinds(db, client, user):
+    db.add(UserNotification(user_id=user.id, title="Found", message="m", notification_type="pet",
+                            is_read=False, created_at=datetime.utcnow() - timedelta(minutes=1)))
+    db.commit()
+    announcement = announcements.publish(db, "Hello", "everyone")
+
+    notifications = client.get(f"/api/notifications/user/{user.id}").json()["notifications"]
+
+    assert [(n["kind"], n["title"]) for n in notifications] == [
+        ("announcement", "Announcement: Hello"),
+        ("notification", "Found")
+    ]
+    assert all(isinstance(n["id"], int) for n in notifications)
+    assert notifications[0]["announcement_id"] == announcement.id
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from app.services.pet_feature_extractor import PetFeatureExtractor
+
+ANGLES = ['main', 'face', 'side', 'fur']
+
+
+def _features(rng, dim=768):
+    return {angle: rng.random(dim) for angle in ANGLES}
+
+
+@pytest.mark.parametrize("pet_type", ["dog", "cat", "rabbit"])
+def test_batch_scores_match_pairwise(pet_type):
+    rng = np.random.default_rng(7)
+    extractor = PetFeatureExtractor(store=object())
+    query = _features(rng)
+    candidates = [_features(rng) for _ in range(25)]
+
+    batch = extractor.compare_features_batch(
+        {angle: extractor.normalize_features(query[angle]) for angle in ANGLES},
+        {angle: extractor.normalize_features([c[angle] for c in candidates]) for angle in ANGLES},
+        pet_type
+    )
+    pairwise = [extractor.compare_features(query, candidate, pet_type) for candidate in candidates]
+
+    np.testing.assert_allclose(batch, pairwise, rtol=1e-5)
+
+
+def test_batch_skips_missing_angles_like_pairwise():
+    rng = np.random.default_rng(3)
+    extractor = PetFeatureExtractor(store=object())
+    query = _features(rng)
+    del query['fur']
+    candidate = _features(rng)
+
+    batch = extractor.compare_features_batch(
+        {angle: extractor.normalize_features(vector) for angle, vector in query.items()},
+        {angle: extractor.normalize_features([vector]) for angle, vector in candidate.items()},
+        'dog'
+    )
+
+    assert batch[0] == pytest.approx(extractor.compare_features(query, candidate, 'dog'), rel=1e-5)
+
+
+def test_batch_with_no_shared_angles_scores_zero():
+    extractor = PetFeatureExtractor(store=object())
+    scores = extractor.compare_features_batch({}, {'main': np.ones((3, 4), dtype=np.float32)}, 'dog')
+    assert scores.tolist() == [0.0, 0.0, 0.0]
@@ -0,0 +1,109 @@
+import numpy as np
+
+from app.services.fingerprint_store import FingerprintStore
+
+ANGLES = ['main', 'face', 'side', 'fur']
+DIM = 8
+
+
+def _features(seed):
+    rng = np.random.default_rng(seed)
+    return {angle: rng.random(DIM) for angle in ANGLES}
+
+
+def _normalised(vector):
+    return vector / np.linalg.norm(vector)
+
+
+def test_put_stores_normalised_rows(tmp_path):
+    store = FingerprintStore(tmp_path, dim=DIM)
+    features = _features(1)
+    store.put(7, "Dog", "Lost", features)
+
+    data = store.get(7)
+    assert data['metadata']['type'] == "dog"
+    assert data['metadata']['status'] == "lost"
+    for angle in ANGLES:
+        np.testing.assert_allclose(data['features'][angle], _normalised(features[angle]), rtol=1e-6)
+
+
+def test_put_supersedes_earlier_row(tmp_path):
+    store = FingerprintStore(tmp_path, dim=DIM)
+    store.put(7, "dog", "lost", _features(1))
+    replacement = _features(2)
+    store.put(7, "dog", "found", replacement)
+
+    data = store.get(7)
+    assert data['row'] == 1
+    assert data['metadata']['status'] == "found"
+    np.testing.assert_allclose(data['features']['main'], _normalised(replacement['main']), rtol=1e-6)
+    assert len(store.list_metadata()) == 1
+
+
+def test_delete_tombstones_pet(tmp_path):
+    store = FingerprintStore(tmp_path, dim=DIM)
+    store.put(7, "dog", "lost", _features(1))
+
+    assert store.delete(7) is True
+    assert store.get(7) is None
+    assert store.delete(7) is False
+
+
+def test_second_instance_sees_appends_on_refresh(tmp_path):
+    writer = FingerprintStore(tmp_path, dim=DIM)
+    reader = FingerprintStore(tmp_path, dim=DIM)
+    writer.put(1, "dog", "lost", _features(1))
+    assert reader.contains(1)
+
+    writer.put(2, "cat", "lost", _features(2))
+    writer.delete(1)
+    reader.refresh()
+    assert set(reader.entries) == {2}
+    pet_ids, rows, statuses = reader.live_rows("cat")
+    assert pet_ids.tolist() == [2]
+    assert statuses == ["lost"]
+
+
+def test_writes_from_two_instances_never_share_a_row(tmp_path):
+    first = FingerprintStore(tmp_path, dim=DIM)
+    second = FingerprintStore(tmp_path, dim=DIM)
+    first.put(1, "dog", "lost", _features(1))
+    second.put(2, "dog", "lost", _features(2))
+    first.put(3, "dog", "lost", _features(3))
+
+    first.refresh()
+    assert sorted(entry['row'] for entry in first.entries.values()) == [0, 1, 2]
+
+
+def test_compact_keeps_live_rows_and_other_instances_follow(tmp_path):
+    store = FingerprintStore(tmp_path, dim=DIM)
+    reader = FingerprintStore(tmp_path, dim=DIM)
+    for pet_id in range(1, 5):
+        store.put(pet_id, "dog", "lost", _features(pet_id))
+    store.put(2, "dog", "found", _features(20))
+    store.delete(3)
+    reader.refresh()
+
+    assert store.compact() == (5, 3)
+    assert not (tmp_path / "fingerprints-1.dat").exists()
+
+    reader.refresh()
+    assert set(reader.entries) == {1, 2, 4}
+    assert sorted(entry['row'] for entry in reader.entries.values()) == [0, 1, 2]
+    np.testing.assert_allclose(
+        reader.get(2)['features']['main'], _normalised(_features(20)['main']), rtol=1e-6
+    )
+    assert reader.get(2)['metadata']['status'] == "found"
+
+
+def test_refresh_ignores_trailing_partial_line(tmp_path):
+    store = FingerprintStore(tmp_path, dim=DIM)
+    store.put(1, "dog", "lost", _features(1))
+    with open(store.log_path, "ab") as f:
+        f.write(b'{"op": "del", "pet_id"')
+
+    reader = FingerprintStore(tmp_path, dim=DIM)
+    assert reader.contains(1)
+    with open(store.log_path, "ab") as f:
+        f.write(b': 1}\n')
+    assert not reader.contains(1)
@@ -0,0 +1,147 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.models import Geofence, Pet, UserNotification
+from app.services import geofence_engine, notification_counter
+from app.services.geofence_engine import GeofenceEngine
+
+START = datetime(2026, 1, 1)
+HOME = (14.6, 121.0)
+AWAY = (14.7, 121.0)
+
+
+@pytest.fixture
+def pet(db, make_user):
+    owner = make_user("owner@example.com")
+    pet = Pet(name="Bella", type="dog", gender="female", status="safe at home",
+              user_id=owner.id, date=START, address="Manila")
+    db.add(pet)
+    db.commit()
+    return pet
+
+
+@pytest.fixture
+def fence(db, pet):
+    fence = Geofence(pet_id=pet.id, name="Home", kind="circle",
+                     center_latitude=HOME[0], center_longitude=HOME[1], radius_m=200, is_active=True)
+    db.add(fence)
+    db.commit()
+    return fence
+
+
+def _fix(pet, position, minute):
+    return pet.id, position[0], position[1], START + timedelta(minutes=minute)
+
+
+def _engine(db):
+    engine = GeofenceEngine()
+    engine.load(db)
+    return engine
+
+
+def _titles(db):
+    return [n.title for n in db.query(UserNotification).order_by(UserNotification.id)]
+
+
+def test_first_fix_only_records_state(db, pet, fence):
+    events = _engine(db).evaluate(db, [_fix(pet, HOME, 0)])
+
+    assert events == []
+    db.refresh(fence)
+    assert fence.pet_inside is True
+    assert _titles(db) == []
+
+
+def test_exit_and_enter_notify_the_owner(db, pet, fence):
+    engine = _engine(db)
+    events = engine.evaluate(db, [_fix(pet, HOME, 0), _fix(pet, AWAY, 1), _fix(pet, AWAY, 2), _fix(pet, HOME, 3)])
+
+    assert [event.entered for event in events] == [False, True]
+    assert _titles(db) == ["Bella left Home", "Bella entered Home"]
+    assert notification_counter.unread_count(db, pet.user_id) == 2
+
+
+def test_fixes_apply_in_time_order(db, pet, fence):
+    engine = _engine(db)
+    engine.evaluate(db, [_fix(pet, HOME, 0)])
+    events = engine.evaluate(db, [_fix(pet, HOME, 5), _fix(pet, AWAY, 4)])
+
+    assert [(event.entered, event.timestamp.minute) for event in events] == [(False, 4), (True, 5)]
+
+
+def test_polygon_fence(db, pet):
+    db.add(Geofence(pet_id=pet.id, name="Park", kind="polygon", is_active=True,
+                    polygon=[[14.61, 121.01], [14.62, 121.01], [14.62, 121.02], [14.61, 121.02]]))
+    db.commit()
+    events = _engine(db).evaluate(db, [_fix(pet, AWAY, 0), _fix(pet, (14.615, 121.015), 1)])
+
+    assert [event.entered for event in events] == [True]
+    assert _titles(db) == ["Bella entered Park"]
+
+
+def test_second_worker_does_not_notify_twice(db, session_factory, pet, fence):
+    first, second = _engine(db), _engine(db)
+    first.evaluate(db, [_fix(pet, HOME, 0)])
+    second.evaluate(db, [_fix(pet, HOME, 0)])
+
+    first.evaluate(db, [_fix(pet, AWAY, 1)])
+    other_db = session_factory()
+    assert second.evaluate(other_db, [_fix(pet, AWAY, 1)]) == []
+    other_db.close()
+
+    assert _titles(db) == ["Bella left Home"]
+
+
+def test_lost_update_reloads_state_from_the_database(db, pet, fence):
+    engine = _engine(db)
+    engine.evaluate(db, [_fix(pet, HOME, 0)])
+    # Another worker saw the pet leave; this one still thinks it is home
+    db.query(Geofence).filter(Geofence.id == fence.id).update({"pet_inside": False})
+    db.commit()
+
+    assert engine.evaluate(db, [_fix(pet, AWAY, 1)]) == []
+    assert engine._state[fence.id] is False
+    assert [event.entered for event in engine.evaluate(db, [_fix(pet, HOME, 2)])] == [True]
+
+
+def test_pet_without_fences_is_ignored(db, pet):
+    engine = _engine(db)
+    assert not engine.has_fences(pet.id)
+    assert engine.evaluate(db, [_fix(pet, HOME, 0)]) == []
+
+
+def _advance(monkeypatch, seconds):
+    now = time.monotonic() + seconds
+    monkeypatch.setattr(geofence_engine.time, "monotonic", lambda: now)
+
+
+def test_other_worker_drops_a_deleted_fence_after_reload(db, monkeypatch, pet, fence):
+    first, second = _engine(db), _engine(db)
+    second.evaluate(db, [_fix(pet, HOME, 0)])
+
+    db.delete(fence)
+    db.commit()
+    first.load(db)
+    assert not first.has_fences(pet.id)
+
+    _advance(monkeypatch, second.reload_after)
+    assert second.evaluate(db, [_fix(pet, AWAY, 1)]) == []
+    assert not second.has_fences(pet.id)
+    assert _titles(db) == []
+
+
+def test_other_worker_picks_up_a_new_fence_after_reload(db, monkeypatch, pet):
+    engine = _engine(db)
+    assert not engine.has_fences(pet.id)
+
+    db.add(Geofence(pet_id=pet.id, name="Home", kind="circle",
+                    center_latitude=HOME[0], center_longitude=HOME[1], radius_m=200, is_active=True))
+    db.commit()
+    assert engine.evaluate(db, [_fix(pet, HOME, 0)]) == []
+    assert not engine.has_fences(pet.id)
+
+    _advance(monkeypatch, engine.reload_after)
+    engine.evaluate(db, [_fix(pet, HOME, 1)])
+    assert [event.entered for event in engine.evaluate(db, [_fix(pet, AWAY, 2)])] == [False]
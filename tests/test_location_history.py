@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.models import Device, Location
+from app.services import location_history
+from app.services.location_history import HistoryPoint, one_per_interval, simplify_track
+from app.services.location_retention import run_retention
+
+START = datetime(2026, 1, 1)
+
+
+def _track(points):
+    return [
+        HistoryPoint(i + 1, latitude, longitude, START + timedelta(minutes=i))
+        for i, (latitude, longitude) in enumerate(points)
+    ]
+
+
+def test_simplify_track_keeps_short_tracks_whole():
+    rows = _track([(14.6, 121.0), (14.7, 121.1)])
+    assert simplify_track(rows, 5) == rows
+
+
+def test_simplify_track_keeps_endpoints_and_the_corner():
+    # Walk east along a line, then turn north
+    rows = _track([(14.6, 121.0 + i * 0.001) for i in range(10)] + [(14.6 + i * 0.001, 121.009) for i in range(1, 10)])
+    simplified = simplify_track(rows, 3)
+
+    assert [row.location_id for row in simplified] == [1, 10, 19]
+
+
+def test_simplify_track_never_exceeds_max_points():
+    rows = _track([(14.6 + (i % 7) * 0.001, 121.0 + i * 0.001) for i in range(200)])
+    for max_points in (2, 10, 50):
+        simplified = simplify_track(rows, max_points)
+        assert len(simplified) == max_points
+        assert simplified[0] is rows[0] and simplified[-1] is rows[-1]
+        assert simplified == sorted(simplified, key=lambda row: row.timestamp)
+
+
+@pytest.mark.parametrize("max_points, expected", [(1, [19]), (0, [])])
+def test_simplify_track_below_two_points(max_points, expected):
+    rows = _track([(14.6, 121.0 + i * 0.001) for i in range(19)])
+    assert [row.location_id for row in simplify_track(rows, max_points)] == expected
+
+
+def test_one_per_interval_keeps_latest_fix_of_each_bucket():
+    rows = _track([(14.6, 121.0)] * 35)
+    kept = one_per_interval(rows, timedelta(minutes=15))
+
+    assert [row.timestamp.minute for row in kept] == [14, 29, 34]
+
+
+@pytest.fixture
+def device(db):
+    device = Device(unique_code="TRACKER-1")
+    db.add(device)
+    db.commit()
+    return device
+
+
+def _add_fixes(db, device, count):
+    db.add_all(
+        Location(
+            device_id=device.device_id,
+            latitude=14.6 + i * 0.0001,
+            longitude=121.0,
+            timestamp=START + timedelta(minutes=i)
+        )
+        for i in range(count)
+    )
+    db.commit()
+
+
+def _page_through(db, device, limit, **window):
+    rows, cursor, pages = [], None, 0
+    while True:
+        page, cursor = location_history.fetch_page(db, device.device_id, cursor=cursor, limit=limit, **window)
+        rows.extend(page)
+        pages += 1
+        if cursor is None:
+            return rows, pages
+
+
+def test_cursor_pages_cover_every_fix_once(db, device):
+    _add_fixes(db, device, 23)
+    rows, pages = _page_through(db, device, 5)
+
+    assert pages == 5
+    assert [row.timestamp for row in rows] == [START + timedelta(minutes=i) for i in reversed(range(23))]
+
+
+def test_cursor_pages_continue_into_rollups(db, device):
+    _add_fixes(db, device, 180)
+    # Roll the first two hours up, keeping every point of their paths
+    run_retention(db, now=START + timedelta(days=30, hours=2), retention_days=30, max_points=60)
+    assert db.query(Location).count() == 60
+
+    rows, _ = _page_through(db, device, 7)
+
+    assert [row.timestamp for row in rows] == [START + timedelta(minutes=i) for i in reversed(range(180))]
+    assert all(row.location_id is not None for row in rows[:60])
+    assert all(row.location_id is None for row in rows[60:])
+
+
+def test_cursor_pages_respect_the_window(db, device):
+    _add_fixes(db, device, 180)
+    run_retention(db, now=START + timedelta(days=30, hours=2), retention_days=30, max_points=60)
+
+    rows, _ = _page_through(
+        db, device, 4, start=START + timedelta(minutes=110), end=START + timedelta(minutes=130)
+    )
+
+    assert [row.timestamp for row in rows] == [START + timedelta(minutes=i) for i in reversed(range(110, 130))]
+
+
+def test_invalid_cursor_is_rejected(db, device):
+    with pytest.raises(location_history.CursorError):
+        location_history.fetch_page(db, device.device_id, cursor="yesterday")
+
+
+def test_fetch_downsampled_buckets_newest_first(db, device):
+    _add_fixes(db, device, 60)
+    rows = location_history.fetch_downsampled(
+        db, device.device_id, start=START, end=START + timedelta(hours=1), interval_minutes=15
+    )
+
+    assert [row.timestamp.minute for row in rows] == [59, 44, 29, 14]
@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.models import Conversation, Message
+from app.services import message_history
+
+START = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def users(make_user):
+    return make_user("alice@example.com"), make_user("bob@example.com")
+
+
+@pytest.fixture
+def conversation(db, users):
+    conversation = Conversation(user1=users[0].id, user2=users[1].id, last_activity_at=START)
+    db.add(conversation)
+    db.commit()
+    return conversation
+
+
+def _send(db, conversation, sender, receiver, timestamp, text="hi"):
+    message = Message(conversation_id=conversation.id, sender_id=sender.id, receiver_id=receiver.id,
+                      text=text, is_read=False, timestamp=timestamp)
+    db.add(message)
+    db.flush()
+    message_history.record_message(db, conversation, message)
+    db.commit()
+    return message
+
+
+def _all_pages(db, conversation, limit):
+    pages, cursor = [], None
+    while True:
+        page, cursor = message_history.fetch_page(db, conversation.id, cursor=cursor, limit=limit)
+        pages.append([message.id for message in page])
+        if cursor is None:
+            return pages
+
+
+def test_pages_run_newest_to_oldest_each_oldest_first(db, users, conversation):
+    alice, bob = users
+    ids = [_send(db, conversation, alice, bob, START + timedelta(minutes=i)).id for i in range(7)]
+
+    assert _all_pages(db, conversation, 3) == [ids[4:7], ids[1:4], ids[0:1]]
+
+
+def test_cursor_splits_messages_with_the_same_timestamp(db, users, conversation):
+    alice, bob = users
+    ids = [_send(db, conversation, alice, bob, START).id for _ in range(5)]
+
+    assert _all_pages(db, conversation, 2) == [ids[3:5], ids[1:3], ids[0:1]]
+
+
+def test_exact_page_has_no_next_cursor(db, users, conversation):
+    alice, bob = users
+    for i in range(3):
+        _send(db, conversation, alice, bob, START + timedelta(minutes=i))
+
+    page, cursor = message_history.fetch_page(db, conversation.id, limit=3)
+    assert len(page) == 3
+    assert cursor is None
+
+
+def test_invalid_cursor_is_rejected(db, conversation):
+    with pytest.raises(message_history.CursorError):
+        message_history.fetch_page(db, conversation.id, cursor="not-a-cursor")
+
+
+def test_mark_read_up_to_only_reaches_rendered_messages(db, users, conversation):
+    alice, bob = users
+    messages = [_send(db, conversation, alice, bob, START + timedelta(minutes=i)) for i in range(4)]
+    _send(db, conversation, bob, alice, START + timedelta(minutes=5))
+    db.refresh(conversation)
+    assert message_history.unread_count(conversation, bob.id) == 4
+    assert message_history.unread_count(conversation, alice.id) == 1
+
+    assert message_history.mark_read_up_to(db, conversation, bob.id, messages[1]) == 2
+    db.commit()
+    db.refresh(conversation)
+    assert message_history.unread_count(conversation, bob.id) == 2
+    assert [m.is_read for m in db.query(Message).filter(Message.receiver_id == bob.id).order_by(Message.id)] == [
+        True, True, False, False
+    ]
+
+    # Receipts never move backwards or below zero
+    assert message_history.mark_read_up_to(db, conversation, bob.id, messages[0]) == 0
+    assert message_history.mark_read_up_to(db, conversation, bob.id, messages[3]) == 2
+    db.commit()
+    db.refresh(conversation)
+    assert message_history.unread_count(conversation, bob.id) == 0
+    assert message_history.unread_count(conversation, alice.id) == 1
+
+
+def test_inbox_pages_by_last_activity_from_both_sides(db, make_user):
+    me = make_user("me@example.com")
+    others = [make_user(f"friend{i}@example.com") for i in range(5)]
+    conversations = []
+    for i, other in enumerate(others):
+        # Alternate which side of the conversation the user is on
+        pair = (me.id, other.id) if i % 2 else (other.id, me.id)
+        conversation = Conversation(user1=pair[0], user2=pair[1], last_activity_at=START)
+        db.add(conversation)
+        db.commit()
+        _send(db, conversation, other, me, START + timedelta(minutes=i), text=f"from {i}")
+        conversations.append(conversation)
+
+    pages, cursor = [], None
+    while True:
+        rows, cursor = message_history.fetch_inbox(db, me.id, cursor=cursor, limit=2)
+        pages.append([(row[0].id, row[1].id, row[2].text) for row in rows])
+        if cursor is None:
+            break
+
+    expected = [(conversations[i].id, others[i].id, f"from {i}") for i in reversed(range(5))]
+    assert pages == [expected[0:2], expected[2:4], expected[4:5]]
+
+
+def test_first_message_older_than_the_conversation_becomes_last(db, users):
+    alice, bob = users
+    # The conversation row and the message are stamped by different clocks
+    conversation = Conversation(user1=alice.id, user2=bob.id, last_activity_at=START)
+    db.add(conversation)
+    db.commit()
+    message = _send(db, conversation, alice, bob, START - timedelta(hours=5), text="hello")
+    db.refresh(conversation)
+
+    assert conversation.last_message_id == message.id
+    assert conversation.last_activity_at == message.timestamp
+    rows, _ = message_history.fetch_inbox(db, bob.id)
+    assert [(row[0].id, row[2].text) for row in rows] == [(conversation.id, "hello")]
+
+
+def test_last_message_follows_ids_not_timestamps(db, users, conversation):
+    alice, bob = users
+    _send(db, conversation, alice, bob, START + timedelta(minutes=10))
+    latest = _send(db, conversation, bob, alice, START + timedelta(minutes=5))
+    db.refresh(conversation)
+
+    assert conversation.last_message_id == latest.id
@@ -0,0 +1,84 @@
+from datetime import datetime
+
+import pytest
+
+from app.models.models import UserNotification, UserNotificationCount
+from app.services import notification_counter
+
+
+def _notify(db, user, count=1):
+    notifications = [
+        UserNotification(user_id=user.id, title="t", message="m", notification_type="pet",
+                         is_read=False, created_at=datetime.utcnow())
+        for _ in range(count)
+    ]
+    db.add_all(notifications)
+    notification_counter.add_unread(db, [user.id] * count)
+    db.commit()
+    return notifications
+
+
+def _badge(client, user):
+    return client.get(f"/api/notifications/unread-count/{user.id}").json()["unread_count"]
+
+
+def test_add_unread_counts_every_occurrence(db, make_user):
+    alice, bob = make_user("alice@example.com"), make_user("bob@example.com")
+    notification_counter.add_unread(db, [alice.id, bob.id, alice.id])
+    notification_counter.add_unread(db, [alice.id])
+    db.commit()
+
+    assert notification_counter.unread_count(db, alice.id) == 3
+    assert notification_counter.unread_count(db, bob.id) == 1
+
+
+def test_remove_unread_never_goes_below_zero(db, make_user):
+    alice = make_user("alice@example.com")
+    notification_counter.add_unread(db, [alice.id, alice.id])
+    notification_counter.remove_unread(db, alice.id)
+    db.commit()
+    assert notification_counter.unread_count(db, alice.id) == 1
+
+    notification_counter.remove_unread(db, alice.id, 5)
+    db.commit()
+    assert notification_counter.unread_count(db, alice.id) == 0
+
+
+def test_user_without_a_row_has_no_unread(db, make_user):
+    assert notification_counter.unread_count(db, make_user("alice@example.com").id) == 0
+
+
+@pytest.mark.parametrize("path", ["/api/notifications/{id}/read", "/api/notifications/notifications/{id}/read"])
+def test_mark_read_is_idempotent(db, client, make_user, path):
+    alice = make_user("alice@example.com")
+    first, _ = _notify(db, alice, 2)
+    assert _badge(client, alice) == 2
+
+    for _ in range(3):
+        assert client.patch(path.format(id=first.id)).status_code == 200
+    assert _badge(client, alice) == 1
+
+
+def test_mark_all_read_clears_the_badge(db, client, make_user):
+    alice, bob = make_user("alice@example.com"), make_user("bob@example.com")
+    _notify(db, alice, 3)
+    _notify(db, bob, 1)
+
+    client.patch(f"/api/notifications/mark-all-read/{alice.id}")
+    client.patch(f"/api/notifications/mark-all-read/{alice.id}")
+
+    assert _badge(client, alice) == 0
+    assert _badge(client, bob) == 1
+
+
+def test_reconcile_repairs_drifted_counts(db, make_user):
+    alice, bob = make_user("alice@example.com"), make_user("bob@example.com")
+    _notify(db, alice, 2)
+    db.add(UserNotification(user_id=bob.id, title="t", message="m", notification_type="pet",
+                            is_read=False, created_at=datetime.utcnow()))
+    db.query(UserNotificationCount).filter(UserNotificationCount.user_id == alice.id).update({"unread_count": 9})
+    db.commit()
+
+    assert notification_counter.reconcile(db) == {alice.id: (9, 2), bob.id: (0, 1)}
+    assert notification_counter.unread_count(db, alice.id) == 2
+    assert notification_counter.unread_count(db, bob.id) == 1
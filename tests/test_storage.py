@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from app.services.storage import AsyncStorage, LocalStorage, StorageError
+
+
+class FlakyStorage(LocalStorage):
+    """Local storage whose uploads to ``failing`` paths raise."""
+
+    def __init__(self, root, failing):
+        super().__init__(root, "http://files")
+        self.failing = set(failing)
+
+    def upload(self, bucket, path, content, content_type, upsert=False):
+        if path in self.failing:
+            raise StorageError(f"Upload of {path} failed: injected")
+        super().upload(bucket, path, content, content_type, upsert=upsert)
+
+
+def _upload_many(backend, files, upsert=False):
+    storage = AsyncStorage(lambda: backend, max_workers=4)
+    return asyncio.run(storage.upload_many("pets", files, upsert=upsert))
+
+
+def test_upload_many_writes_every_file(tmp_path):
+    backend = LocalStorage(tmp_path, "http://files")
+    _upload_many(backend, [("1/main.jpg", b"a", "image/jpeg"), ("1/face.jpg", b"b", "image/jpeg")])
+
+    assert backend.list("pets", "1") == ["face.jpg", "main.jpg"]
+
+
+def test_partial_failure_removes_the_new_uploads(tmp_path):
+    backend = FlakyStorage(tmp_path, failing={"1/side.jpg"})
+    files = [(f"1/{name}.jpg", b"x", "image/jpeg") for name in ("main", "face", "side")]
+
+    with pytest.raises(StorageError, match="side.jpg"):
+        _upload_many(backend, files)
+
+    assert backend.list("pets", "1") == []
+
+
+def test_partial_failure_keeps_objects_that_existed(tmp_path):
+    backend = FlakyStorage(tmp_path, failing={"1/side.jpg"})
+    backend.upload("pets", "1/main.jpg", b"old", "image/jpeg")
+    files = [(f"1/{name}.jpg", b"new", "image/jpeg") for name in ("main", "face", "side")]
+
+    with pytest.raises(StorageError):
+        _upload_many(backend, files, upsert=True)
+
+    assert backend.list("pets", "1") == ["main.jpg"]
+    assert (tmp_path / "pets" / "1" / "main.jpg").read_bytes() == b"new"
+
+
+def test_existing_lists_each_folder_once(tmp_path):
+    backend = LocalStorage(tmp_path, "http://files")
+    backend.upload("pets", "1/main.jpg", b"x", "image/jpeg")
+    backend.upload("pets", "top.jpg", b"x", "image/jpeg")
+
+    found = backend.existing("pets", ["1/main.jpg", "1/face.jpg", "2/main.jpg", "top.jpg"])
+
+    assert found == {"1/main.jpg", "top.jpg"}